@@ -4,21 +4,49 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
 from dotenv import load_dotenv
+from app.config import apply_sqlite_profile, engine_options, sqlite_profile_from_env
+from app.json_provider import JSONProvider
+from app.services.replicas import replica_binds
+from app.services.shards import shard_binds
+from app.session import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 mail = Mail()
 
-def create_app():
+def create_app(config=None):
     load_dotenv()
 
     app = Flask(__name__, instance_relative_config=True)
+    app.json = JSONProvider(app)  # Native date/time encoding, orjson when installed
 
     # Basic config
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 24 * 3600  # 24 hours in seconds
+    app.config['ANALYTICS_CACHE_TTL'] = int(os.getenv('ANALYTICS_CACHE_TTL', 60))  # seconds
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+    app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', 0)) or None  # Unset or 0 disables the slow-query log
+    app.config['SLOW_QUERY_PARAMETERS'] = os.getenv('SLOW_QUERY_PARAMETERS', 'False').lower() in ('1', 'true', 'yes')
+    app.config['PROFILER_TOKEN'] = os.getenv('PROFILER_TOKEN')
+    app.config['PROFILER_SAMPLE_RATE'] = float(os.getenv('PROFILER_SAMPLE_RATE', 0))
+    app.config['PROFILER_ROUTES'] = [name for name in os.getenv('PROFILER_ROUTES', '').split(',') if name]
+    app.config['COMPRESSION_ENABLED'] = os.getenv('COMPRESSION_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # bytes
+    app.config['COMPRESSION_LEVEL'] = int(os.getenv('COMPRESSION_LEVEL', 6))
+    app.config['READ_REPLICA_URIS'] = [uri for uri in os.getenv('READ_REPLICA_URIS', '').split(',') if uri]
+    app.config['READ_REPLICA_MAX_LAG'] = float(os.getenv('READ_REPLICA_MAX_LAG', 5))  # seconds
+    app.config['SHARD_URIS'] = [uri for uri in os.getenv('SHARD_URIS', '').split(',') if uri]
+    app.config['BATCH_MAX_REQUESTS'] = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+    # Concurrent GETs per /batch call. Reads from a local SQLite file are CPU-bound and gain nothing
+    # from threads under the GIL, so raise this only when reads wait on I/O, e.g. a remote replica.
+    app.config['BATCH_THREADS'] = int(os.getenv('BATCH_THREADS', 1))
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 730))
+    app.config['ARCHIVE_INTERVAL'] = float(os.getenv('ARCHIVE_INTERVAL', 3600))  # seconds; 0 leaves archiving to `flask archive`
+    app.config['IDEMPOTENCY_TTL'] = int(os.getenv('IDEMPOTENCY_TTL', 86400))  # seconds a response is replayed to retries
+    app.config['SYNC_PAGE_SIZE'] = int(os.getenv('SYNC_PAGE_SIZE', 500))  # changes per database per /sync call
 
     # Email config
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('EMAIL_USERNAME')
@@ -29,11 +57,69 @@ def create_app():
     app.config['MAIL_USERNAME'] = os.getenv('EMAIL_USERNAME')
     app.config['MAIL_PASSWORD'] = os.getenv('EMAIL_PASSWORD')
 
+    # Overrides for tooling that runs the app against its own database
+    if config:
+        app.config.update(config)
+
+    # Database engine config
+    app.config.setdefault('SQLITE_PROFILE', sqlite_profile_from_env())
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLITE_PROFILE']
+    ))
+
+    # Read replicas are extra binds that read-only views are routed to
+    app.config.setdefault('SQLALCHEMY_BINDS', {}).update(replica_binds(app.config['READ_REPLICA_URIS']))
+    # Shards hold the bank-scoped tables of the banks assigned to them
+    app.config['SQLALCHEMY_BINDS'].update(shard_binds(app.config['SHARD_URIS']))
+
     # Initialize extensions
+    from app.services.replicas import replicas
+    replicas.init_app(app)
     db.init_app(app)
     jwt.init_app(app)
     mail.init_app(app)
 
+    # WAL, busy timeout and cache PRAGMAs on every new SQLite connection
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_profile(engine, app.config['SQLITE_PROFILE'])
+
+    from app.services.shards import shards
+    shards.init_app(app)
+
+    from app.services.audit import audit_log
+    audit_log.init_app(app)
+
+    # Request, SQL, pool, email and hashing timings served at /metrics
+    from app.services.metrics import metrics
+    metrics.init_app(app)
+
+    from app.services.slow_queries import slow_query_log
+    slow_query_log.init_app(app)
+
+    from app.services.profiler import profiler
+    profiler.init_app(app)
+
+    # Blood need notifications written to followers by a background fan-out
+    from app.services.notifications import notifier
+    notifier.init_app(app)
+
+    # Appointments and donations past the retention window moved to archive tables in the background
+    from app.services.archive import archiver
+    archiver.init_app(app)
+
+    # Responses to POSTs sent with an Idempotency-Key header, replayed to their retries
+    from app.services.idempotency import idempotency
+    idempotency.init_app(app)
+
+    # Server-Sent Event streams of new blood needs, events and appointments
+    from app.services.pubsub import event_bus
+    event_bus.init_app(app)
+
+    # gzip/deflate for large JSON, CSV and text bodies, negotiated via Accept-Encoding
+    from app.services.compression import compression
+    compression.init_app(app)
+
     with app.app_context():
 
         from app import models  
@@ -1,4 +1,6 @@
 import os
+from datetime import datetime, timedelta
+import click
 from flask import current_app
 from flask.cli import with_appcontext
 from werkzeug.security import generate_password_hash
@@ -31,3 +33,268 @@ def create_admin():
         print(f"Admin user {admin_email} created successfully.")
     else:
         print(f"Admin user {admin_email} already exists.")
+
+
+@current_app.cli.command("rebuild-donor-roster")
+@with_appcontext
+def rebuild_donor_roster():
+    from app.services.donor_roster import rebuild_affinity
+
+    rows = rebuild_affinity()
+    print(f"Donor roster rebuilt: {rows} bank/donor pairs.")
+
+
+@current_app.cli.command("rebuild-rollups")
+@click.option("--days", type=int, default=None, help="Only recompute the most recent N days.")
+@with_appcontext
+def rebuild_rollups(days):
+    from app.services.rollups import rebuild_rollups as rebuild
+
+    since = (datetime.utcnow() - timedelta(days=days)).date() if days else None
+    stats_rows, unit_rows = rebuild(since)
+    print(f"Rollups rebuilt: {stats_rows} daily bank rows, {unit_rows} blood type rows.")
+
+
+@current_app.cli.command("rebuild-eligibility")
+@with_appcontext
+def rebuild_eligibility():
+    from app.services.eligibility import rebuild_eligibility as rebuild
+
+    donors, followers = rebuild()
+    print(f"Eligibility index rebuilt: {donors} donors, {followers} bank/follower pairs.")
+
+
+@current_app.cli.command("flush-audit")
+@with_appcontext
+def flush_audit():
+    from app.services.audit import audit_log
+
+    print(f"Audit log flushed: {audit_log.flush()} events written.")
+
+
+@current_app.cli.command("prune-audit")
+@click.option("--keep-months", type=int, default=12, help="Number of most recent months to keep.")
+@with_appcontext
+def prune_audit(keep_months):
+    from app.services.audit import prune_months
+
+    print(f"Audit log pruned: {prune_months(keep_months)} events removed.")
+
+
+@current_app.cli.command("archive")
+@click.option("--after-days", type=int, default=None, help="Retention window; defaults to ARCHIVE_AFTER_DAYS.")
+@with_appcontext
+def archive(after_days):
+    from app.services.archive import archiver
+
+    moved = archiver.run(after_days, log=print)
+    print(f"Archived {moved['donations']} donations and {moved['appointments']} appointments.")
+
+
+@current_app.cli.command("prune-sync")
+@click.option("--keep-days", type=int, default=30, help="Days of deletes to keep for clients syncing with a cursor.")
+@with_appcontext
+def prune_sync(keep_days):
+    from app.services.sync import prune_tombstones
+
+    print(f"Sync tombstones pruned: {prune_tombstones(keep_days)} removed.")
+
+
+@current_app.cli.command("prune-idempotency-keys")
+@with_appcontext
+def prune_idempotency_keys():
+    from app.services.idempotency import prune
+
+    print(f"Idempotency keys pruned: {prune(current_app.config['IDEMPOTENCY_TTL'])} expired keys removed.")
+
+
+@current_app.cli.command("fan-out-notifications")
+@with_appcontext
+def fan_out_notifications():
+    from app.services.notifications import notifier
+
+    print(f"Notifications fanned out: {notifier.run_pending()} written.")
+
+
+@current_app.cli.command("migrate")
+@click.option("--dry-run", is_flag=True, help="Only list the pending schema changes.")
+@with_appcontext
+def migrate(dry_run):
+    import time
+    from sqlalchemy import inspect
+    from app.migrations import upgrade
+    from app.services.donor_roster import rebuild_affinity
+    from app.services.eligibility import rebuild_eligibility
+    from app.services.rollups import rebuild_rollups
+    from app.services.shards import shards
+
+    # Derived tables are filled from their source tables when this run creates them
+    backfills = [
+        (('donor_bank_affinity',), rebuild_affinity),
+        (('daily_bank_stats', 'daily_blood_type_units'), rebuild_rollups),
+        (('donor_eligibility', 'follower_eligibility'), rebuild_eligibility),
+    ]
+    existing = [set(inspect(shards.engine(key)).get_table_names()) for key in shards.keys()]
+    missing = [
+        (names, rebuild) for names, rebuild in backfills
+        if any(name not in tables for name in names for tables in existing)
+    ]
+
+    applied = upgrade(db.engine, dry_run=dry_run)
+    applied += shards.upgrade(dry_run=dry_run)
+    for names, rebuild in missing:
+        if dry_run:
+            print(f"pending: fill {', '.join(names)}")
+            continue
+        started = time.perf_counter()
+        rebuild()
+        print(f"fill {', '.join(names)} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+    print(f"Schema up to date: {len(applied)} change(s) applied.")
+
+
+@current_app.cli.command("check-query-plans")
+@click.option("--donors", type=int, default=2000, help="Synthetic donors to generate before checking.")
+@with_appcontext
+def check_query_plans(donors):
+    from app.perf.query_plans import check
+    from app.perf.synthetic import Scale
+
+    failures = check(Scale(donors=donors))
+    for endpoint, table, statement in failures:
+        print(f"FULL SCAN of {table} in {endpoint}:\n    {statement}")
+    if failures:
+        raise SystemExit(1)
+    print("No unexpected full table scans.")
+
+
+@current_app.cli.command("seed-synthetic")
+@click.option("--factor", type=float, default=1.0, help="Multiply the default dataset size (5 banks, 500 donors).")
+@click.option("--donors", type=int, default=None, help="Override the number of donors.")
+@click.option("--banks", type=int, default=None, help="Override the number of blood banks.")
+@click.option("--fixture", "fixture_path", default=None, help="Where to write the fixture IDs for load-test --url.")
+@with_appcontext
+def seed_synthetic(factor, donors, banks, fixture_path):
+    from app.models import Donor
+    from app.perf.load import save_fixture
+    from app.perf.synthetic import Scale, generate
+
+    db.create_all()
+    if Donor.query.first() is not None:
+        print("Error: the database already has donors; seed-synthetic only fills an empty database.")
+        raise SystemExit(1)
+
+    overrides = {key: value for key, value in (('donors', donors), ('banks', banks)) if value is not None}
+    fixture = generate(Scale.from_factor(factor, **overrides))
+    fixture_path = fixture_path or os.path.join(current_app.instance_path, 'perf_fixture.json')
+    os.makedirs(os.path.dirname(os.path.abspath(fixture_path)), exist_ok=True)
+    save_fixture(fixture, fixture_path)
+    print(f"Synthetic data generated: {len(fixture.bank_ids)} banks, {len(fixture.donor_ids)} donors. "
+          f"Fixture written to {fixture_path}.")
+
+
+@current_app.cli.command("load-test")
+@click.option("--profile", type=click.Choice(["mobile", "desktop", "mixed"]), default="mixed")
+@click.option("--clients", type=int, default=8, help="Concurrent clients.")
+@click.option("--duration", type=float, default=10.0, help="Seconds of traffic.")
+@click.option("--factor", type=float, default=1.0, help="Synthetic dataset size when not using --url.")
+@click.option("--url", default=None, help="Base URL of a running server seeded with seed-synthetic.")
+@click.option("--fixture", "fixture_path", default=None, help="Fixture file written by seed-synthetic.")
+@click.option("--output", default=None, help="Write the results as JSON to this file.")
+@click.option("--baseline", default=None, help="Compare against a previously saved results file.")
+@click.option("--tolerance", type=float, default=0.25, help="Allowed relative p95/throughput regression.")
+@with_appcontext
+def load_test(profile, clients, duration, factor, url, fixture_path, output, baseline, tolerance):
+    import json
+    from app.perf.harness import seeded_app
+    from app.perf.load import compare, format_table, load_fixture, run, summarize
+    from app.perf.synthetic import Scale
+
+    if url:
+        # Setups and tokens go through this app, which must share the server's database and secrets
+        app = current_app._get_current_object()
+        fixture = load_fixture(fixture_path or os.path.join(current_app.instance_path, 'perf_fixture.json'))
+    else:
+        app, fixture = seeded_app(Scale.from_factor(factor))
+
+    samples, elapsed = run(app, fixture, profile=profile, clients=clients, duration=duration, base_url=url)
+    results = summarize(samples, elapsed, profile=profile, clients=clients, duration_s=duration,
+                        target=url or 'test-client', factor=None if url else factor,
+                        donors=len(fixture.donor_ids), banks=len(fixture.bank_ids))
+    print(format_table(results))
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {output}.")
+
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), tolerance=tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions against {baseline}.")
+
+
+@current_app.cli.command("check-query-counts")
+@click.option("--update-budgets", is_flag=True, help="Rewrite app/perf/query_budgets.json from this run.")
+@with_appcontext
+def check_query_counts(update_budgets):
+    from app.perf.query_counts import LARGE, SMALL, check, format_failure, load_budgets, measure, save_budgets
+
+    small = measure(SMALL)
+    large = measure(LARGE)
+    if update_budgets:
+        save_budgets(large)
+        print(f"Query budgets written for {len(large)} scenarios.")
+
+    failures = check(small, large, load_budgets())
+    for failure in failures:
+        print(format_failure(*failure))
+    if failures:
+        raise SystemExit(1)
+    print(f"Query counts within budget and independent of dataset size for {len(large)} scenarios.")
+
+
+@current_app.cli.command("check-shards")
+@click.option("--shards", "shard_count", type=int, default=3, help="Shard files to spread the banks over.")
+@click.option("--factor", type=float, default=1.0, help="Synthetic dataset size.")
+@with_appcontext
+def check_shards(shard_count, factor):
+    from app.perf.sharding import check
+    from app.perf.synthetic import Scale
+
+    failures, rows = check(Scale.from_factor(factor, banks=max(5, shard_count * 2)), shard_count)
+    for key, reason in failures:
+        print(f"{key}: {reason}")
+    if failures:
+        raise SystemExit(1)
+    placed = ', '.join(f"shard {key}: {count}" for key, count in rows.items())
+    print(f"Every scenario answers the same on {shard_count} shards as on one database ({placed} bank-scoped rows).")
+
+
+@current_app.cli.command("refresh-replica")
+@click.option("--interval", type=float, default=None, help="Keep refreshing every N seconds instead of once.")
+@with_appcontext
+def refresh_replica(interval):
+    import time
+    from app.services.replicas import REPLICA_PREFIX, refresh_sqlite_replica
+
+    replica_engines = {key: engine for key, engine in db.engines.items() if key and key.startswith(REPLICA_PREFIX)}
+    if not replica_engines:
+        print("Error: no read replicas configured (READ_REPLICA_URIS).")
+        raise SystemExit(1)
+
+    while True:
+        for key, engine in replica_engines.items():
+            try:
+                refresh_sqlite_replica(db.engine, engine)
+            except Exception as e:
+                print(f"Could not refresh {key}: {e}")
+                if interval is None:
+                    raise SystemExit(1)
+        if interval is None:
+            print(f"Refreshed {len(replica_engines)} replica(s).")
+            return
+        time.sleep(interval)
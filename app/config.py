@@ -0,0 +1,82 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Per-connection PRAGMAs applied to every SQLite connection when the production profile is on.
+# Each one can be overridden with an environment variable of the same name.
+SQLITE_PRAGMA_DEFAULTS = {
+    'SQLITE_JOURNAL_MODE': 'WAL',       # Readers no longer block on the writer
+    'SQLITE_BUSY_TIMEOUT': '5000',      # ms to wait on a locked database before "database is locked"
+    'SQLITE_SYNCHRONOUS': 'NORMAL',     # Durable across application crashes in WAL mode, far fewer fsyncs
+    'SQLITE_MMAP_SIZE': '268435456',    # 256 MB of the file read through mmap
+    'SQLITE_CACHE_SIZE': '-65536',      # Negative means KiB, so 64 MB of page cache per connection
+    'SQLITE_TEMP_STORE': 'MEMORY',      # Sorts and temp indexes stay in memory
+}
+
+PRAGMAS = {
+    'SQLITE_JOURNAL_MODE': 'journal_mode',
+    'SQLITE_BUSY_TIMEOUT': 'busy_timeout',
+    'SQLITE_SYNCHRONOUS': 'synchronous',
+    'SQLITE_MMAP_SIZE': 'mmap_size',
+    'SQLITE_CACHE_SIZE': 'cache_size',
+    'SQLITE_TEMP_STORE': 'temp_store',
+}
+
+
+def sqlite_profile_from_env():
+    """Return the PRAGMA profile selected by SQLITE_PROFILE ("production" by default, "default" to disable)."""
+    if os.getenv('SQLITE_PROFILE', 'production') != 'production':
+        return {}
+    return {name: os.getenv(name, value) for name, value in SQLITE_PRAGMA_DEFAULTS.items()}
+
+
+def is_file_sqlite(uri):
+    if not uri:
+        return False
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(uri, profile):
+    """SQLAlchemy engine options matching the database and profile in use.
+
+    Pools are per process, so these are sized for the threads of a single worker.
+    """
+    if not uri or (make_url(uri).get_backend_name() == 'sqlite' and not is_file_sqlite(uri)):
+        # In-memory SQLite keeps SQLAlchemy's single-connection pool
+        return {}
+
+    if not is_file_sqlite(uri):
+        return {
+            'pool_pre_ping': True,
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        }
+
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+    }
+    if profile:
+        # Also hand the timeout to the driver so it applies before the connect event runs
+        options['connect_args'] = {'timeout': int(profile['SQLITE_BUSY_TIMEOUT']) / 1000}
+    return options
+
+
+def apply_sqlite_profile(engine, profile):
+    """Issue the profile's PRAGMAs on every new DBAPI connection of a SQLite engine."""
+    if not profile or engine.dialect.name != 'sqlite':
+        return
+
+    statements = [f"PRAGMA {PRAGMAS[name]}={value}" for name, value in profile.items()]
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
@@ -0,0 +1,64 @@
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider, _default as _flask_default
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder is used without it
+    orjson = None
+
+# The formats the mobile and desktop clients already parse
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%H:%M:%S'
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _default(value):
+    # isoformat() gives the same text as the formats above at a fraction of strftime's cost;
+    # timezone-aware values would gain an offset, so they keep using strftime.
+    # datetime first: it is also a date.
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.isoformat(' ', 'seconds')
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        if value.tzinfo is None:
+            return value.isoformat('seconds')
+        return value.strftime(TIME_FORMAT)
+    return _flask_default(value)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes dates and times natively and uses orjson when installed.
+
+    Routes can hand `date`, `time` and `datetime` values straight to `jsonify` instead of calling
+    `strftime` per row. Output matches the stdlib encoder apart from non-ASCII characters, which
+    orjson writes as UTF-8 rather than `\\u` escapes.
+    """
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs.get('indent'):
+            try:
+                return self._orjson_dumps(obj, kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+            except TypeError:
+                pass  # e.g. integers wider than 64 bits; the stdlib encoder handles them
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if orjson is not None and not pretty:
+            try:
+                return self._app.response_class(self._orjson_dumps(obj, self.sort_keys) + b"\n", mimetype=self.mimetype)
+            except TypeError:
+                pass
+        return super().response(obj)
+
+    def _orjson_dumps(self, obj, sort_keys):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
@@ -0,0 +1,98 @@
+"""Online schema upgrades for databases created by an older version of the models.
+
+Compares the declared models with the live schema and adds what is missing: tables, nullable
+columns, indexes and the triggers models declare in `table.info['triggers']`. Each change runs in its own short transaction, so on SQLite in WAL mode
+readers keep being served throughout and writers only wait for one index build at a time.
+Nothing is ever dropped or rewritten.
+"""
+import time
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex
+from app import db
+
+
+def plan_upgrade(engine, metadata=None, tables=None):
+    """Return the list of (description, callable) steps needed to bring the schema up to date.
+
+    `tables` limits the plan to the named tables, e.g. the bank-scoped tables of a shard.
+    """
+    metadata = metadata or db.metadata
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    steps = []
+    triggers = []
+
+    for table in metadata.sorted_tables:
+        if tables is not None and table.name not in tables:
+            continue
+        if table.name not in existing_tables:
+            # New tables get their triggers from their own after_create listeners
+            steps.append((f"create table {table.name}", lambda conn, table=table: table.create(conn, checkfirst=True)))
+            continue
+        triggers += [(table, name, ddl) for name, ddl in table.info.get('triggers', {}).items()]
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                steps.append((f"skip {table.name}.{column.name}: NOT NULL column needs a server default", None))
+                continue
+            ddl = _add_column_ddl(engine, table, column)
+            steps.append((f"add column {table.name}.{column.name}", lambda conn, ddl=ddl: conn.exec_driver_sql(ddl)))
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            steps.append((f"create index {index.name}", lambda conn, ddl=ddl: conn.exec_driver_sql(ddl)))
+
+    # After every table and column, since trigger bodies refer to other tables
+    if triggers and engine.dialect.name == 'sqlite':
+        with engine.connect() as conn:
+            existing_triggers = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+        for table, name, ddl in triggers:
+            if name not in existing_triggers:
+                steps.append((f"create trigger {name}", lambda conn, ddl=ddl: conn.exec_driver_sql(ddl)))
+        # Rows from before change tracking get their first version through the update trigger
+        for table in dict.fromkeys(table for table, name, ddl in triggers if name not in existing_triggers):
+            if 'version' in table.columns:
+                ddl = f"UPDATE {table.name} SET version = version WHERE version = 0"
+                steps.append((f"stamp versions of {table.name}", lambda conn, ddl=ddl: conn.exec_driver_sql(ddl)))
+
+    return steps
+
+
+def upgrade(engine, dry_run=False, retries=5, log=print, tables=None):
+    """Apply every pending step, retrying briefly when the database is busy. Returns the steps applied."""
+    applied = []
+    for description, step in plan_upgrade(engine, tables=tables):
+        if step is None or dry_run:
+            log(description if step is None else f"pending: {description}")
+            continue
+
+        for attempt in range(retries):
+            try:
+                started = time.perf_counter()
+                with engine.begin() as conn:
+                    step(conn)
+                log(f"{description} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+                applied.append(description)
+                break
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt == retries - 1:
+                    raise
+                time.sleep(0.5 * (attempt + 1))
+
+    return applied
+
+
+def _add_column_ddl(engine, table, column):
+    preparer = engine.dialect.identifier_preparer
+    column_type = column.type.compile(dialect=engine.dialect)
+    ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    return ddl
@@ -3,21 +3,31 @@ from app import db
 from .users import User, Donor, Admin, Manager, StaffMember
 from .email_verification import EmailVerification
 from .appointment import Appointment
+from .archive import ArchivedAppointment, ArchivedBloodDonation
+from .audit_event import AuditEvent
 from .blacklist import Blacklist
 from .blood_bank import BloodBank, DonorBloodBank
 from .blood_donation import BloodDonation
 from .blood_inventory import BloodInventory
 from .blood_need import BloodNeed
+from .daily_stats import DailyBankStats, DailyBloodTypeUnits
 from .disease import Disease, DonorDisease
+from .donor_bank_affinity import DonorBankAffinity
+from .donor_eligibility import DonorEligibility, FollowerEligibility
 from .event import Event
+from .idempotency_key import IdempotencyKey
 from .faq import FAQ
+from .notification import Notification, NotificationFanout
 from .registration_request import RegistrationRequest
+from .slow_query import SlowQuery
+from .stream_event import StreamEvent
+from .sync import SyncClock, SyncTombstone
 from .volunteering import Volunteering
 
 __all__ = [
     "User", "Donor", "Admin", "Manager", "StaffMember",
-    "EmailVerification", "Appointment", "Blacklist",
+    "EmailVerification", "Appointment", "ArchivedAppointment", "ArchivedBloodDonation", "AuditEvent", "Blacklist",
     "BloodBank", "DonorBloodBank", "BloodDonation", "BloodInventory",
-    "BloodNeed", "Disease", "DonorDisease", "Event", "FAQ",
-    "RegistrationRequest", "Volunteering"
+    "BloodNeed", "Disease", "DonorDisease", "DonorBankAffinity", "DonorEligibility", "Event", "FAQ", "FollowerEligibility", "IdempotencyKey", "Notification", "NotificationFanout",
+    "RegistrationRequest", "SlowQuery", "StreamEvent", "SyncClock", "SyncTombstone", "Volunteering", "DailyBankStats", "DailyBloodTypeUnits"
 ]
@@ -13,5 +13,13 @@ class Appointment(db.Model):
 
     donations = db.relationship('BloodDonation', backref='appointment', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_appointment_donor_status', 'donor_id', 'status'),
+        db.Index('ix_appointment_donor_date', 'donor_id', 'appointment_date'),
+        db.Index('ix_appointment_bank_date_status', 'blood_bank_id', 'appointment_date', 'status'),
+        db.Index('ix_appointment_date', 'appointment_date'),
+        {'sqlite_autoincrement': True},  # Per-shard ID ranges, see app/services/shards.py
+    )
+
     def __repr__(self):
         return f'<Appointment {self.appointment_id}>'
\ No newline at end of file
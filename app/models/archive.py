@@ -0,0 +1,56 @@
+from datetime import datetime
+from app import db
+
+# Cold tier of Appointment and BloodDonation: rows past the retention window, moved here by
+# app/services/archive.py with their IDs and columns unchanged. They live next to the hot table,
+# on the same shard.
+
+
+class ArchivedAppointment(db.Model):
+    appointment_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False)
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False)
+    appointment_date = db.Column(db.Date, nullable=False)
+    appointment_time = db.Column(db.Time, nullable=False)
+    status = db.Column(db.String(100), nullable=False)
+    donation_type = db.Column(db.String(100), nullable=False)
+    quantity_donated = db.Column(db.Float, nullable=True)
+    previous_donations = db.Column(db.Integer, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    blood_bank = db.relationship('BloodBank', viewonly=True)
+
+    __table_args__ = (
+        db.Index('ix_archived_appointment_donor_date', 'donor_id', 'appointment_date'),
+        db.Index('ix_archived_appointment_bank_date', 'blood_bank_id', 'appointment_date'),
+        db.Index('ix_archived_appointment_date', 'appointment_date'),
+    )
+
+    def __repr__(self):
+        return f'<ArchivedAppointment {self.appointment_id}>'
+
+
+class ArchivedBloodDonation(db.Model):
+    donation_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False)
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False)
+    appointment_id = db.Column(db.Integer, nullable=True)  # May point to either tier
+    donation_date = db.Column(db.Date, nullable=False)
+    donation_type = db.Column(db.String(100), nullable=False)
+    quantity_donated = db.Column(db.Float, nullable=False)
+    recipient_organization = db.Column(db.String(200), nullable=True)
+    donor_blood_pulse = db.Column(db.Float, nullable=False)
+    donor_temperature = db.Column(db.Float, nullable=False)
+    blood_pressure = db.Column(db.String(50), nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    blood_bank = db.relationship('BloodBank', viewonly=True)
+
+    __table_args__ = (
+        db.Index('ix_archived_blood_donation_donor_date', 'donor_id', 'donation_date'),
+        db.Index('ix_archived_blood_donation_bank_date', 'blood_bank_id', 'donation_date'),
+        db.Index('ix_archived_blood_donation_date', 'donation_date'),
+    )
+
+    def __repr__(self):
+        return f'<ArchivedBloodDonation {self.donation_id}>'
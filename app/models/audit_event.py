@@ -0,0 +1,24 @@
+from datetime import datetime
+from app import db
+
+class AuditEvent(db.Model):
+    # Append-only; rows are only ever inserted in batches and dropped a whole month at a time
+    audit_id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, nullable=False)  # Partition key, e.g. 202610
+    occurred_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    actor_id = db.Column(db.Integer, nullable=True)
+    actor_type = db.Column(db.String(50), nullable=True)
+    action = db.Column(db.String(100), nullable=False)
+    blood_bank_id = db.Column(db.Integer, nullable=True)
+    target_type = db.Column(db.String(50), nullable=True)
+    target_id = db.Column(db.Integer, nullable=True)
+    details = db.Column(db.Text, nullable=True)  # JSON
+
+    __table_args__ = (
+        db.Index('ix_audit_event_month', 'month'),
+        db.Index('ix_audit_event_actor', 'actor_id', 'occurred_at'),
+        db.Index('ix_audit_event_bank', 'blood_bank_id', 'occurred_at'),
+    )
+
+    def __repr__(self):
+        return f'<AuditEvent {self.action} by {self.actor_id}>'
@@ -1,4 +1,6 @@
 from app import db
+from app.models.sync import track_changes
+from app.services.shards import assign_shard
 
 class BloodBank(db.Model):
     blood_bank_id = db.Column(db.Integer, primary_key=True)
@@ -9,6 +11,8 @@ class BloodBank(db.Model):
     email = db.Column(db.String(200), nullable=False)
     start_hour = db.Column(db.String(10), nullable=False)
     close_hour = db.Column(db.String(10), nullable=False)
+    shard = db.Column(db.Integer, nullable=False, default=assign_shard, server_default='0')  # 0 is the primary database
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Set by the sync triggers
 
     # Relationships
     appointments = db.relationship('Appointment', backref='blood_bank', lazy=True)
@@ -18,9 +22,20 @@ class BloodBank(db.Model):
     staff_members = db.relationship('StaffMember', backref='blood_bank', lazy=True)
     followers = db.relationship('Donor', secondary='donor_blood_bank', back_populates='followed_blood_banks', lazy='dynamic')
 
+    __table_args__ = (
+        db.Index('ix_blood_bank_version', 'version'),
+    )
+
     def __repr__(self):
         return f'<BloodBank {self.name}>'
     
 class DonorBloodBank(db.Model):
     donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), primary_key=True)
-    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), primary_key=True)
\ No newline at end of file
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_donor_blood_bank_bank', 'blood_bank_id', 'donor_id'),
+    )
+
+
+track_changes(BloodBank, bank_column='blood_bank_id')
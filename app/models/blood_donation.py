@@ -4,7 +4,7 @@ class BloodDonation(db.Model):
     donation_id = db.Column(db.Integer, primary_key=True)
     donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False)
     blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False)
-    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.appointment_id'), nullable=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.appointment_id'), nullable=True, index=True)  # Archiving checks appointments against it
     donation_date = db.Column(db.Date, nullable=False)
     donation_type = db.Column(db.String(100), nullable=False)
     quantity_donated = db.Column(db.Float, nullable=False) # Unit
@@ -13,5 +13,12 @@ class BloodDonation(db.Model):
     donor_temperature = db.Column(db.Float, nullable=False)  
     blood_pressure = db.Column(db.String(50), nullable=False) 
 
+    __table_args__ = (
+        db.Index('ix_blood_donation_bank_date', 'blood_bank_id', 'donation_date'),
+        db.Index('ix_blood_donation_donor_date', 'donor_id', 'donation_date'),
+        db.Index('ix_blood_donation_date', 'donation_date'),
+        {'sqlite_autoincrement': True},  # Per-shard ID ranges, see app/services/shards.py
+    )
+
     def __repr__(self):
         return f'<BloodDonation {self.donation_id}>'
\ No newline at end of file
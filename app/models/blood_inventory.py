@@ -7,6 +7,12 @@ class BloodInventory(db.Model):
     Quantity = db.Column(db.Integer, nullable=False) # By unit, the unit (450 ml to 500 ml) whole blood
     Expiration_Date = db.Column(db.Date, nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_blood_inventory_bank_type', 'blood_bank_ID', 'Blood_Type'),
+        db.Index('ix_blood_inventory_expiration', 'Expiration_Date'),
+        {'sqlite_autoincrement': True},  # Per-shard ID ranges, see app/services/shards.py
+    )
+
     def __repr__(self):
         return f'<BloodInventory {self.Blood_Type}>'
     
\ No newline at end of file
@@ -1,5 +1,6 @@
 from datetime import datetime 
 from app import db
+from app.models.sync import track_changes
 
 class BloodNeed(db.Model):
     blood_need_id = db.Column(db.Integer, primary_key=True)
@@ -10,10 +11,21 @@ class BloodNeed(db.Model):
     expire_date = db.Column(db.Date, nullable=False)
     expire_time = db.Column(db.Time, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Set by the sync triggers
 
     # Foreign key and relationship
     blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False)
     blood_bank = db.relationship('BloodBank', backref=db.backref('blood_needs', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_blood_need_expire', 'expire_date', 'expire_time'),
+        db.Index('ix_blood_need_bank_expire', 'blood_bank_id', 'expire_date', 'expire_time'),
+        db.Index('ix_blood_need_version', 'version'),
+        {'sqlite_autoincrement': True},  # Per-shard ID ranges, see app/services/shards.py
+    )
+
     def __repr__(self):
-        return f'<BloodNeed {self.blood_types} at {self.hospital}>' 
\ No newline at end of file
+        return f'<BloodNeed {self.blood_types} at {self.hospital}>'
+
+
+track_changes(BloodNeed, bank_column='blood_bank_id')
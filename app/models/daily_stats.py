@@ -0,0 +1,31 @@
+from app import db
+
+class DailyBankStats(db.Model):
+    # Per-bank daily rollup behind the dashboard statistics
+    blood_bank_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    donations_count = db.Column(db.Integer, nullable=False, default=0)
+    events_count = db.Column(db.Integer, nullable=False, default=0)
+    blood_needs_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_daily_bank_stats_day', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<DailyBankStats bank={self.blood_bank_id} day={self.day}>'
+
+
+class DailyBloodTypeUnits(db.Model):
+    # Units donated per blood type, per bank and day
+    blood_bank_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    blood_type = db.Column(db.String(10), primary_key=True)
+    units = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_daily_blood_type_units_day', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<DailyBloodTypeUnits bank={self.blood_bank_id} day={self.day} {self.blood_type}>'
@@ -2,7 +2,7 @@ from app import db
 
 class Disease(db.Model):
     disease_id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
 
     def __repr__(self):
         return f'<Disease {self.name}>'
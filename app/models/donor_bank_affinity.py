@@ -0,0 +1,16 @@
+from app import db
+
+class DonorBankAffinity(db.Model):
+    # One row per (blood bank, donor) pair, maintained on every recorded donation
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), primary_key=True)
+    donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), primary_key=True)
+    first_donation_date = db.Column(db.Date, nullable=False)
+    last_donation_date = db.Column(db.Date, nullable=False)
+    donation_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_donor_bank_affinity_bank_last', 'blood_bank_id', 'last_donation_date'),
+    )
+
+    def __repr__(self):
+        return f'<DonorBankAffinity bank={self.blood_bank_id} donor={self.donor_id}>'
@@ -0,0 +1,33 @@
+from app import db
+
+class DonorEligibility(db.Model):
+    # One row per donor, kept current by the routes that change what it is derived from; rebuilt
+    # from the source tables by `flask rebuild-eligibility`
+    donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), primary_key=True)
+    blood_group = db.Column(db.String(10), nullable=False)
+    last_donation_date = db.Column(db.Date, nullable=True)  # None if the donor never donated
+    next_eligible_date = db.Column(db.Date, nullable=False)  # date.min if the donor never donated
+    diseases = db.Column(db.Text, nullable=True)  # Comma-separated names from DonorDisease; None if there are none
+
+    def __repr__(self):
+        return f'<DonorEligibility donor={self.donor_id} from={self.next_eligible_date}>'
+
+
+class FollowerEligibility(db.Model):
+    # DonorEligibility copied onto each (bank, follower) pair, so a bank's eligible followers are
+    # one index range instead of a join over every follower
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), primary_key=True)
+    donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), primary_key=True)
+    blood_group = db.Column(db.String(10), nullable=False)
+    next_eligible_date = db.Column(db.Date, nullable=False)
+    disqualified = db.Column(db.Boolean, nullable=False, default=False)  # The donor declared a disease
+
+    __table_args__ = (
+        # Counts by blood group, and pages in eligibility order
+        db.Index('ix_follower_eligibility_group', 'blood_bank_id', 'disqualified', 'blood_group', 'next_eligible_date'),
+        db.Index('ix_follower_eligibility_next', 'blood_bank_id', 'disqualified', 'next_eligible_date', 'blood_group'),
+        db.Index('ix_follower_eligibility_donor', 'donor_id'),
+    )
+
+    def __repr__(self):
+        return f'<FollowerEligibility bank={self.blood_bank_id} donor={self.donor_id}>'
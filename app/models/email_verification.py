@@ -6,4 +6,8 @@ class EmailVerification(db.Model):
     email = db.Column(db.String(255), nullable=False)
     code = db.Column(db.String(5), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_email_verification_email_code', 'email', 'code'),
+    )
     
\ No newline at end of file
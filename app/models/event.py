@@ -1,4 +1,5 @@
 from app import db
+from app.models.sync import track_changes
 
 class Event(db.Model):
     event_id = db.Column(db.Integer, primary_key=True)
@@ -8,6 +9,17 @@ class Event(db.Model):
     event_time = db.Column(db.Time, nullable=False)
     location = db.Column(db.String(200), nullable=False)
     blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False)  # Foreign key linking to BloodBank
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Set by the sync triggers
+
+    __table_args__ = (
+        db.Index('ix_event_bank_date', 'blood_bank_id', 'event_date', 'event_time'),
+        db.Index('ix_event_date', 'event_date'),
+        db.Index('ix_event_version', 'version'),
+        {'sqlite_autoincrement': True},  # Per-shard ID ranges, see app/services/shards.py
+    )
 
     def __repr__(self):
         return f'<Event {self.title}>'
+
+
+track_changes(Event, bank_column='blood_bank_id')
@@ -1,10 +1,19 @@
 from app import db
+from app.models.sync import track_changes
 
 class FAQ(db.Model):
     faq_id = db.Column(db.Integer, primary_key=True)
     question = db.Column(db.String(500), nullable=False)
     answer = db.Column(db.String(1000), nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('admin.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Set by the sync triggers
+
+    __table_args__ = (
+        db.Index('ix_faq_version', 'version'),
+    )
 
     def __repr__(self):
-        return f'<FAQ {self.question}>'
\ No newline at end of file
+        return f'<FAQ {self.question}>'
+
+
+track_changes(FAQ)
@@ -0,0 +1,23 @@
+from datetime import datetime
+from app import db
+
+class IdempotencyKey(db.Model):
+    # The first response to a request sent with an Idempotency-Key header, replayed to its retries.
+    # A row without a status is a claim: the first request is still running.
+    idempotency_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False)  # JWT identity
+    endpoint = db.Column(db.String(100), nullable=False)  # User IDs are per role, each endpoint serves one role
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status_code = db.Column(db.Integer, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    body = db.Column(db.LargeBinary, nullable=True)  # None for views whose responses hold credentials
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'endpoint', 'key', name='uq_idempotency_key'),
+        db.Index('ix_idempotency_key_created_at', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.endpoint} {self.key}>'
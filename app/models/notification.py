@@ -0,0 +1,46 @@
+from datetime import datetime
+from app import db
+
+class Notification(db.Model):
+    # One row per recipient, written in bulk by the fan-out worker and read from /donor/notifications
+    notification_id = db.Column(db.Integer, primary_key=True)
+    donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. "blood_need"
+    blood_bank_id = db.Column(db.Integer, nullable=False)
+    reference_id = db.Column(db.Integer, nullable=True)  # The blood need (or other row) it is about
+    title = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.String(1000), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_notification_donor', 'donor_id', 'notification_id'),
+    )
+
+    def __repr__(self):
+        return f'<Notification {self.kind} for {self.donor_id}>'
+
+
+class NotificationFanout(db.Model):
+    # A queued fan-out to every compatible follower of a bank. last_donor_id is the keyset cursor,
+    # so a fan-out interrupted between chunks resumes where it stopped.
+    fanout_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    blood_bank_id = db.Column(db.Integer, nullable=False)
+    reference_id = db.Column(db.Integer, nullable=True)
+    donor_groups = db.Column(db.String(100), nullable=False)  # Comma-separated blood groups to notify
+    title = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.String(1000), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)  # Refreshed after every chunk while running
+    finished_at = db.Column(db.DateTime, nullable=True)
+    last_donor_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    recipients = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('ix_notification_fanout_status', 'status', 'fanout_id'),
+    )
+
+    def __repr__(self):
+        return f'<NotificationFanout {self.fanout_id} {self.status}>'
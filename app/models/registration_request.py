@@ -1,9 +1,10 @@
+from datetime import datetime
 from app import db
 
 class RegistrationRequest(db.Model):
     request_id = db.Column(db.Integer, primary_key=True)
     manager_name = db.Column(db.String(100), nullable=False)
-    manager_email = db.Column(db.String(100), nullable=False)
+    manager_email = db.Column(db.String(100), nullable=False, index=True)
     manager_position = db.Column(db.String(100), nullable=False)
     organization_name = db.Column(db.String(200), nullable=False)
     latitude = db.Column(db.Float, nullable=False)  # Replacing organization_address
@@ -12,6 +13,11 @@ class RegistrationRequest(db.Model):
     start_hour = db.Column(db.String(10), nullable=False)  # Replacing operating_hours_m
     close_hour = db.Column(db.String(10), nullable=False)  # Replacing operating_hours_m
     request_status = db.Column(db.String(50), default="Pending")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_registration_request_status_id', 'request_status', 'request_id'),
+    )
 
     def __repr__(self):
         return f'<RegistrationRequest {self.organization_name}>'
\ No newline at end of file
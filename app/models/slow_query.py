@@ -0,0 +1,22 @@
+from datetime import datetime
+from app import db
+
+class SlowQuery(db.Model):
+    # One row per distinct normalized statement; only the slowest SLOW_QUERY_TOP_N by total time are kept
+    fingerprint = db.Column(db.String(40), primary_key=True)  # sha1 of the normalized SQL
+    statement = db.Column(db.Text, nullable=False)  # Normalized SQL
+    route = db.Column(db.String(200), nullable=True)  # Endpoint that last ran it slowly
+    calls = db.Column(db.Integer, nullable=False, default=0)
+    total_ms = db.Column(db.Float, nullable=False, default=0)
+    max_ms = db.Column(db.Float, nullable=False, default=0)
+    sample_parameters = db.Column(db.Text, nullable=True)
+    plan = db.Column(db.Text, nullable=True)  # Captured once per statement
+    first_seen = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_slow_query_total', 'total_ms'),
+    )
+
+    def __repr__(self):
+        return f'<SlowQuery {self.fingerprint} {self.total_ms:.0f} ms>'
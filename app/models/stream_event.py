@@ -0,0 +1,20 @@
+from datetime import datetime
+from app import db
+
+class StreamEvent(db.Model):
+    # Outbox of changes pushed to /donor/stream and /staff/stream. Written in the transaction of the
+    # change, read back by every worker, and replayed to clients that resume with Last-Event-ID.
+    event_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. "blood_need.created", "appointment.opened"
+    blood_bank_id = db.Column(db.Integer, nullable=False)
+    donor_id = db.Column(db.Integer, nullable=True)  # The donor it concerns, if any
+    payload = db.Column(db.Text, nullable=False)  # JSON sent as the event's data
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_stream_event_created_at', 'created_at'),
+        {'sqlite_autoincrement': True},  # IDs are never reused after pruning, so Last-Event-ID stays meaningful
+    )
+
+    def __repr__(self):
+        return f'<StreamEvent {self.event_id} {self.kind}>'
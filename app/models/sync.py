@@ -0,0 +1,68 @@
+from datetime import datetime
+from sqlalchemy import DDL, event
+from app import db
+
+# Row ID of the single sync_clock row in each database
+CLOCK_ID = 1
+
+
+class SyncClock(db.Model):
+    # One row per database: the last version handed out, and the newest tombstone version pruned
+    clock_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    pruned_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<SyncClock {self.version}>'
+
+
+class SyncTombstone(db.Model):
+    # Written by the delete triggers of the tracked tables, see track_changes()
+    tombstone_id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    blood_bank_id = db.Column(db.Integer, nullable=True)
+    version = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_sync_tombstone_version', 'version'),
+    )
+
+    def __repr__(self):
+        return f'<SyncTombstone {self.table_name} {self.row_id}>'
+
+
+event.listen(SyncClock.__table__, 'after_create', DDL(
+    f"INSERT INTO sync_clock (clock_id, version, pruned_version) VALUES ({CLOCK_ID}, 0, 0)"
+))
+
+
+def track_changes(model, bank_column=None):
+    """Stamp every insert and update of `model` with the next version of its database's sync
+    clock, and record deletes as tombstones. Done by triggers, so bulk statements are covered too.
+
+    The model needs an indexed `version` column. The trigger statements are kept in
+    `table.info['triggers']` for app/migrations.py to add to existing databases.
+    """
+    table = model.__table__
+    name = table.name
+    row_id = next(iter(table.primary_key.columns)).name
+    bank = f"OLD.{bank_column}" if bank_column else "NULL"
+    tick = f"UPDATE sync_clock SET version = version + 1 WHERE clock_id = {CLOCK_ID};"
+    stamp = (f"UPDATE {name} SET version = (SELECT version FROM sync_clock WHERE clock_id = {CLOCK_ID}) "
+             f"WHERE {row_id} = NEW.{row_id};")
+    table.info['triggers'] = {
+        f'sync_{name}_insert': f"CREATE TRIGGER IF NOT EXISTS sync_{name}_insert AFTER INSERT ON {name} "
+                               f"BEGIN {tick} {stamp} END",
+        # The stamp itself changes the version, so it does not fire this trigger again
+        f'sync_{name}_update': f"CREATE TRIGGER IF NOT EXISTS sync_{name}_update AFTER UPDATE ON {name} "
+                               f"WHEN NEW.version = OLD.version BEGIN {tick} {stamp} END",
+        f'sync_{name}_delete': f"CREATE TRIGGER IF NOT EXISTS sync_{name}_delete AFTER DELETE ON {name} "
+                               f"BEGIN {tick} INSERT INTO sync_tombstone "
+                               f"(table_name, row_id, blood_bank_id, version, deleted_at) "
+                               f"SELECT '{name}', OLD.{row_id}, {bank}, version, CURRENT_TIMESTAMP "
+                               f"FROM sync_clock WHERE clock_id = {CLOCK_ID}; END",
+    }
+    for ddl in table.info['triggers'].values():
+        event.listen(table, 'after_create', DDL(ddl).execute_if(dialect='sqlite'))
@@ -18,7 +18,7 @@ class User(db.Model):
 class Donor(User):
     weight = db.Column(db.Float, nullable=False)
     id_number = db.Column(db.String(200), nullable=False)
-    blood_group = db.Column(db.String(10), nullable=False)
+    blood_group = db.Column(db.String(10), nullable=False, index=True)
     ranking_points = db.Column(db.Integer, default=0)
 
     # Relationships
@@ -40,14 +40,14 @@ class Admin(User):
 
 
 class Manager(User):
-    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False)
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False, index=True)
 
     def __repr__(self):
         return f'<Manager {self.username}>'
 
 
 class StaffMember(User):
-    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False)
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_bank.blood_bank_id'), nullable=False, index=True)
     role = db.Column(db.String(200), nullable=False)
 
     def __repr__(self):
@@ -6,7 +6,7 @@ class Volunteering(db.Model):
     applied_at = db.Column(db.DateTime, default=datetime.utcnow)  # Application timestamp
 
     # Relationships
-    donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False)
+    donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False, index=True)
     donor = db.relationship('Donor', backref=db.backref('volunteering_applications', lazy=True))
 
     def __repr__(self):
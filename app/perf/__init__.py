@@ -0,0 +1 @@
+# Performance tooling: synthetic data, route scenarios and the checks and benchmarks built on them
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app, db
+from app.perf.scenarios import request_kwargs
+from app.perf.synthetic import generate
+from app.services.analytics import analytics_cache
+from app.services.compression import snapshot_cache
+from app.services.shards import shards as shard_router
+
+
+def tooling_app(database_path=None, shards=0, **config):
+    """A separate app bound to its own throwaway SQLite file, with email and audit side effects off.
+
+    With `shards`, bank-scoped tables are also spread over that many shard files next to it. Without
+    `database_path`, the files go in a temporary directory removed once the app is garbage collected
+    or the process exits.
+    """
+    directory = None
+    if database_path is None:
+        directory = tempfile.TemporaryDirectory(prefix='bloodline-perf-', ignore_cleanup_errors=True)
+        database_path = os.path.join(directory.name, 'perf.db')
+    stem = os.path.splitext(database_path)[0]
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + database_path,
+        'SHARD_URIS': [f'sqlite:///{stem}-shard{number}.db' for number in range(1, shards + 1)],
+        'METRICS_DIR': os.path.join(os.path.dirname(database_path), 'metrics'),
+        'PROFILER_DIR': os.path.join(os.path.dirname(database_path), 'profiles'),
+        'SECRET_KEY': 'perf',
+        'JWT_SECRET_KEY': 'perf-tooling-secret-key-0123456789abcdef',
+        'TESTING': True,
+        'MAIL_SUPPRESS_SEND': True,
+        'MAIL_DEFAULT_SENDER': 'perf@bloodline.test',
+        'AUDIT_ENABLED': False,
+        'NOTIFICATIONS_ENABLED': False,
+        'ARCHIVE_INTERVAL': 0,
+        'STREAM_MAX_DURATION': 0,  # Streams send their replay and close instead of waiting for events
+    }
+    settings.update(config)
+    app = create_app(settings)
+    app.extensions['perf_directory'] = directory  # Lives as long as the app
+    return app
+
+
+def seeded_app(scale=None, database_path=None, shards=0, **config):
+    """Create a tooling app, generate a synthetic dataset into it and return (app, fixture)."""
+    app = tooling_app(database_path, shards, **config)
+    # Cached analytics and snapshots from a previous dataset in this process must not leak into this one
+    analytics_cache.invalidate()
+    snapshot_cache.invalidate()
+    with app.app_context():
+        db.create_all()
+        shard_router.upgrade(log=lambda message: None)
+        fixture = generate(scale)
+    return app, fixture
+
+
+class StatementRecorder:
+    """Collects every statement the app's engines execute while active."""
+
+    def __init__(self):
+        self.statements = []
+        self.active = False
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.statements.append((statement, parameters, executemany))
+
+    @contextmanager
+    def attached(self, app):
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        try:
+            yield self
+        finally:
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    @contextmanager
+    def recording(self):
+        self.statements = []
+        self.active = True
+        try:
+            yield self.statements
+        finally:
+            self.active = False
+
+
+def prepare(app, scenario, fixture, tokens):
+    """Run the scenario's setup and build its test client arguments."""
+    with app.app_context():
+        return request_kwargs(scenario, fixture, tokens)
+
+
+def issue(client, kwargs):
+    kwargs = dict(kwargs)
+    method = kwargs.pop('method')
+    path = kwargs.pop('path')
+    return client.open(path, method=method, **kwargs)
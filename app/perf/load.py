@@ -0,0 +1,256 @@
+import json
+import platform
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import asdict, replace
+from datetime import datetime
+from app.perf.harness import issue, prepare
+from app.perf.scenarios import SCENARIOS
+
+# Relative request weights per endpoint. Writes that every client can repeat safely are included;
+# scenarios that act on one shared row (booking for a fixed donor, logout, password resets) are not.
+TRAFFIC_PROFILES = {
+    'mobile': {
+        'donor.get_blood_banks': 10,
+        'donor.get_blood_bank_needs': 15,
+        'donor.get_blood_bank_events': 15,
+        'donor.get_followed_blood_banks': 8,
+        'donor.donation_history': 8,
+        'donor.check_pending_appointment': 8,
+        'donor.get_faqs': 4,
+        'donor.get_donor_name': 6,
+        'staff.get_volunteering_status': 4,
+        'auth.get_user_profile': 6,
+        'donor.update_donor_profile': 2,
+        'donor.toggle_volunteering': 1,
+        'auth.login': 1,
+    },
+    'desktop': {
+        'staff.get_today_appointments': 15,
+        'staff.get_donors': 12,
+        'staff.get_blood_inventory': 10,
+        'staff.get_events': 6,
+        'staff.get_volunteers': 4,
+        'auth.get_user_data': 8,
+        'manager.get_staff': 3,
+        'manager.manage_contact_us': 2,
+        'admin_bp.get_registration_requests': 2,
+        'admin_bp.analytics_donations': 1,
+        'admin_bp.analytics_blood_types': 1,
+        'admin_bp.analytics_inventory': 1,
+        'staff.open_appointment': 3,
+        'staff.complete_appointment': 3,
+        'staff.take_blood_unit': 2,
+        'staff.create_event': 1,
+        'staff.create_blood_need': 1,
+    },
+}
+TRAFFIC_PROFILES['mixed'] = {
+    **{endpoint: weight * 3 for endpoint, weight in TRAFFIC_PROFILES['mobile'].items()},
+    **TRAFFIC_PROFILES['desktop'],
+}
+
+
+def _weighted_scenarios(profile):
+    weights = TRAFFIC_PROFILES[profile]
+    scenarios, scenario_weights = [], []
+    for scenario in SCENARIOS:
+        if scenario.endpoint not in weights:
+            continue
+        # Variants of one endpoint share its weight
+        variants = sum(1 for other in SCENARIOS if other.endpoint == scenario.endpoint and other.method == scenario.method)
+        scenarios.append(scenario)
+        scenario_weights.append(weights[scenario.endpoint] / variants)
+    return scenarios, scenario_weights
+
+
+def _persona(fixture, index):
+    # Each client acts as its own donor, staff member and manager so writes do not all hit one row
+    bank_index = index % len(fixture.bank_ids)
+    return replace(
+        fixture,
+        donor_id=fixture.donor_ids[index % max(1, len(fixture.donor_ids) - 10)],
+        staff_id=fixture.staff_ids[index % len(fixture.staff_ids)],
+        manager_id=fixture.manager_ids[bank_index],
+        bank_id=fixture.bank_ids[bank_index]
+    )
+
+
+def scenario_key(scenario):
+    return f"{scenario.method} {scenario.endpoint}"
+
+
+class HttpClient:
+    """Minimal stand-in for the Flask test client that sends requests to a running server."""
+
+    class Response:
+        def __init__(self, status_code, body):
+            self.status_code = status_code
+            self.data = body
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def open(self, path, method='GET', headers=None, query_string=None, json=None):
+        url = self.base_url + path
+        if query_string:
+            url += '?' + urllib.parse.urlencode(query_string)
+        headers = dict(headers or {})
+        data = None
+        if json is not None:
+            data = _json_dumps(json)
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(url, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return self.Response(response.status, response.read())
+        except urllib.error.HTTPError as e:
+            return self.Response(e.code, e.read())
+
+
+def _json_dumps(value):
+    return json.dumps(value).encode('utf-8')
+
+
+def run(app, fixture, profile='mixed', clients=8, duration=10.0, base_url=None, seed=0):
+    """Drive weighted traffic from `clients` concurrent threads for `duration` seconds.
+
+    Requests go through the app's test client, or to `base_url` when given. Scenario setups and
+    tokens always use `app`, so against a real server it must share the server's database and
+    JWT secret. Returns the latency samples as {key: [(seconds, status), ...]} and the wall time.
+    """
+    scenarios, weights = _weighted_scenarios(profile)
+    samples = {}
+    samples_lock = threading.Lock()
+    tokens = {}
+    failures = []
+    deadline = time.perf_counter() + duration
+
+    def client_loop(index):
+        rng = random.Random(seed * 1000 + index)
+        persona = _persona(fixture, index)
+        client = HttpClient(base_url) if base_url else app.test_client()
+        local = {}
+        try:
+            while time.perf_counter() < deadline:
+                scenario = rng.choices(scenarios, weights)[0]
+                kwargs = prepare(app, scenario, persona, tokens)
+                started = time.perf_counter()
+                try:
+                    status = issue(client, kwargs).status_code
+                except OSError:
+                    status = 0  # Connection refused, reset or timed out
+                local.setdefault(scenario_key(scenario), []).append((time.perf_counter() - started, status))
+        except Exception as e:
+            failures.append(e)
+        with samples_lock:
+            for key, values in local.items():
+                samples.setdefault(key, []).extend(values)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client_loop, args=(i,), name=f'load-client-{i}') for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if failures:
+        raise failures[0]
+    return samples, elapsed
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _stats(values, elapsed):
+    latencies = sorted(seconds * 1000 for seconds, _ in values)
+    errors = sum(1 for _, status in values if status == 0 or status >= 500)
+    client_errors = sum(1 for _, status in values if 400 <= status < 500)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'client_errors': client_errors,
+        'throughput_rps': round(len(values) / elapsed, 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+    }
+
+
+def summarize(samples, elapsed, **meta):
+    """Machine-readable results: per-endpoint and overall latency percentiles and throughput."""
+    everything = [value for values in samples.values() for value in values]
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'elapsed_s': round(elapsed, 3),
+            **meta
+        },
+        'total': _stats(everything, elapsed) if everything else {},
+        'endpoints': {key: _stats(values, elapsed) for key, values in sorted(samples.items())},
+    }
+
+
+def compare(results, baseline, tolerance=0.25, floor_ms=2.0, min_requests=20):
+    """Regressions of `results` against `baseline` as a list of messages.
+
+    An endpoint regresses when its p95 grows by more than `tolerance` (and by more than `floor_ms`,
+    so sub-millisecond noise is ignored) or when it starts returning server errors. Endpoints with
+    fewer than `min_requests` samples in either run are too noisy to compare on latency. Overall
+    throughput regresses when it drops by more than `tolerance`.
+    """
+    regressions = []
+    for key, base in baseline.get('endpoints', {}).items():
+        current = results['endpoints'].get(key)
+        if current is None:
+            continue
+        enough = min(current['requests'], base['requests']) >= min_requests
+        if enough and current['p95_ms'] > base['p95_ms'] * (1 + tolerance) and current['p95_ms'] - base['p95_ms'] > floor_ms:
+            regressions.append(f"{key}: p95 {base['p95_ms']:.1f} ms -> {current['p95_ms']:.1f} ms")
+        if current['errors'] and not base['errors']:
+            regressions.append(f"{key}: {current['errors']} server errors (baseline had none)")
+
+    base_total, total = baseline.get('total') or {}, results.get('total') or {}
+    if base_total and total and total['throughput_rps'] < base_total['throughput_rps'] * (1 - tolerance):
+        regressions.append(
+            f"total throughput {base_total['throughput_rps']:.1f} rps -> {total['throughput_rps']:.1f} rps"
+        )
+    return regressions
+
+
+def format_table(results):
+    lines = [f"{'endpoint':<52} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"]
+    rows = list(results['endpoints'].items())
+    if results['total']:
+        rows.append(('TOTAL', results['total']))  # Empty when the run recorded no requests
+    for key, stats in rows:
+        lines.append(
+            f"{key:<52} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        )
+    return '\n'.join(lines)
+
+
+def save_fixture(fixture, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(asdict(fixture), f)
+
+
+def load_fixture(path):
+    from app.perf.synthetic import Fixture
+
+    with open(path, encoding='utf-8') as f:
+        return Fixture(**json.load(f))
@@ -0,0 +1,86 @@
+import json
+import os
+from collections import Counter
+from app.perf.harness import StatementRecorder, issue, prepare, seeded_app
+from app.perf.scenarios import SCENARIOS
+from app.perf.synthetic import Scale
+from app.services.slow_queries import normalize_sql
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+# The two dataset sizes every scenario runs against; counts must not differ between them
+SMALL = Scale.from_factor(0.4)
+LARGE = Scale.from_factor(2.0)
+
+
+def scenario_keys(scenarios=SCENARIOS):
+    """Stable, unique labels for the scenarios: "METHOD endpoint", numbered when an endpoint has variants."""
+    keys, seen = [], Counter()
+    for scenario in scenarios:
+        base = f"{scenario.method} {scenario.endpoint}"
+        seen[base] += 1
+        keys.append(base if seen[base] == 1 else f"{base} #{seen[base]}")
+    return keys
+
+
+def measure(scale):
+    """Run every scenario once against a fresh dataset of `scale` and count the statements each issued.
+
+    Returns {key: Counter(normalized SQL -> executions)}.
+    """
+    app, fixture = seeded_app(scale)
+    client = app.test_client()
+    recorder = StatementRecorder()
+    tokens = {}
+    counts = {}
+
+    with recorder.attached(app):
+        for key, scenario in zip(scenario_keys(), SCENARIOS):
+            kwargs = prepare(app, scenario, fixture, tokens)
+            with recorder.recording() as statements:
+                issue(client, kwargs)
+            counts[key] = Counter(normalize_sql(statement) for statement, _, _ in statements)
+
+    return counts
+
+
+def load_budgets(path=BUDGETS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_budgets(counts, path=BUDGETS_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({key: sum(counter.values()) for key, counter in counts.items()}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def check(small, large, budgets):
+    """Compare the two runs and the budgets. Returns a list of (key, reason, offending statements)."""
+    failures = []
+    for key, large_counter in large.items():
+        small_counter = small.get(key, Counter())
+        small_total, large_total = sum(small_counter.values()), sum(large_counter.values())
+
+        if large_total > small_total:
+            # Statements whose count followed the data size are the N+1 suspects
+            grown = Counter({sql: n for sql, n in large_counter.items() if n > small_counter.get(sql, 0)})
+            failures.append((key, f"{small_total} statements on the small dataset, {large_total} on the large one",
+                             grown))
+
+        budget = budgets.get(key)
+        if budget is None:
+            failures.append((key, f"no budget checked in ({large_total} statements)", large_counter))
+        elif large_total > budget:
+            failures.append((key, f"{large_total} statements, budget is {budget}", large_counter))
+
+    return failures
+
+
+def format_failure(key, reason, statements):
+    lines = [f"{key}: {reason}"]
+    for sql, n in statements.most_common():
+        lines.append(f"    {n:>4} x {sql}")
+    return '\n'.join(lines)
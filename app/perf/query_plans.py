@@ -0,0 +1,67 @@
+from app import db
+from app.perf.harness import StatementRecorder, issue, prepare, seeded_app
+from app.perf.scenarios import SCENARIOS, uncovered_endpoints
+from app.perf.synthetic import Scale
+from app.services.slow_queries import normalize_sql
+
+# Full scans that are intended: the endpoint returns (or aggregates) the whole table, or reads
+# one of the small per-network tables. Adding to this list is a reviewed decision.
+ALLOWED_FULL_SCANS = {
+    ('donor.get_blood_banks', 'blood_bank'),
+    ('donor.get_faqs', 'faq'),
+    ('staff.get_volunteers', 'volunteering'),
+    ('admin_bp.analytics_donations', 'blood_bank'),
+    ('admin_bp.analytics_demographics', 'donor'),
+    ('admin_bp.analytics_inventory', 'blood_inventory'),
+}
+
+
+def full_scans(connection, statement, parameters):
+    """Tables that EXPLAIN QUERY PLAN reports as scanned without an index."""
+    plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    tables = []
+    for row in plan:
+        detail = row[-1]
+        # "SCAN appointment" is a full scan; "SCAN t USING [COVERING] INDEX" and "SEARCH" are not
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            name = detail.split()[1]
+            if not name.startswith('(') and name != 'CONSTANT':
+                tables.append(name)
+    return tables
+
+
+def check(scale=None, log=print):
+    """Run every scenario, EXPLAIN each statement it issued and return the disallowed full scans."""
+    app, fixture = seeded_app(scale or Scale())
+    client = app.test_client()
+    recorder = StatementRecorder()
+    tokens = {}
+    failures = []
+    explained = set()
+
+    with recorder.attached(app):
+        for scenario in SCENARIOS:
+            kwargs = prepare(app, scenario, fixture, tokens)
+            with recorder.recording() as statements:
+                response = issue(client, kwargs)
+            if response.status_code >= 500:
+                log(f"warning: {scenario.method} {kwargs['path']} returned {response.status_code}")
+
+            with app.app_context(), db.engine.connect() as connection:
+                for statement, parameters, executemany in statements:
+                    verb = statement.lstrip().split(None, 1)[0].upper()
+                    if executemany or verb not in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+                        continue
+                    key = (scenario.endpoint, normalize_sql(statement))
+                    if key in explained:
+                        continue
+                    explained.add(key)
+
+                    for table in full_scans(connection, statement, parameters):
+                        if (scenario.endpoint, table) not in ALLOWED_FULL_SCANS:
+                            failures.append((scenario.endpoint, table, normalize_sql(statement)))
+
+    for endpoint in uncovered_endpoints(app):
+        log(f"warning: no scenario covers {endpoint}")
+
+    return failures
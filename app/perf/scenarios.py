@@ -0,0 +1,312 @@
+import itertools
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Optional
+from flask import current_app
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models import (
+    Appointment, BloodInventory, Donor, DonorBloodBank, EmailVerification, Event, FAQ, RegistrationRequest, StaffMember
+)
+from app.perf.synthetic import PASSWORD
+from app.services import eligibility
+from app.services.shards import shards
+
+_unique = itertools.count(1)
+
+
+@dataclass
+class Scenario:
+    """One representative request against a route, made as a user of the given role."""
+    endpoint: str
+    method: str
+    path: str
+    role: Optional[str] = None
+    json: Optional[Callable] = None
+    headers: Optional[Callable] = None  # Extra request headers, built like json
+    query: dict = field(default_factory=dict)
+    setup: Optional[Callable] = None
+    user: Optional[Callable] = None
+    mutates: bool = False
+    fresh_token: bool = False  # For scenarios that revoke the token they use
+
+    def build(self, fixture):
+        """Run the setup (inside an app context) and return (user_id, path, query, json, headers)."""
+        ctx = dict(vars(fixture))
+        if self.setup:
+            ctx.update(self.setup(fixture) or {})
+            db.session.commit()
+        ctx['n'] = next(_unique)
+
+        if self.user:
+            user_id = self.user(ctx)
+        else:
+            user_id = {
+                'admin': fixture.admin_id, 'manager': fixture.manager_id,
+                'staff': fixture.staff_id, 'donor': fixture.donor_id
+            }.get(self.role)
+
+        body = self.json(ctx) if self.json else None
+        headers = self.headers(ctx) if self.headers else {}
+        return user_id, self.path.format(**ctx), self.query, body, headers
+
+
+def token_for(user_id):
+    return create_access_token(identity=str(user_id))
+
+
+def request_kwargs(scenario, fixture, tokens):
+    """Keyword arguments for a Flask test client (or requests) call of the scenario."""
+    user_id, path, query, body, headers = scenario.build(fixture)
+    headers = dict(headers)
+    if user_id is not None:
+        if scenario.fresh_token:
+            token = token_for(user_id)
+        else:
+            token = tokens.get(user_id) or tokens.setdefault(user_id, token_for(user_id))
+        headers['Authorization'] = f"Bearer {token}"
+    kwargs = {'method': scenario.method, 'path': path, 'headers': headers, 'query_string': query}
+    if body is not None:
+        kwargs['json'] = body
+    return kwargs
+
+
+# Setup helpers create the rows a mutating scenario consumes, so every run starts from a valid state
+
+def _today_appointment(status):
+    def setup(fixture):
+        staff = db.session.get(StaffMember, fixture.staff_id)
+        appointment = Appointment(
+            donor_id=fixture.donor_ids[-1], blood_bank_id=staff.blood_bank_id, appointment_date=date.today(),
+            appointment_time=time(10), status=status, donation_type="Whole Blood"
+        )
+        db.session.add(appointment)
+        db.session.flush()
+        return {'appointment_id': appointment.appointment_id}
+    return setup
+
+
+def _staff_event(fixture):
+    staff = db.session.get(StaffMember, fixture.staff_id)
+    event = Event(title="Drive", description="Drive", event_date=date.today() + timedelta(days=3),
+                  event_time=time(10), location="Hall", blood_bank_id=staff.blood_bank_id)
+    db.session.add(event)
+    db.session.flush()
+    return {'event_id': event.event_id}
+
+
+def _faq(fixture):
+    faq = FAQ(question="Temporary?", answer="Yes.", created_by=fixture.admin_id)
+    db.session.add(faq)
+    db.session.flush()
+    return {'faq_id': faq.faq_id}
+
+
+def _bank_staff(fixture):
+    staff_id = 390000 + next(_unique)
+    db.session.add(StaffMember(id=staff_id, username="Temp", email=f"temp{staff_id}@bloodline.test",
+                               password="x", role="Nurse", blood_bank_id=fixture.bank_id))
+    return {'delete_staff_id': staff_id}
+
+
+def _registration_requests(count):
+    def setup(fixture):
+        ids = []
+        for _ in range(count):
+            n = next(_unique)
+            req = RegistrationRequest(
+                manager_name="Applicant", manager_email=f"applicant-s{n}@bloodline.test", manager_position="Director",
+                organization_name=f"Clinic {n}", latitude=31.9, longitude=35.9, contact_info="0600000000",
+                start_hour="08:00", close_hour="16:00", request_status="Pending", created_at=datetime.utcnow()
+            )
+            db.session.add(req)
+            db.session.flush()
+            ids.append(req.request_id)
+        return {'request_id': ids[0], 'request_ids': ids}
+    return setup
+
+
+def _verification(fixture):
+    db.session.add(EmailVerification(email="verify@bloodline.test", code="12345"))
+
+
+def _no_pending(fixture):
+    shards.gather(Appointment.query.filter_by(donor_id=fixture.donor_ids[-2], status="Pending").delete)
+
+
+def _pending_for_delete(fixture):
+    donor_id = fixture.donor_ids[-3]
+    if not any(shards.gather(Appointment.query.filter_by(donor_id=donor_id, status="Pending").first)):
+        db.session.add(Appointment(donor_id=donor_id, blood_bank_id=fixture.bank_id, appointment_date=date.today(),
+                                   appointment_time=time(11), status="Pending", donation_type="Whole Blood"))
+
+
+def _unfollowed(fixture):
+    DonorBloodBank.query.filter_by(donor_id=fixture.donor_id, blood_bank_id=fixture.bank_ids[-1]).delete()
+    eligibility.record_unfollow(db.session.get(Donor, fixture.donor_id), fixture.bank_ids[-1])
+
+
+def _followed(fixture):
+    if not db.session.get(DonorBloodBank, (fixture.donor_id, fixture.bank_ids[-1])):
+        db.session.add(DonorBloodBank(donor_id=fixture.donor_id, blood_bank_id=fixture.bank_ids[-1]))
+        eligibility.record_follow(db.session.get(Donor, fixture.donor_id), fixture.bank_ids[-1])
+
+
+def _profile(fixture):
+    directory = current_app.config['PROFILER_DIR']
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'request-0-perf-00000000.folded'), 'w', encoding='utf-8') as f:
+        f.write("wsgi_app (app.py:1);get_donors (staff_routes.py:1) 3\n")
+    return {'profile_id': 'request-0-perf-00000000'}
+
+
+def _stocked(fixture):
+    staff = db.session.get(StaffMember, fixture.staff_id)
+    item = BloodInventory.query.filter_by(blood_bank_ID=staff.blood_bank_id, Blood_Type="O+").first()
+    item.Quantity = max(item.Quantity, 10)
+
+
+# Ordered so that reads run before the writes and deletes that change their data, and logout last
+SCENARIOS = [
+    # Public and auth
+    Scenario('auth.login', 'POST', '/login',
+             json=lambda c: {'email': f"donor{c['donor_id']}@bloodline.test", 'password': PASSWORD}),
+    Scenario('auth.get_user_profile', 'GET', '/user/profile', 'donor'),
+    Scenario('auth.get_user_data', 'GET', '/get_user_data', 'staff'),
+    Scenario('auth.get_user_data', 'GET', '/get_user_data', 'admin'),
+
+    # Mobile (donor) reads
+    Scenario('donor.get_blood_banks', 'GET', '/blood_banks', 'donor'),
+    Scenario('donor.check_pending_appointment', 'GET', '/check_pending_appointment', 'donor', mutates=True),
+    Scenario('donor.get_followed_blood_banks', 'GET', '/donor/followed_blood_banks', 'donor'),
+    Scenario('donor.get_faqs', 'GET', '/donor/faqs', 'donor'),
+    Scenario('donor.donation_history', 'GET', '/donation_history', 'donor'),
+    Scenario('donor.get_blood_bank_events', 'GET', '/blood_bank_events', 'donor'),
+    Scenario('donor.get_blood_bank_needs', 'GET', '/blood_bank_needs', 'donor', mutates=True),
+    Scenario('donor.get_donor_name', 'GET', '/get_donor_name', 'donor'),
+    Scenario('donor.get_notifications', 'GET', '/donor/notifications', 'donor'),
+    Scenario('donor.stream_updates', 'GET', '/donor/stream', 'donor', query={'last_event_id': 0}),
+    Scenario('sync.sync_changes', 'GET', '/sync', 'donor'),
+    Scenario('staff.get_volunteering_status', 'GET', '/volunteering_status', 'donor'),
+
+    # Desktop reads
+    Scenario('staff.get_blood_inventory', 'GET', '/blood_inventory', 'staff'),
+    Scenario('staff.get_today_appointments', 'POST', '/staff/today_appointments', 'staff',
+             json=lambda c: {'page': 'Appointmen'}),
+    Scenario('staff.get_today_appointments', 'POST', '/staff/today_appointments', 'staff',
+             json=lambda c: {'page': 'Donation'}),
+    Scenario('staff.stream_updates', 'GET', '/staff/stream', 'staff', query={'last_event_id': 0}),
+    Scenario('sync.sync_changes', 'GET', '/sync', 'staff'),
+    Scenario('staff.get_donors', 'GET', '/donors', 'staff'),
+    Scenario('staff.get_donors', 'GET', '/donors', 'staff', query={'blood_type': 'O+', 'page': 2}),
+    Scenario('staff.get_eligible_donors', 'GET', '/staff/eligible_donors', 'staff', query={'blood_type': 'A+'}),
+    Scenario('staff.get_volunteers', 'GET', '/volunteers', 'staff'),
+    Scenario('staff.get_events', 'GET', '/get/events', 'staff', mutates=True),
+    Scenario('batch.run_batch', 'POST', '/batch', 'staff', json=lambda c: {'requests': [
+        {'path': '/blood_inventory'}, {'method': 'POST', 'path': '/staff/today_appointments', 'body': {'page': 'Appointmen'}},
+        {'path': '/get_user_data'}, {'path': '/donors'}
+    ]}),
+    Scenario('manager.get_staff', 'GET', '/get-staff', 'manager'),
+    Scenario('manager.manage_contact_us', 'GET', '/desktop/contactus', 'manager'),
+    Scenario('manager.export_bank_data', 'GET', '/manager/export/donations', 'manager'),
+    Scenario('manager.export_bank_data', 'GET', '/manager/export/appointments', 'manager',
+             query={'format': 'ndjson', 'from': '2025-01-01', 'to': '2025-12-31'}),
+    Scenario('manager.export_bank_data', 'GET', '/manager/export/inventory', 'manager'),
+    Scenario('admin_bp.get_registration_requests', 'GET', '/admin/get_registration_requests', 'admin'),
+    Scenario('admin_bp.get_audit_events', 'GET', '/admin/audit', 'admin', query={'blood_bank_id': 1}),
+    Scenario('admin_bp.get_slow_queries', 'GET', '/admin/slow_queries', 'admin'),
+    Scenario('sync.sync_changes', 'GET', '/sync', 'admin'),
+    Scenario('admin_bp.export_data', 'GET', '/admin/export/donations', 'admin', query={'from': '2025-06-01'}),
+    Scenario('admin_bp.export_data', 'GET', '/admin/export/appointments', 'admin', query={'format': 'ndjson', 'blood_bank_id': 1}),
+    Scenario('admin_bp.export_data', 'GET', '/admin/export/inventory', 'admin', query={'to': '2027-01-01'}),
+    Scenario('admin_bp.get_profiles', 'GET', '/admin/profiles', 'admin', setup=_profile),
+    Scenario('admin_bp.get_profile', 'GET', '/admin/profiles/{profile_id}', 'admin', setup=_profile),
+    Scenario('admin_bp.analytics_donations', 'GET', '/admin/analytics/donations', 'admin'),
+    Scenario('admin_bp.analytics_blood_types', 'GET', '/admin/analytics/blood_types', 'admin'),
+    Scenario('admin_bp.analytics_demographics', 'GET', '/admin/analytics/demographics', 'admin'),
+    Scenario('admin_bp.analytics_inventory', 'GET', '/admin/analytics/inventory', 'admin'),
+    Scenario('metrics', 'GET', '/metrics'),
+
+    # Mobile writes
+    Scenario('donor.create_donor', 'POST', '/create_donor', mutates=True,
+             json=lambda c: {'username': 'New donor', 'email': f"new{c['n']}@bloodline.test", 'password': PASSWORD,
+                             'weight': 70, 'id_number': '1234567890', 'blood_group': 'A+', 'barth': '1990-01-01'}),
+    Scenario('donor.book_appointment', 'POST', '/book_appointment', setup=_no_pending, mutates=True,
+             user=lambda c: c['donor_ids'][-2],
+             json=lambda c: {'blood_bank_id': c['bank_id'], 'appointment_date': date.today().strftime('%Y-%m-%d'),
+                             'appointment_time': '09:30', 'donation_type': 'Whole Blood', 'diseases': ['Asthma']}),
+    Scenario('donor.delete_appointment', 'DELETE', '/delete_appointment', setup=_pending_for_delete, mutates=True,
+             user=lambda c: c['donor_ids'][-3]),
+    Scenario('donor.follow_blood_bank', 'POST', '/donor/follow_blood_bank', 'donor', setup=_unfollowed, mutates=True,
+             json=lambda c: {'blood_bank_id': c['bank_ids'][-1]}),
+    Scenario('donor.unfollow_blood_bank', 'POST', '/donor/unfollow_blood_bank', 'donor', setup=_followed, mutates=True,
+             json=lambda c: {'blood_bank_id': c['bank_ids'][-1]}),
+    Scenario('donor.toggle_volunteering', 'POST', '/toggle_volunteering', 'donor', mutates=True),
+    Scenario('donor.mark_notifications_read', 'POST', '/donor/notifications/read', 'donor', mutates=True, json=lambda c: {}),
+    Scenario('donor.update_donor_profile', 'PUT', '/update_donor_profile', 'donor', mutates=True,
+             json=lambda c: {'phone_number': '0790000000'}),
+
+    # Desktop writes
+    Scenario('staff.take_blood_unit', 'POST', '/blood_inventory/take', 'staff', setup=_stocked, mutates=True,
+             json=lambda c: {'blood_type': 'O+', 'quantity': 1}),
+    Scenario('staff.take_blood_unit', 'POST', '/blood_inventory/take', 'staff', setup=_stocked, mutates=True,
+             json=lambda c: {'blood_type': 'O+', 'quantity': 1}, headers=lambda c: {'Idempotency-Key': f"take-{c['n']}"}),
+    Scenario('staff.open_appointment', 'POST', '/staff/open_appointment', 'staff', setup=_today_appointment('Pending'),
+             mutates=True, json=lambda c: {'appointment_id': c['appointment_id'], 'state': 'open'}),
+    Scenario('staff.complete_appointment', 'POST', '/complete_appointment/{appointment_id}', 'staff',
+             setup=_today_appointment('Open'), mutates=True,
+             json=lambda c: {'blood_type': 'O+', 'quantity_donated': 1, 'donor_blood_pulse': 72,
+                             'donor_temperature': 36.8, 'blood_pressure': '120/80'}),
+    Scenario('staff.complete_appointment', 'POST', '/complete_appointment/{appointment_id}', 'staff',
+             setup=_today_appointment('Open'), mutates=True, headers=lambda c: {'Idempotency-Key': f"complete-{c['n']}"},
+             json=lambda c: {'blood_type': 'O+', 'quantity_donated': 1, 'donor_blood_pulse': 72,
+                             'donor_temperature': 36.8, 'blood_pressure': '120/80'}),
+    Scenario('staff.create_event', 'POST', '/events', 'staff', mutates=True,
+             json=lambda c: {'title': 'Drive', 'description': 'Drive', 'location': 'Hall', 'event_time': '10:00',
+                             'event_date': (date.today() + timedelta(days=7)).strftime('%Y-%m-%d')}),
+    Scenario('staff.delete_event', 'DELETE', '/delete/events/{event_id}', 'staff', setup=_staff_event, mutates=True),
+    Scenario('staff.create_blood_need', 'POST', '/blood_need', 'staff', mutates=True,
+             json=lambda c: {'bloodTypes': 'O-', 'units': 2, 'location': 'ER', 'expireTime': '23:00',
+                             'expireDate': (date.today() + timedelta(days=2)).strftime('%Y-%m-%d')}),
+    Scenario('manager.create_staff', 'POST', '/create-staff', 'manager', mutates=True,
+             json=lambda c: {'full_name': 'New staff', 'role': 'Nurse', 'email': f"newstaff{c['n']}@bloodline.test"}),
+    Scenario('manager.delete_staff_member', 'DELETE', '/delete-staff/{delete_staff_id}', 'manager',
+             setup=_bank_staff, mutates=True),
+    Scenario('manager.manage_contact_us', 'PUT', '/desktop/contactus', 'manager', mutates=True,
+             json=lambda c: {'phone': '0611111111'}),
+    Scenario('manager.request_registration', 'POST', '/request_registration', mutates=True,
+             json=lambda c: {'manager_name': 'Applicant', 'manager_email': f"apply{c['n']}@bloodline.test",
+                             'manager_position': 'Director', 'organization_name': 'Clinic', 'latitude': 31.9,
+                             'longitude': 35.9, 'contact_info': '0600000000', 'start_hour': '08:00',
+                             'close_hour': '16:00'}),
+    Scenario('admin_bp.update_registration_request', 'POST', '/admin/update_registration_request', 'admin',
+             setup=_registration_requests(1), mutates=True,
+             json=lambda c: {'request_id': c['request_id'], 'status': 'Accept', 'adim_message_body': 'Welcome'}),
+    Scenario('admin_bp.bulk_update_registration_requests', 'POST', '/admin/bulk_update_registration_requests', 'admin',
+             setup=_registration_requests(3), mutates=True,
+             json=lambda c: {'request_ids': c['request_ids'], 'status': 'Reject', 'adim_message_body': 'Sorry'}),
+    Scenario('admin_bp.add_faq', 'POST', '/admin/add_faq', 'admin', mutates=True,
+             json=lambda c: {'question': 'New question?', 'answer': 'New answer.'}),
+    Scenario('admin_bp.delete_faq', 'DELETE', '/delete_faq/{faq_id}', 'admin', setup=_faq, mutates=True),
+
+    # Account maintenance
+    Scenario('auth.send_verification_code', 'POST', '/send-verification-code', mutates=True,
+             json=lambda c: {'email': f"donor{c['donor_id']}@bloodline.test", 'newAccount': False}),
+    Scenario('auth.verify_code', 'POST', '/verify-code', setup=_verification, mutates=True,
+             json=lambda c: {'email': 'verify@bloodline.test', 'code': '12345'}),
+    Scenario('auth.update_password', 'POST', '/update-password', mutates=True,
+             json=lambda c: {'email': f"donor{c['donor_ids'][-4]}@bloodline.test", 'newPassword': PASSWORD}),
+    Scenario('auth.change_password', 'PUT', '/change_password', 'staff', mutates=True,
+             json=lambda c: {'old_password': PASSWORD, 'new_password': PASSWORD}),
+    Scenario('auth.update_user_profile', 'PUT', '/desktop/profile', 'staff', mutates=True,
+             json=lambda c: {'username': 'Staff renamed'}),
+    Scenario('email_bp.test_email', 'POST', '/test', mutates=True, json=lambda c: {'email': 'test@bloodline.test'}),
+    Scenario('auth.logout', 'POST', '/logout', user=lambda c: c['donor_ids'][-5], mutates=True, fresh_token=True),
+]
+
+
+def uncovered_endpoints(app, scenarios=SCENARIOS):
+    """Endpoints registered on the app that no scenario exercises."""
+    covered = {scenario.endpoint for scenario in scenarios}
+    return sorted(rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint not in covered | {'static'})
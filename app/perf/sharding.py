@@ -0,0 +1,74 @@
+from app.perf.harness import issue, prepare, seeded_app
+from app.perf.query_counts import scenario_keys
+from app.perf.scenarios import SCENARIOS
+from app.services.shards import SHARDED_TABLES, shards
+
+# Responses about the server itself rather than the data, which differ between any two runs
+UNCOMPARED_ENDPOINTS = {'metrics', 'admin_bp.get_slow_queries', 'admin_bp.get_profiles', 'admin_bp.get_profile'}
+
+# Responses listing rows in per-database version order, under a cursor with one version per database;
+# compared without the cursor, regardless of order, and with the IDs in bare lists of row IDs blanked
+PER_DATABASE_ENDPOINTS = {'sync.sync_changes'}
+
+
+def run(scale, shard_count):
+    """Run every scenario against a fresh dataset spread over `shard_count` shards.
+
+    Returns ({key: (status, normalized body)}, {shard: bank-scoped rows on it}).
+    """
+    app, fixture = seeded_app(scale, shards=shard_count)
+    client = app.test_client()
+    tokens = {}
+    responses = {}
+    for key, scenario in zip(scenario_keys(), SCENARIOS):
+        response = issue(client, prepare(app, scenario, fixture, tokens))
+        compared = scenario.method == 'GET' and not scenario.mutates and scenario.endpoint not in UNCOMPARED_ENDPOINTS
+        body = _normalize(response.get_json(silent=True)) if compared else None
+        if compared and scenario.endpoint in PER_DATABASE_ENDPOINTS and isinstance(body, dict):
+            body.pop('cursor', None)
+            body = _unordered(body)
+        responses[key] = (response.status_code, body)
+
+    rows = {}
+    with app.app_context():
+        for key in shards.keys():
+            with shards.engine(key).connect() as connection:
+                rows[key] = sum(connection.exec_driver_sql(f"SELECT COUNT(*) FROM main.{name}").scalar()
+                                for name in SHARDED_TABLES)
+    return responses, rows
+
+
+def check(scale, shard_count):
+    """Compare a sharded run with a single-database one. Returns (failures, rows per shard)."""
+    expected, _ = run(scale, 0)
+    actual, rows = run(scale, shard_count)
+    failures = []
+    for key, (status, body) in expected.items():
+        actual_status, actual_body = actual[key]
+        if actual_status != status:
+            failures.append((key, f"status {actual_status} with shards, {status} without"))
+        elif actual_body != body:
+            failures.append((key, "response differs from the single-database one"))
+    for key, count in rows.items():
+        if key and not count:
+            failures.append((f"shard {key}", "no bank-scoped rows were placed on it"))
+    return failures, rows
+
+
+def _normalize(value):
+    # Row IDs depend on the shard a row landed on, and creation times on when the dataset was
+    # generated, so only their presence is compared
+    if isinstance(value, dict):
+        return {key: None if (key == 'created_at' or 'id' in key.lower() and isinstance(item, int)) else _normalize(item)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def _unordered(value):
+    if isinstance(value, dict):
+        return {key: _unordered(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return sorted((None if isinstance(item, int) else _unordered(item) for item in value), key=repr)
+    return value
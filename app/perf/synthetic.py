@@ -0,0 +1,256 @@
+import random
+from dataclasses import dataclass, fields
+from datetime import date, datetime, time, timedelta
+from werkzeug.security import generate_password_hash
+from app import db
+from app.services.shards import SHARDED_TABLES, shards
+from app.models import (
+    Admin, Appointment, BloodBank, BloodDonation, BloodInventory, BloodNeed, Disease, DonorBloodBank,
+    DonorDisease, Donor, Event, FAQ, Manager, Notification, RegistrationRequest, StaffMember, Volunteering
+)
+
+BLOOD_GROUPS = ["O+", "A+", "B+", "O-", "A-", "AB+", "B-", "AB-"]
+BLOOD_GROUP_WEIGHTS = [38, 34, 9, 7, 6, 3, 2, 1]  # Rough population frequencies
+DISEASES = ["Diabetes", "Hypertension", "Asthma", "Anemia", "Hepatitis B"]
+
+# Every synthetic account logs in with this password
+PASSWORD = "password"
+
+INSERT_CHUNK = 5000
+
+
+@dataclass
+class Scale:
+    banks: int = 5
+    donors: int = 500
+    staff_per_bank: int = 3
+    appointments_per_donor: float = 2.0
+    donations_per_donor: float = 3.0
+    events_per_bank: int = 10
+    needs_per_bank: int = 10
+    follows_per_donor: int = 2
+    faqs: int = 20
+    registration_requests: int = 20
+    volunteer_ratio: float = 0.1
+    history_days: int = 365
+    seed: int = 42
+
+    @classmethod
+    def from_factor(cls, factor, **overrides):
+        """Scale every count by `factor` relative to the defaults."""
+        base = cls()
+        values = {}
+        for field in fields(cls):
+            value = getattr(base, field.name)
+            if field.name in ('banks', 'donors', 'events_per_bank', 'needs_per_bank', 'faqs', 'registration_requests'):
+                value = max(1, int(value * factor))
+            values[field.name] = value
+        values.update(overrides)
+        return cls(**values)
+
+
+@dataclass
+class Fixture:
+    """IDs of well-known rows that scenarios and benchmarks act as or act on."""
+    admin_id: int
+    bank_id: int
+    manager_id: int
+    staff_id: int
+    donor_id: int
+    donor_ids: list
+    staff_ids: list
+    manager_ids: list
+    bank_ids: list
+
+
+def _bulk_insert(model, rows):
+    column = SHARDED_TABLES.get(model.__tablename__)
+    if column is None:
+        _insert_chunks(model, rows)
+        return
+    # Bank-scoped rows go to their bank's shard
+    for key, shard_rows in shards.partition(rows, db.session, column):
+        with shards.using(key):
+            _insert_chunks(model, shard_rows)
+
+
+def _insert_chunks(model, rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(model.__table__.insert(), rows[start:start + INSERT_CHUNK])
+
+
+def generate(scale=None):
+    """Bulk-insert a synthetic dataset into the current (empty) database and return its Fixture."""
+    scale = scale or Scale()
+    rng = random.Random(scale.seed)
+    today = date.today()
+    now = datetime.utcnow()
+    # Hash once; pbkdf2 per row would dominate generation time
+    password = generate_password_hash(PASSWORD)
+
+    _bulk_insert(Admin, [dict(id=1, username="Admin", email="admin@bloodline.test", password=password)])
+
+    bank_ids = list(range(1, scale.banks + 1))
+    _bulk_insert(BloodBank, [
+        dict(
+            blood_bank_id=bank_id,
+            name=f"Blood Bank {bank_id}",
+            latitude=31.9 + rng.uniform(-1, 1),
+            longitude=35.9 + rng.uniform(-1, 1),
+            phone_number=f"06{rng.randrange(1000000, 9999999)}",
+            email=f"bank{bank_id}@bloodline.test",
+            start_hour="08:00",
+            close_hour="16:00"
+        )
+        for bank_id in bank_ids
+    ])
+
+    manager_ids = [200000 + i for i in range(scale.banks)]
+    _bulk_insert(Manager, [
+        dict(id=manager_id, username=f"Manager {bank_id}", email=f"manager{bank_id}@bloodline.test",
+             password=password, blood_bank_id=bank_id)
+        for manager_id, bank_id in zip(manager_ids, bank_ids)
+    ])
+
+    staff_rows = []
+    for bank_id in bank_ids:
+        for n in range(scale.staff_per_bank):
+            staff_id = 300000 + len(staff_rows)
+            staff_rows.append(dict(id=staff_id, username=f"Staff {staff_id}", email=f"staff{staff_id}@bloodline.test",
+                                   password=password, role="Nurse", blood_bank_id=bank_id))
+    _bulk_insert(StaffMember, staff_rows)
+
+    donor_ids = [10000 + i for i in range(scale.donors)]
+    donor_groups = rng.choices(BLOOD_GROUPS, BLOOD_GROUP_WEIGHTS, k=scale.donors)
+    _bulk_insert(Donor, [
+        dict(
+            id=donor_id,
+            username=f"Donor {donor_id}",
+            email=f"donor{donor_id}@bloodline.test",
+            password=password,
+            phone_number=f"07{rng.randrange(10000000, 99999999)}",
+            gender=rng.choice(["Male", "Female"]),
+            date_of_birth=today - timedelta(days=rng.randrange(18 * 365, 65 * 365)),
+            weight=rng.randrange(55, 110),
+            id_number=str(rng.randrange(10 ** 9, 10 ** 10)),
+            blood_group=blood_group,
+            ranking_points=rng.randrange(0, 500)
+        )
+        for donor_id, blood_group in zip(donor_ids, donor_groups)
+    ])
+
+    follows = set()
+    for donor_id in donor_ids:
+        for bank_id in rng.sample(bank_ids, min(scale.follows_per_donor, len(bank_ids))):
+            follows.add((donor_id, bank_id))
+    _bulk_insert(DonorBloodBank, [dict(donor_id=donor_id, blood_bank_id=bank_id) for donor_id, bank_id in follows])
+
+    _bulk_insert(Disease, [dict(disease_id=i + 1, name=name) for i, name in enumerate(DISEASES)])
+    _bulk_insert(DonorDisease, [
+        dict(donor_id=donor_id, disease_id=rng.randrange(1, len(DISEASES) + 1))
+        for donor_id in donor_ids if rng.random() < 0.05
+    ])
+
+    _bulk_insert(Volunteering, [
+        dict(donor_id=donor_id, applied_at=now - timedelta(days=rng.randrange(scale.history_days)))
+        for donor_id in donor_ids if rng.random() < scale.volunteer_ratio
+    ])
+
+    # Past appointments are complete or canceled; today's are pending or open so the desk has work
+    appointments = []
+    for donor_id in donor_ids:
+        for _ in range(_count(rng, scale.appointments_per_donor)):
+            day = today - timedelta(days=rng.randrange(1, scale.history_days))
+            appointments.append(dict(
+                donor_id=donor_id, blood_bank_id=rng.choice(bank_ids), appointment_date=day,
+                appointment_time=time(rng.randrange(8, 16), rng.choice([0, 30])),
+                status=rng.choice(["Complete", "Complete", "Complete", "Canceled"]),
+                donation_type="Whole Blood"
+            ))
+    for donor_id in rng.sample(donor_ids, max(1, scale.donors // 20)):
+        appointments.append(dict(
+            donor_id=donor_id, blood_bank_id=rng.choice(bank_ids), appointment_date=today,
+            appointment_time=time(rng.randrange(8, 16), rng.choice([0, 30])),
+            status=rng.choice(["Pending", "Open"]), donation_type="Whole Blood"
+        ))
+    _bulk_insert(Appointment, appointments)
+
+    donations = []
+    for donor_id, blood_group in zip(donor_ids, donor_groups):
+        for _ in range(_count(rng, scale.donations_per_donor)):
+            donations.append(dict(
+                donor_id=donor_id, blood_bank_id=rng.choice(bank_ids),
+                donation_date=today - timedelta(days=rng.randrange(0, scale.history_days)),
+                donation_type="Whole Blood", quantity_donated=1,
+                donor_blood_pulse=rng.randrange(60, 100), donor_temperature=round(rng.uniform(36.2, 37.4), 1),
+                blood_pressure=f"{rng.randrange(100, 140)}/{rng.randrange(60, 90)}"
+            ))
+    _bulk_insert(BloodDonation, donations)
+
+    _bulk_insert(BloodInventory, [
+        dict(blood_bank_ID=bank_id, Blood_Type=blood_group, Quantity=rng.randrange(0, 200),
+             Expiration_Date=today + timedelta(days=rng.randrange(-5, 42)))
+        for bank_id in bank_ids for blood_group in BLOOD_GROUPS
+    ])
+
+    _bulk_insert(Event, [
+        dict(title=f"Donation drive {n}", description="Community blood donation drive.",
+             event_date=today + timedelta(days=rng.randrange(-30, 60)), event_time=time(rng.randrange(8, 18)),
+             location="City centre", blood_bank_id=bank_id)
+        for bank_id in bank_ids for n in range(scale.events_per_bank)
+    ])
+
+    _bulk_insert(BloodNeed, [
+        dict(blood_types=rng.choice(BLOOD_GROUPS), units=rng.randrange(1, 10), location="Emergency ward",
+             hospital=f"Blood Bank {bank_id}", expire_date=today + timedelta(days=rng.randrange(0, 14)),
+             expire_time=time(23, 59), created_at=now - timedelta(days=rng.randrange(0, 30)), blood_bank_id=bank_id)
+        for bank_id in bank_ids for n in range(scale.needs_per_bank)
+    ])
+
+    # Every follower has been told about one need of each bank they follow; about half are read
+    _bulk_insert(Notification, [
+        dict(donor_id=donor_id, kind="blood_need", blood_bank_id=bank_id, title=f"Blood Bank {bank_id} needs blood",
+             body="Units needed at the emergency ward.", created_at=now - timedelta(days=rng.randrange(0, 30)),
+             read_at=now if rng.random() < 0.5 else None)
+        for donor_id, bank_id in sorted(follows)
+    ])
+
+    _bulk_insert(FAQ, [
+        dict(question=f"Question {n}?", answer=f"Answer {n}.", created_by=1) for n in range(scale.faqs)
+    ])
+
+    _bulk_insert(RegistrationRequest, [
+        dict(manager_name=f"Applicant {n}", manager_email=f"applicant{n}@bloodline.test", manager_position="Director",
+             organization_name=f"Hospital {n}", latitude=31.9, longitude=35.9, contact_info="0600000000",
+             start_hour="08:00", close_hour="16:00", request_status="Pending",
+             created_at=now - timedelta(days=rng.randrange(0, 60)))
+        for n in range(scale.registration_requests)
+    ])
+
+    db.session.commit()
+
+    # Derived tables are rebuilt from what was just generated
+    from app.services.donor_roster import rebuild_affinity
+    from app.services.eligibility import rebuild_eligibility
+    from app.services.rollups import rebuild_rollups
+    rebuild_affinity()
+    rebuild_rollups()
+    rebuild_eligibility()
+
+    return Fixture(
+        admin_id=1,
+        bank_id=bank_ids[0],
+        manager_id=manager_ids[0],
+        staff_id=staff_rows[0]['id'],
+        donor_id=donor_ids[0],
+        donor_ids=donor_ids,
+        staff_ids=[row['id'] for row in staff_rows],
+        manager_ids=manager_ids,
+        bank_ids=bank_ids
+    )
+
+
+def _count(rng, mean):
+    # Integer count with the given mean
+    whole = int(mean)
+    return whole + (1 if rng.random() < mean - whole else 0)
@@ -5,6 +5,8 @@ from .auth_routes import auth_bp
 from .manager_routes import manager_bp
 from .admin_routes import admin_bp
 from .staff_routes import staff_bp
+from .batch_routes import batch_bp
+from .sync_routes import sync_bp
 
 def register_routes(app):
     app.register_blueprint(email_bp)
@@ -12,4 +14,6 @@ def register_routes(app):
     app.register_blueprint(auth_bp)
     app.register_blueprint(manager_bp)
     app.register_blueprint(admin_bp)
-    app.register_blueprint(staff_bp)
\ No newline at end of file
+    app.register_blueprint(staff_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(sync_bp)
\ No newline at end of file
@@ -1,34 +1,85 @@
+import json
 import random
-from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, current_app, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from werkzeug.security import generate_password_hash
+from app.services.passwords import hash_password
 from app.models import Donor, StaffMember, Admin, Manager
 from app import db
+from app.models.audit_event import AuditEvent
 from app.models.blood_bank import BloodBank
 from app.models.faq import FAQ
 from app.models.registration_request import RegistrationRequest
-from app.services.email_service import send_email
+from app.models.slow_query import SlowQuery
+from app.services import analytics, audit, exports
+from app.services.compression import snapshot_cache
+from app.services.profiler import list_profiles, load_profile
+from app.services.email_service import send_bulk_email_async, send_email
+from app.services.idempotency import idempotent
 
 admin_bp = Blueprint('admin_bp', __name__)
 
+MAX_BULK_REQUESTS = 200  # Registration requests decided per bulk call
+
 def generate_numeric_password():
     return str(random.randint(100000, 999999))
 
+def accept_message(password, adim_message_body):
+    return (
+        "Congratulations! Your registration request has been accepted.\n\n"
+        "You can now access the Blood Line platform as a manager. \n"
+        f"Please use the provided password to log in: {password} \n\n"
+        f"Admin Message: {adim_message_body} \n\n"
+        "Thank you for joining our efforts in making blood donation more accessible."
+    )
+
+def reject_message(adim_message_body):
+    return (
+        "We regret to inform you that your registration request has been rejected.\n\n"
+        f"{adim_message_body}\n\n"
+        "If you have any questions or need further assistance, please don't hesitate "
+        "to contact our support team for clarification or to address any concerns."
+    )
+
 # Desktop 1
 @admin_bp.route('/admin/get_registration_requests', methods=['GET'])
 @jwt_required()
 def get_registration_requests():
-    # Admin-specific logic to fetch all pending requests
-    pending_requests = RegistrationRequest.query.filter_by(request_status="Pending").all()
-
     current_user_id = get_jwt_identity()
 
-    # Check if the current user is a donor
+    # Check if the current user is an admin before loading anything
     admin = Admin.query.filter_by(id=current_user_id).first()
     if not admin:
         return jsonify({"error": "Unauthorized access."}), 403
 
-    
+    # Queue options: status ("All" for every status), created_at range and keyset cursor
+    status = request.args.get('status', 'Pending')
+    after_id = request.args.get('after_id', type=int)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+
+    try:
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+        date_from = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+        date_to = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1) if date_to else None
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    query = RegistrationRequest.query
+    if status != 'All':
+        query = query.filter(RegistrationRequest.request_status == status)
+    if date_from:
+        query = query.filter(RegistrationRequest.created_at >= date_from)
+    if date_to:
+        query = query.filter(RegistrationRequest.created_at < date_to)
+    if after_id:
+        query = query.filter(RegistrationRequest.request_id > after_id)
+
+    # Fetch one row past the page to know whether another page exists
+    page = query.order_by(RegistrationRequest.request_id).limit(limit + 1).all()
+    has_more = len(page) > limit
+    page = page[:limit]
+
     requests_data = [
         {
             'request_id': req.request_id,
@@ -39,18 +90,25 @@ def get_registration_requests():
             'start_hour': req.start_hour,  # Reflecting the replacement of operating_hours_m
             'close_hour': req.close_hour,  # Reflecting the replacement of operating_hours_m
             'manager_name': req.manager_name,
-            'manager_email': req.manager_email
+            'manager_email': req.manager_email,
+            'request_status': req.request_status,
+            'created_at': req.created_at
         }
-        for req in pending_requests
+        for req in page
     ]
-    
-    return jsonify(requests_data), 200
+
+    response = jsonify(requests_data)
+    # The body stays a plain list for existing clients; the cursor travels in a header
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(page[-1].request_id)
+    return response, 200
 
 
 
 # Desktop 2
 @admin_bp.route('/admin/update_registration_request', methods=['POST'])
 @jwt_required()
+@idempotent(store_body=False)
 def update_registration_request():
     data = request.get_json()
     request_id = data.get('request_id')
@@ -75,16 +133,8 @@ def update_registration_request():
     if new_status == "Accept":
         password = generate_numeric_password()
 
-        accept_message = (
-            "Congratulations! Your registration request has been accepted.\n\n"
-            "You can now access the Blood Line platform as a manager. \n"
-            f"Please use the provided password to log in: {password} \n\n"
-            f"Admin Message: {adim_message_body} \n\n"
-            "Thank you for joining our efforts in making blood donation more accessible."
-        )
-        
         # Try to send the email and check for errors
-        email_response = send_email("Registration Status Update", [req.manager_email], accept_message)
+        email_response = send_email("Registration Status Update", [req.manager_email], accept_message(password, adim_message_body))
         if email_response:
             return jsonify(email_response), 500
 
@@ -112,7 +162,7 @@ def update_registration_request():
             id=next_manager_id,
             username=req.manager_name,
             email=req.manager_email,
-            password=generate_password_hash(password),
+            password=hash_password(password),
             blood_bank_id=new_blood_bank.blood_bank_id
         )
         db.session.add(new_manager)
@@ -121,6 +171,9 @@ def update_registration_request():
         req.request_status = "Approved"
         try:
             db.session.commit()
+            snapshot_cache.invalidate('blood_banks')
+            audit.record("registration.approve", admin, new_blood_bank.blood_bank_id, "registration_request", req.request_id,
+                         manager_id=next_manager_id)
             return jsonify({
                 "msg": "Request accepted and manager/organization added successfully!",
                 "password": password
@@ -132,20 +185,14 @@ def update_registration_request():
     elif new_status == "Reject":
         req.request_status = "Rejected"
 
-        reject_message = (
-            "We regret to inform you that your registration request has been rejected.\n\n"
-            f"{adim_message_body}\n\n"
-            "If you have any questions or need further assistance, please don't hesitate "
-            "to contact our support team for clarification or to address any concerns."
-        )
-        
         # Try to send the email and check for errors
-        email_response = send_email("Registration Status Update", [req.manager_email], reject_message)
+        email_response = send_email("Registration Status Update", [req.manager_email], reject_message(adim_message_body))
         if email_response:
             return jsonify(email_response), 500
 
         try:
             db.session.commit()
+            audit.record("registration.reject", admin, None, "registration_request", req.request_id)
             return jsonify({"msg": "Request rejected!"}), 200
         except Exception as e:
             db.session.rollback()
@@ -154,8 +201,115 @@ def update_registration_request():
         return jsonify({"msg": "Invalid status provided!"}), 400
 
 
+@admin_bp.route('/admin/bulk_update_registration_requests', methods=['POST'])
+@jwt_required()
+@idempotent(store_body=False)
+def bulk_update_registration_requests():
+    current_user_id = get_jwt_identity()
+
+    admin = Admin.query.filter_by(id=current_user_id).first()
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    data = request.get_json()
+    request_ids = data.get('request_ids')
+    new_status = data.get('status')  # Accept or Reject
+    adim_message_body = data.get('adim_message_body')
+
+    if not request_ids or new_status not in ("Accept", "Reject"):
+        return jsonify({"msg": "Missing request_ids or invalid status"}), 400
+    if not isinstance(request_ids, list) or not all(
+        isinstance(request_id, int) and not isinstance(request_id, bool) for request_id in request_ids
+    ):
+        return jsonify({"msg": "request_ids must be a list of integers"}), 400
+    if len(request_ids) > MAX_BULK_REQUESTS:
+        return jsonify({"msg": f"At most {MAX_BULK_REQUESTS} request_ids per call"}), 400
+
+    # Only pending requests can be decided; everything else is reported back as skipped
+    pending = (
+        RegistrationRequest.query
+        .filter(RegistrationRequest.request_id.in_(request_ids), RegistrationRequest.request_status == "Pending")
+        .order_by(RegistrationRequest.request_id)
+        .all()
+    )
+    processed_ids = {req.request_id for req in pending}
+    skipped = [request_id for request_id in request_ids if request_id not in processed_ids]
+
+    emails = []
+    results = []
+    approved = []
+
+    try:
+        if new_status == "Accept":
+            # Reserve a contiguous block of manager IDs with a single lookup
+            max_manager = (
+                Manager.query.filter(Manager.id.between(200000, 299999))
+                .order_by(Manager.id.desc())
+                .first()
+            )
+            next_manager_id = (max_manager.id + 1) if max_manager else 200000
+
+            for req in pending:
+                password = generate_numeric_password()
+
+                new_blood_bank = BloodBank(
+                    name=req.organization_name,
+                    latitude=req.latitude,
+                    longitude=req.longitude,
+                    phone_number=req.contact_info,
+                    email="",
+                    start_hour=req.start_hour,
+                    close_hour=req.close_hour
+                )
+                db.session.add(new_blood_bank)
+                db.session.flush()  # Get blood_bank_id
+
+                db.session.add(Manager(
+                    id=next_manager_id,
+                    username=req.manager_name,
+                    email=req.manager_email,
+                    password=hash_password(password),
+                    blood_bank_id=new_blood_bank.blood_bank_id
+                ))
+                next_manager_id += 1
+
+                req.request_status = "Approved"
+                approved.append((req.request_id, new_blood_bank.blood_bank_id, next_manager_id - 1))
+                emails.append(("Registration Status Update", [req.manager_email], accept_message(password, adim_message_body)))
+                results.append({"request_id": req.request_id, "status": "Approved", "password": password})
+        else:
+            for req in pending:
+                req.request_status = "Rejected"
+                emails.append(("Registration Status Update", [req.manager_email], reject_message(adim_message_body)))
+                results.append({"request_id": req.request_id, "status": "Rejected"})
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "Database error occurred", "error": str(e)}), 500
+
+    if approved:
+        snapshot_cache.invalidate('blood_banks')
+    for request_id, blood_bank_id, manager_id in approved:
+        audit.record("registration.approve", admin, blood_bank_id, "registration_request", request_id, manager_id=manager_id)
+    if new_status == "Reject":
+        for result in results:
+            audit.record("registration.reject", admin, None, "registration_request", result["request_id"])
+
+    # Emails go out over one SMTP connection once the decisions are committed
+    if emails:
+        send_bulk_email_async(emails)
+
+    return jsonify({
+        "msg": f"{len(results)} request(s) processed",
+        "results": results,
+        "skipped": skipped
+    }), 200
+
+
 @admin_bp.route('/admin/add_faq', methods=['POST'])
 @jwt_required()
+@idempotent
 def add_faq():
 
     admin_id = get_jwt_identity()
@@ -184,6 +338,9 @@ def add_faq():
         # Save to database
         db.session.add(new_faq)
         db.session.commit()
+        snapshot_cache.invalidate('faqs')
+
+        audit.record("faq.create", adnin, None, "faq", new_faq.faq_id)
 
         return jsonify({
             "message": "FAQ added successfully",
@@ -222,6 +379,9 @@ def delete_faq(faq_id):
         # Delete the FAQ from the database
         db.session.delete(faq)
         db.session.commit()
+        snapshot_cache.invalidate('faqs')
+
+        audit.record("faq.delete", adnin, None, "faq", faq_id)
 
         return jsonify({"message": f"FAQ with ID {faq_id} deleted successfully"}), 200
 
@@ -230,3 +390,199 @@ def delete_faq(faq_id):
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
 
+@admin_bp.route('/admin/audit', methods=['GET'])
+@jwt_required()
+def get_audit_events():
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    actor_id = request.args.get('actor_id', type=int)
+    blood_bank_id = request.args.get('blood_bank_id', type=int)
+    action = request.args.get('action')
+    before_id = request.args.get('before_id', type=int)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+
+    try:
+        # Newest first; actor and bank filters are served by their (column, occurred_at) indexes
+        query = AuditEvent.query
+        if actor_id is not None:
+            query = query.filter(AuditEvent.actor_id == actor_id)
+        if blood_bank_id is not None:
+            query = query.filter(AuditEvent.blood_bank_id == blood_bank_id)
+        if action:
+            query = query.filter(AuditEvent.action == action)
+        if before_id:
+            query = query.filter(AuditEvent.audit_id < before_id)
+
+        events = query.order_by(AuditEvent.audit_id.desc()).limit(limit).all()
+
+        return jsonify({
+            "events": [
+                {
+                    "audit_id": event.audit_id,
+                    "occurred_at": event.occurred_at,
+                    "actor_id": event.actor_id,
+                    "actor_type": event.actor_type,
+                    "action": event.action,
+                    "blood_bank_id": event.blood_bank_id,
+                    "target_type": event.target_type,
+                    "target_id": event.target_id,
+                    "details": json.loads(event.details) if event.details else None
+                }
+                for event in events
+            ],
+            "next_cursor": events[-1].audit_id if len(events) == limit else None
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@admin_bp.route('/admin/export/<dataset>', methods=['GET'])
+@jwt_required()
+def export_data(dataset):
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+    if dataset not in exports.DATASETS:
+        return jsonify({"error": "dataset must be one of: " + ", ".join(exports.DATASETS)}), 404
+
+    blood_bank_id = request.args.get('blood_bank_id', type=int)
+    try:
+        export_format, start, end = exports.options(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if blood_bank_id is not None and not db.session.get(BloodBank, blood_bank_id):
+            return jsonify({"error": "Blood bank not found"}), 404
+
+        # Network-wide unless a blood_bank_id is given
+        audit.record("data.export", admin, blood_bank_id, dataset=dataset, format=export_format)
+        return exports.export(dataset, export_format, blood_bank_id, start, end)
+
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@jwt_required()
+def get_profiles():
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    try:
+        return jsonify({"profiles": list_profiles(current_app.config['PROFILER_DIR'])}), 200
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@admin_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+def get_profile(profile_id):
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    # Collapsed stacks, ready for flamegraph.pl or speedscope
+    stacks = load_profile(current_app.config['PROFILER_DIR'], profile_id)
+    if stacks is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return Response(stacks, mimetype='text/plain')
+
+
+@admin_bp.route('/admin/slow_queries', methods=['GET'])
+@jwt_required()
+def get_slow_queries():
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    order = request.args.get('order', 'total')
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    columns = {'total': SlowQuery.total_ms, 'max': SlowQuery.max_ms, 'calls': SlowQuery.calls, 'recent': SlowQuery.last_seen}
+    if order not in columns:
+        return jsonify({"error": "order must be one of: " + ", ".join(columns)}), 400
+
+    try:
+        slow_queries = SlowQuery.query.order_by(columns[order].desc()).limit(limit).all()
+
+        return jsonify({
+            "slow_queries": [
+                {
+                    "fingerprint": query.fingerprint,
+                    "statement": query.statement,
+                    "route": query.route,
+                    "calls": query.calls,
+                    "total_ms": round(query.total_ms, 1),
+                    "avg_ms": round(query.total_ms / query.calls, 1) if query.calls else None,
+                    "max_ms": round(query.max_ms, 1),
+                    "sample_parameters": query.sample_parameters,
+                    "plan": query.plan,
+                    "first_seen": query.first_seen,
+                    "last_seen": query.last_seen
+                }
+                for query in slow_queries
+            ]
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@admin_bp.route('/admin/analytics/donations', methods=['GET'])
+@jwt_required()
+def analytics_donations():
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    weeks = min(max(request.args.get('weeks', 12, type=int), 1), 52)
+
+    try:
+        return jsonify(analytics.donations_per_bank_per_week(weeks)), 200
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@admin_bp.route('/admin/analytics/blood_types', methods=['GET'])
+@jwt_required()
+def analytics_blood_types():
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    days = min(max(request.args.get('days', 30, type=int), 1), 366)
+
+    try:
+        return jsonify(analytics.blood_type_distribution(days)), 200
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@admin_bp.route('/admin/analytics/demographics', methods=['GET'])
+@jwt_required()
+def analytics_demographics():
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    try:
+        return jsonify(analytics.donor_demographics()), 200
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@admin_bp.route('/admin/analytics/inventory', methods=['GET'])
+@jwt_required()
+def analytics_inventory():
+    admin = Admin.query.get(get_jwt_identity())
+    if not admin:
+        return jsonify({"error": "Unauthorized access."}), 403
+
+    try:
+        return jsonify(analytics.inventory_totals()), 200
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
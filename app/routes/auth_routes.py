@@ -2,18 +2,16 @@ from datetime import datetime, timedelta
 import random
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, jwt_required
-from werkzeug.security import generate_password_hash
+from app.services.passwords import hash_password, verify_password
 from app import jwt
 from app.models import Donor, StaffMember, Admin, Manager
-from werkzeug.security import check_password_hash
 from app import db
 from app.models.blacklist import Blacklist
 from app.models.blood_bank import BloodBank
-from app.models.blood_donation import BloodDonation
-from app.models.blood_need import BloodNeed
 from app.models.email_verification import EmailVerification
-from app.models.event import Event
+from app.services import batch, rollups
 from app.services.email_service import send_email
+from app.services.replicas import read_replica
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -28,7 +26,7 @@ def login():
            Manager.query.filter_by(email=email).first() or \
            StaffMember.query.filter_by(email=email).first()
 
-    if not user or not check_password_hash(user.password, password):
+    if not user or not verify_password(user.password, password):
         return jsonify({"msg": "Wrong email or password"}), 401
 
     access_token = create_access_token(identity=str(user.id))
@@ -72,6 +70,10 @@ def logout():
 def check_if_token_in_blacklist(jwt_header, jwt_payload):
     jti = jwt_payload['jti']
 
+    # Sub-requests of a /batch call were checked once, with the batch
+    if request.environ.get(batch.VERIFIED_JTI) == jti:
+        return False
+
     return Blacklist.query.filter_by(jti=jti).first() is not None
 
 
@@ -151,7 +153,7 @@ def update_password():
     if user:
         try:
             # Hash the new password
-            hashed_password = generate_password_hash(new_password)
+            hashed_password = hash_password(new_password)
             user.password = hashed_password
             db.session.commit()
             return jsonify({"msg": "Password updated successfully"}), 200
@@ -183,7 +185,7 @@ def get_user_profile():
             "phone_number": user.phone_number,
             "gender": user.gender,
             "profile_image": user.profile_image,
-            "date_of_birth": user.date_of_birth.strftime("%Y-%m-%d") if user.date_of_birth else None,
+            "date_of_birth": user.date_of_birth,
             "user_type": user.__class__.__name__
         }
 
@@ -275,11 +277,11 @@ def change_password():
         new_password = data.get('new_password')
 
         # Check if the old password is correct
-        if not check_password_hash(user.password, old_password):
+        if not verify_password(user.password, old_password):
             return jsonify({"error": "Old password is incorrect"}), 400
 
         # Update the password with the new one
-        user.password = generate_password_hash(new_password)
+        user.password = hash_password(new_password)
         db.session.commit()
 
         return jsonify({"message": "Password updated successfully"}), 200
@@ -290,6 +292,7 @@ def change_password():
 
 @auth_bp.route('/get_user_data', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_user_data():
     try:
         # Get the current user ID from the JWT
@@ -305,7 +308,7 @@ def get_user_data():
             return jsonify({"error": "User not found"}), 404
 
         # Get the last 30 days range
-        last_30_days = datetime.utcnow() - timedelta(days=30)
+        last_30_days = (datetime.utcnow() - timedelta(days=30)).date()
 
         if isinstance(user, Donor):
             # Donor: Return their name
@@ -318,46 +321,12 @@ def get_user_data():
             if not blood_bank:
                 return jsonify({"error": "Blood bank not found"}), 404
 
-            donations_count = BloodDonation.query.filter(
-                BloodDonation.blood_bank_id == blood_bank_id,
-                BloodDonation.donation_date >= last_30_days
-            ).count()
-
-            events_count = Event.query.filter(
-                Event.blood_bank_id == blood_bank_id,
-                Event.event_date >= last_30_days
-            ).count()
-
-            blood_needs_count = BloodNeed.query.filter(
-                BloodNeed.blood_bank_id == blood_bank_id,
-                BloodNeed.created_at >= last_30_days
-            ).count()
-
-            return jsonify({
-                "donations_count": donations_count,
-                "events_count": events_count,
-                "blood_needs_count": blood_needs_count
-            }), 200
+            # Summed from the daily rollups instead of counting the source tables
+            return jsonify(rollups.get_window_totals(last_30_days, blood_bank_id=blood_bank_id)), 200
 
         elif isinstance(user, Admin):
             # Admin: Return data for all blood banks in the past 30 days
-            donations_count = BloodDonation.query.filter(
-                BloodDonation.donation_date >= last_30_days
-            ).count()
-
-            events_count = Event.query.filter(
-                Event.event_date >= last_30_days
-            ).count()
-
-            blood_needs_count = BloodNeed.query.filter(
-                BloodNeed.created_at >= last_30_days
-            ).count()
-
-            return jsonify({
-                "donations_count": donations_count,
-                "events_count": events_count,
-                "blood_needs_count": blood_needs_count
-            }), 200
+            return jsonify(rollups.get_window_totals(last_30_days)), 200
 
         return jsonify({"error": "Unauthorized access."}), 403
 
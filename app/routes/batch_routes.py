@@ -0,0 +1,24 @@
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import get_jwt, jwt_required
+from app.services import batch
+
+batch_bp = Blueprint('batch', __name__)
+
+
+@batch_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def run_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get('requests')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "requests must be a non-empty list"}), 400
+    if len(items) > current_app.config['BATCH_MAX_REQUESTS']:
+        return jsonify({"error": f"At most {current_app.config['BATCH_MAX_REQUESTS']} requests per batch"}), 400
+
+    try:
+        # The token was checked against the blacklist once, above; the sub-requests skip that lookup
+        return jsonify({"responses": batch.run(items, get_jwt()['jti'])}), 200
+
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
@@ -1,33 +1,37 @@
 from flask import Blueprint, request, jsonify
+from collections import Counter
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload
 from app.models import Donor, StaffMember, Admin, Manager
-from werkzeug.security import generate_password_hash
-from datetime import datetime, timedelta
+from app.services.passwords import hash_password
+from datetime import datetime
 from app import db
 from app.models.appointment import Appointment
-from app.models.blood_bank import BloodBank
+from app.models.archive import ArchivedBloodDonation
+from app.models.blood_bank import BloodBank, DonorBloodBank
 from app.models.blood_donation import BloodDonation
 from app.models.blood_need import BloodNeed
 from app.models.disease import Disease, DonorDisease
 from app.models.event import Event
 from app.models.faq import FAQ
+from app.models.notification import Notification
 from app.models.volunteering import Volunteering
+from app.services import archive, eligibility, rollups
+from app.services.blood_types import recipients_for
+from app.services.compression import cached_json_response
+from app.services.idempotency import idempotent
+from app.services.pubsub import event_bus
+from app.services.replicas import read_replica
+from app.services.shards import shards
 
 donor_bp = Blueprint('donor', __name__)
 
+MAX_NOTIFICATIONS_PAGE = 200
+
 def get_compatible_blood_types(blood_group):
     """Determine compatible blood types for donations (who can receive from the donor)."""
-    compatibility = {
-        "O-": ["O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"],
-        "O+": ["O+", "A+", "B+", "AB+"],
-        "A-": ["A-", "A+", "AB-", "AB+"],
-        "A+": ["A+", "AB+"],
-        "B-": ["B-", "B+", "AB-", "AB+"],
-        "B+": ["B+", "AB+"],
-        "AB-": ["AB-", "AB+"],
-        "AB+": ["AB+"]
-    }
-    return compatibility.get(blood_group, [])
+    return recipients_for(blood_group)
 
 @donor_bp.route('/create_donor', methods=['POST'])
 def create_donor():
@@ -57,7 +61,7 @@ def create_donor():
         id=next_donor_id,
         username=data['username'],
         email=data['email'],
-        password=generate_password_hash(data['password']),
+        password=hash_password(data['password']),
         gender=data.get('gender'),
         weight=data['weight'],
         id_number=data['id_number'],
@@ -66,16 +70,21 @@ def create_donor():
     )
 
     db.session.add(new_donor)
+    eligibility.record_donor(new_donor)
     db.session.commit()
     return jsonify({'message': 'Donor created successfully!'}), 201
 
 
 @donor_bp.route('/blood_banks', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_blood_banks():
-    blood_banks = BloodBank.query.all()
+    # The directory is the same for every donor, so it is encoded and compressed once per snapshot
+    return cached_json_response('blood_banks', _blood_banks_directory)
+
 
-    blood_banks_data = [
+def _blood_banks_directory():
+    return [
         {
             'blood_bank_id': bank.blood_bank_id,
             'name': bank.name,
@@ -86,14 +95,13 @@ def get_blood_banks():
             'start_hour': bank.start_hour, 
             'close_hour': bank.close_hour, 
         }
-        for bank in blood_banks
+        for bank in BloodBank.query.all()
     ]
 
-    return jsonify(blood_banks_data), 200
-
 # Mobile 1
 @donor_bp.route('/book_appointment', methods=['POST'])
 @jwt_required()
+@idempotent
 def book_appointment():
     data = request.get_json()
     donor_id = get_jwt_identity()
@@ -113,21 +121,21 @@ def book_appointment():
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        # Check if the donor already has a pending appointment
-        existing_appointment = Appointment.query.filter_by(donor_id=donor_id, status="Pending").first()
+        # Check if the donor already has a pending appointment, at any bank
+        existing_appointment = _pending_appointment(donor_id)
         if existing_appointment:
             return jsonify({
                 "error": "You already have a pending appointment",
                 "appointment_id": existing_appointment.appointment_id,
-                "appointment_date": existing_appointment.appointment_date.strftime("%Y-%m-%d"),
+                "appointment_date": existing_appointment.appointment_date,
                 "appointment_time": existing_appointment.appointment_time.strftime("%H:%M")
             }), 400
 
         # Create the appointment
         appointment = Appointment(
-            donor_id=donor_id,
+            donor=donor,  # Already loaded, so the event payload below needs no lookup
             blood_bank_id=blood_bank_id,
-            appointment_date=datetime.strptime(appointment_date, "%Y-%m-%d"),
+            appointment_date=datetime.strptime(appointment_date, "%Y-%m-%d").date(),
             appointment_time=datetime.strptime(appointment_time, "%H:%M").time(),
             status="Pending",
             donation_type=donation_type
@@ -152,7 +160,9 @@ def book_appointment():
                 donor_disease = DonorDisease(donor_id=donor_id, disease_id=disease.disease_id)
                 db.session.add(donor_disease)
                 associated_diseases.append(disease.name)
+        eligibility.add_diseases(donor, associated_diseases)
 
+        event_bus.publish_appointment('appointment.booked', appointment)
         db.session.commit()
 
 
@@ -182,27 +192,21 @@ def check_pending_appointment():
         # Current date for comparison
         today = datetime.utcnow().date()
 
-        # Delete expired appointments
-        expired_appointments = Appointment.query.filter(
+        # Move past appointments to the archive; those a donation still refers to follow it there later
+        shards.gather(lambda: archive.move(Appointment, [
             Appointment.donor_id == donor_id,
             Appointment.appointment_date < today
-        ).all()
-
-        for appointment in expired_appointments:
-            db.session.delete(appointment)
+        ]))
         db.session.commit()
 
         # Check for pending appointments
-        pending_appointment = Appointment.query.filter_by(
-            donor_id=donor_id,
-            status='Pending'
-        ).first()
+        pending_appointment = _pending_appointment(donor_id)
 
         if pending_appointment:
             return jsonify({
                 "appointment_id": pending_appointment.appointment_id,
                 "blood_bank": pending_appointment.blood_bank.name,  # Access blood bank name through the relationship
-                "appointment_date": pending_appointment.appointment_date.strftime("%Y-%m-%d"),
+                "appointment_date": pending_appointment.appointment_date,
                 "appointment_time": pending_appointment.appointment_time.strftime("%H:%M"),
                 "donation_type": pending_appointment.donation_type,
                 "status": pending_appointment.status
@@ -229,10 +233,7 @@ def delete_appointment():
             return jsonify({"error": "Unauthorized access."}), 403
         
 
-        pending_appointment = Appointment.query.filter_by(
-            donor_id=donor_id, 
-            status='Pending'
-        ).first()
+        pending_appointment = _pending_appointment(donor_id)
 
         if not pending_appointment:
             return jsonify({"error": "No pending appointment found to delete"}), 404
@@ -240,8 +241,11 @@ def delete_appointment():
         donor_diseases = DonorDisease.query.filter_by(donor_id=donor_id).all()
         for donor_disease in donor_diseases:
             db.session.delete(donor_disease)
+        eligibility.clear_diseases(donor)
 
         db.session.delete(pending_appointment)
+        event_bus.publish('appointment.deleted', pending_appointment.blood_bank_id,
+                          {"id": pending_appointment.appointment_id}, donor_id=pending_appointment.donor_id)
         db.session.commit()
 
         return jsonify({"message": "Appointment deleted successfully"}), 200
@@ -251,6 +255,12 @@ def delete_appointment():
         return jsonify({"error": f"An error occurred while deleting the appointment: {str(e)}"}), 500
     
 
+def _pending_appointment(donor_id):
+    # A donor's appointments can be at banks on different shards
+    query = Appointment.query.filter_by(donor_id=donor_id, status='Pending')
+    return next((appointment for appointment in shards.gather(query.first) if appointment), None)
+
+
 # Mobile 4
 @donor_bp.route('/donor/follow_blood_bank', methods=['POST'])
 @jwt_required()
@@ -288,6 +298,7 @@ def follow_blood_bank():
         
         # Add blood bank to followed banks
         donor.followed_blood_banks.append(blood_bank)
+        eligibility.record_follow(donor, blood_bank.blood_bank_id)
         db.session.commit()
         
         return jsonify({
@@ -340,6 +351,7 @@ def unfollow_blood_bank():
         
         # Remove blood bank from followed banks
         donor.followed_blood_banks.remove(blood_bank)
+        eligibility.record_unfollow(donor, blood_bank.blood_bank_id)
         db.session.commit()
         
         return jsonify({
@@ -391,26 +403,31 @@ def get_followed_blood_banks():
 
 @donor_bp.route('/donor/faqs', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_faqs():
     try:
-        faqs = FAQ.query.all()
-        faq_list = [{
-            "id": faq.faq_id,
-            "question": faq.question,
-            "answer": faq.answer
-        } for faq in faqs]
-
-        return jsonify({
-            "faqs": faq_list,
-            "count": len(faq_list)
-        }), 200
+        return cached_json_response('faqs', _faq_snapshot)
 
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+def _faq_snapshot():
+    faq_list = [{
+        "id": faq.faq_id,
+        "question": faq.question,
+        "answer": faq.answer
+    } for faq in FAQ.query.all()]
+
+    return {
+        "faqs": faq_list,
+        "count": len(faq_list)
+    }
     
 
 @donor_bp.route('/toggle_volunteering', methods=['POST'])
 @jwt_required()
+@idempotent
 def toggle_volunteering():
     try:
         # Get the current user ID from the JWT
@@ -449,6 +466,7 @@ def toggle_volunteering():
 
 @donor_bp.route('/donation_history', methods=['GET'])
 @jwt_required()
+@read_replica
 def donation_history():
     try:
         # Get the current user ID from the JWT
@@ -459,13 +477,16 @@ def donation_history():
         if not donor:
             return jsonify({"error": "Unauthorized access. Only donors can view donation history."}), 403
 
-        # Fetch the donor's donation history
-        donations = (
-            BloodDonation.query
+        # Fetch the donor's donation history, from the hot and the archive table alike
+        donations = shards.collect(lambda: [
+            donation
+            for model in (BloodDonation, ArchivedBloodDonation)
+            for donation in model.query
+            .options(joinedload(model.blood_bank))
             .filter_by(donor_id=donor.id)
-            .order_by(BloodDonation.donation_date.desc())
-            .all()
-        )
+            .order_by(model.donation_date.desc())
+        ])
+        donations.sort(key=lambda donation: donation.donation_date, reverse=True)  # Merge the tiers' and shards' results
 
         if not donations:
             return jsonify({
@@ -480,7 +501,7 @@ def donation_history():
             donation_history.append({
                 "donation_id": donation.donation_id,
                 "blood_bank_name": donation.blood_bank.name,
-                "donation_date": donation.donation_date.strftime("%Y-%m-%d"),
+                "donation_date": donation.donation_date,
                 "donation_type": donation.donation_type,
                 "quantity_donated": donation.quantity_donated,
                 "donor_blood_pulse": donation.donor_blood_pulse,
@@ -490,11 +511,11 @@ def donation_history():
 
         # Determine the next eligible donation date
         last_donation_date = donations[0].donation_date
-        next_eligible_donation_date = last_donation_date + timedelta(days=56)  # 56 days is a common interval
+        next_eligible_donation_date = last_donation_date + eligibility.DONATION_INTERVAL
 
         return jsonify({
             "message": "Donation history retrieved successfully.",
-            "next_eligible_donation_date": next_eligible_donation_date.strftime("%Y-%m-%d"),
+            "next_eligible_donation_date": next_eligible_donation_date,
             "donation_history": donation_history
         }), 200
 
@@ -522,15 +543,17 @@ def get_blood_bank_events():
 
         # Query events from blood banks the donor follows
         followed_blood_banks = donor.followed_blood_banks.all()  # Get all followed blood banks
-        events = (
+        events = shards.collect(
             Event.query.join(BloodBank)
+            .options(contains_eager(Event.blood_bank))
             .filter(
                 Event.blood_bank_id.in_([bank.blood_bank_id for bank in followed_blood_banks]),
                 Event.event_date >= today  # Only include upcoming events
             )
             .order_by(Event.event_date, Event.event_time)  # Order by date and time
-            .all()
+            .all
         )
+        events.sort(key=lambda event: (event.event_date, event.event_time))  # Merge the shards' results
 
         # Prepare the events response
         events_data = [
@@ -538,11 +561,11 @@ def get_blood_bank_events():
                 "event_id": event.event_id,
                 "title": event.title,
                 "description": event.description,
-                "event_date": event.event_date.strftime('%Y-%m-%d'),
+                "event_date": event.event_date,
                 "event_time": event.event_time.strftime('%H:%M'),
                 "location": event.location,
                 "blood_bank_id": event.blood_bank_id,
-                "blood_bank_name": BloodBank.query.get(event.blood_bank_id).name  # Get the name of the blood bank
+                "blood_bank_name": event.blood_bank.name  # Loaded by the join above
             }
             for event in events
         ]
@@ -578,27 +601,20 @@ def get_blood_bank_needs():
 
         # Fetch blood needs from followed blood banks
         followed_blood_banks = donor.followed_blood_banks.all()
-        blood_needs = (
+        blood_needs = shards.collect(
             BloodNeed.query
+            .options(joinedload(BloodNeed.blood_bank))
             .filter(
                 BloodNeed.blood_bank_id.in_([bank.blood_bank_id for bank in followed_blood_banks]),
                 BloodNeed.blood_types.in_(get_compatible_blood_types(donor.blood_group)),
                 (BloodNeed.expire_date > now.date()) | ((BloodNeed.expire_date == now.date()) & (BloodNeed.expire_time > now.time()))
             )
             .order_by(BloodNeed.expire_date, BloodNeed.expire_time)
-            .all()
+            .all
         )
+        blood_needs.sort(key=lambda need: (need.expire_date, need.expire_time))  # Merge the shards' results
 
-
-        # Remove expired blood needs
-        expired_blood_needs = BloodNeed.query.filter(
-            (BloodNeed.expire_date < now.date()) | ((BloodNeed.expire_date == now.date()) & (BloodNeed.expire_time <= now.time()))
-        ).all()
-        for expired in expired_blood_needs:
-            db.session.delete(expired)
-        db.session.commit()
-
-        # Prepare the blood needs response
+        # Prepare the blood needs response before the commit below expires the loaded rows
         blood_needs_data = [
             {
                 "blood_need_id": need.blood_need_id,
@@ -606,14 +622,30 @@ def get_blood_bank_needs():
                 "units": need.units,
                 "location": need.location,
                 "hospital": need.hospital,
-                "expire_date": need.expire_date.strftime('%Y-%m-%d'),
+                "expire_date": need.expire_date,
                 "expire_time": need.expire_time.strftime('%H:%M'),
                 "blood_bank_id": need.blood_bank_id,
-                "blood_bank_name": BloodBank.query.get(need.blood_bank_id).name
+                "blood_bank_name": need.blood_bank.name
             }
             for need in blood_needs
         ]
 
+        # Remove expired blood needs in one statement, with one rollup update for all of them
+        expired = (BloodNeed.expire_date < now.date()) | ((BloodNeed.expire_date == now.date()) & (BloodNeed.expire_time <= now.time()))
+
+        def delete_expired():
+            expired_days = Counter(
+                (blood_bank_id, created_at.date())
+                for blood_bank_id, created_at in db.session.query(BloodNeed.blood_bank_id, BloodNeed.created_at).filter(expired)
+                if created_at
+            )
+            BloodNeed.query.filter(expired).delete(synchronize_session=False)
+            return expired_days
+
+        expired_days = sum(shards.gather(delete_expired), Counter())
+        rollups.record_blood_need_deltas({key: -count for key, count in expired_days.items()})
+        db.session.commit()
+
         return jsonify({
             "blood_needs": blood_needs_data
         }), 200
@@ -625,6 +657,41 @@ def get_blood_bank_needs():
         }), 500
 
 
+@donor_bp.route('/donor/stream', methods=['GET'])
+@jwt_required()
+def stream_updates():
+    try:
+        donor = Donor.query.get(get_jwt_identity())
+        if not donor:
+            return jsonify({"error": "Unauthorized access. Only donors can stream updates."}), 403
+
+        try:
+            last_event_id = event_bus.last_event_id()
+        except ValueError:
+            return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+
+        # The same scope as /blood_bank_needs and /blood_bank_events, plus the donor's own appointments.
+        # Following or unfollowing a bank takes effect when the stream reconnects.
+        donor_id = donor.id
+        followed = {blood_bank_id for blood_bank_id, in db.session.query(DonorBloodBank.blood_bank_id).filter_by(donor_id=donor_id)}
+        compatible_blood_types = set(get_compatible_blood_types(donor.blood_group))
+
+        def match(message):
+            if message.kind.startswith('appointment.'):
+                return message.donor_id == donor_id
+            if message.blood_bank_id not in followed:
+                return False
+            return message.kind != 'blood_need.created' or message.data['blood_type'] in compatible_blood_types
+
+        return event_bus.stream(match, last_event_id)
+
+    except Exception as e:
+        return jsonify({
+            "error": "An unexpected error occurred.",
+            "details": str(e)
+        }), 500
+
+
 @donor_bp.route('/update_donor_profile', methods=['PUT'])
 @jwt_required()
 def update_donor_profile():
@@ -655,6 +722,7 @@ def update_donor_profile():
             donor.phone_number = data['phone_number']
         if 'blood_group' in data:
             donor.blood_group = data['blood_group']
+            eligibility.record_donor(donor)
 
         # Commit changes to the database
         db.session.commit()
@@ -696,4 +764,79 @@ def get_donor_name():
             "error": "An unexpected error occurred.",
             "details": str(e)
         }), 500
-    
\ No newline at end of file
+    
+
+
+@donor_bp.route('/donor/notifications', methods=['GET'])
+@jwt_required()
+def get_notifications():
+    try:
+        donor_id = get_jwt_identity()
+        donor = Donor.query.get(donor_id)
+        if not donor:
+            return jsonify({"error": "Unauthorized access."}), 403
+
+        # Newest first, one page at a time: pass the last notification_id seen as `before`
+        before = request.args.get('before', type=int)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_NOTIFICATIONS_PAGE)
+
+        query = Notification.query.filter(Notification.donor_id == donor.id)
+        if before is not None:
+            query = query.filter(Notification.notification_id < before)
+        notifications = query.order_by(Notification.notification_id.desc()).limit(limit).all()
+
+        unread = (
+            db.session.query(func.count(Notification.notification_id))
+            .filter(Notification.donor_id == donor.id, Notification.read_at.is_(None))
+            .scalar()
+        )
+
+        return jsonify({
+            "notifications": [
+                {
+                    "notification_id": notification.notification_id,
+                    "kind": notification.kind,
+                    "blood_bank_id": notification.blood_bank_id,
+                    "reference_id": notification.reference_id,
+                    "title": notification.title,
+                    "body": notification.body,
+                    "created_at": notification.created_at,
+                    "read": notification.read_at is not None
+                }
+                for notification in notifications
+            ],
+            "unread": unread
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "An unexpected error occurred.",
+            "details": str(e)
+        }), 500
+
+
+@donor_bp.route('/donor/notifications/read', methods=['POST'])
+@jwt_required()
+def mark_notifications_read():
+    try:
+        donor_id = get_jwt_identity()
+        donor = Donor.query.get(donor_id)
+        if not donor:
+            return jsonify({"error": "Unauthorized access."}), 403
+
+        # Everything up to and including `up_to`, or all of the donor's notifications without it
+        up_to = (request.get_json(silent=True) or {}).get('up_to')
+        query = Notification.query.filter(Notification.donor_id == donor.id, Notification.read_at.is_(None))
+        if up_to is not None:
+            query = query.filter(Notification.notification_id <= int(up_to))
+        marked = query.update({Notification.read_at: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+        return jsonify({"message": "Notifications marked as read.", "marked": marked}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "An unexpected error occurred.",
+            "details": str(e)
+        }), 500
@@ -1,12 +1,17 @@
 import random
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from werkzeug.security import generate_password_hash
+from app.services.passwords import hash_password
 from app.models import Donor, StaffMember, Admin, Manager
 from app import db
 from app.models.blood_bank import BloodBank
 from app.models.registration_request import RegistrationRequest
+from app.services import audit, exports
+from app.services.accounts import email_in_use
+from app.services.compression import snapshot_cache
 from app.services.email_service import send_email
+from app.services.idempotency import idempotent
+from app.services.replicas import read_replica
 
 manager_bp = Blueprint('manager', __name__)
 
@@ -18,14 +23,9 @@ def request_registration():
     data = request.get_json()
 
     manager_email = data.get('manager_email')
-    existing_request = RegistrationRequest.query.filter_by(manager_email=manager_email).first()
 
     # Check if the email is already in use by any user type or existing request
-    if (StaffMember.query.filter_by(email=manager_email).first() or
-        Donor.query.filter_by(email=manager_email).first() or
-        Admin.query.filter_by(email=manager_email).first() or
-        Manager.query.filter_by(email=manager_email).first() or
-        existing_request):
+    if email_in_use(manager_email, include_requests=True):
         return jsonify({"error": "Email already in use"}), 409
 
     # Create a new registration request
@@ -50,6 +50,7 @@ def request_registration():
 # Desktop 3
 @manager_bp.route('/create-staff', methods=['POST'])
 @jwt_required()  
+@idempotent(store_body=False)
 def create_staff():
     current_user_id = get_jwt_identity()
 
@@ -75,7 +76,7 @@ def create_staff():
     max_staff_id = StaffMember.query.filter(StaffMember.id.between(300000, 399999)).order_by(StaffMember.id.desc()).first()
     next_staff_id = (max_staff_id.id + 1) if max_staff_id else 300000  
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = hash_password(password)
 
     mb = ("Welcome to the Blood Line team! Your account has been successfully created,\n"
           "and you can now log in to manage blood donation activities.\n\n"
@@ -96,12 +97,15 @@ def create_staff():
     db.session.add(new_staff_member)
     db.session.commit()
 
+    audit.record("staff.create", manager, manager.blood_bank_id, "staff_member", next_staff_id, email=email, role=role)
+
     return jsonify({"message": f"Staff member created successfully, pass: {password}"}), 200
 
 
 # Desktop 4
 @manager_bp.route('/get-staff', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_staff():
 
     current_user_id = get_jwt_identity()
@@ -143,6 +147,8 @@ def delete_staff_member(staff_id):
     db.session.delete(staff_member)
     db.session.commit()
 
+    audit.record("staff.delete", manager, manager.blood_bank_id, "staff_member", staff_id)
+
     return jsonify({"message": "Staff member deleted successfully"}), 200
 
 
@@ -191,6 +197,10 @@ def manage_contact_us():
 
             # Save changes to the database
             db.session.commit()
+            snapshot_cache.invalidate('blood_banks')
+
+            audit.record("blood_bank.update_contact", manager, blood_bank.blood_bank_id, "blood_bank", blood_bank.blood_bank_id,
+                         fields=sorted(data.keys()))
 
             return jsonify({"message": "Contact Us details updated successfully"}), 200
 
@@ -198,3 +208,23 @@ def manage_contact_us():
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
 
+@manager_bp.route('/manager/export/<dataset>', methods=['GET'])
+@jwt_required()
+def export_bank_data(dataset):
+    manager = Manager.query.get(get_jwt_identity())
+    if not manager:
+        return jsonify({"error": "Unauthorized access."}), 403
+    if dataset not in exports.DATASETS:
+        return jsonify({"error": "dataset must be one of: " + ", ".join(exports.DATASETS)}), 404
+
+    try:
+        export_format, start, end = exports.options(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        audit.record("data.export", manager, manager.blood_bank_id, dataset=dataset, format=export_format)
+        return exports.export(dataset, export_format, manager.blood_bank_id, start, end)
+
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
@@ -1,6 +1,8 @@
+from collections import Counter
 from datetime import date, timedelta, datetime 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy.orm import contains_eager, joinedload
 from app.models import Donor, StaffMember, Admin, Manager
 from app import db
 from app.models.appointment import Appointment
@@ -10,12 +12,20 @@ from app.models.event import Event
 from app.models.blood_donation import BloodDonation
 from app.models.blood_inventory import BloodInventory
 from app.models.volunteering import Volunteering
+from app.services import audit, eligibility, rollups
+from app.services.blood_types import COMPATIBLE_RECIPIENTS
+from app.services.donor_roster import get_roster_page, record_donation
+from app.services.idempotency import idempotent
+from app.services.notifications import notifier
+from app.services.pubsub import appointment_payload, event_bus
+from app.services.replicas import read_replica
 
 staff_bp = Blueprint('staff', __name__)
 
 
 @staff_bp.route('/blood_inventory', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_blood_inventory():
     try:
         # Get the current user ID from the JWT
@@ -38,7 +48,7 @@ def get_blood_inventory():
             "inventory_id": item.Inventory_ID,
             "blood_type": item.Blood_Type,
             "quantity": item.Quantity,
-            "expiration_date": item.Expiration_Date.strftime('%Y-%m-%d')
+            "expiration_date": item.Expiration_Date
         } for item in inventory]
 
         return jsonify({
@@ -52,6 +62,7 @@ def get_blood_inventory():
 
 @staff_bp.route('/blood_inventory/take', methods=['POST'])
 @jwt_required()
+@idempotent
 def take_blood_unit():
     try:
         # Get the current user ID from the JWT
@@ -96,6 +107,9 @@ def take_blood_unit():
         inventory_item.Quantity -= quantity
         db.session.commit()
 
+        audit.record("blood_unit.take", staff_member, blood_bank_id, "blood_inventory", inventory_item.Inventory_ID,
+                     blood_type=blood_type, quantity=quantity, remaining=inventory_item.Quantity)
+
         return jsonify({
             "message": f"Successfully taken {quantity} units of {blood_type}",
             "remaining_quantity": inventory_item.Quantity
@@ -129,21 +143,14 @@ def get_today_appointments():
 
         if status_type == "Appointmen":
             # Retrieve appointments for the blood bank that are scheduled for today and are pending
-            appointments = Appointment.query.filter_by(
+            appointments = Appointment.query.options(joinedload(Appointment.donor)).filter_by(
                 blood_bank_id=staff_member.blood_bank_id,
                 appointment_date=today, 
                 status="Pending"
             ).all()
 
             # Format the data for response
-            appointments_data = [{
-                "id" : appointment.appointment_id,
-                "Name": appointment.donor.username,  # Assuming Donor has a username field
-                "Email": appointment.donor.email,   # Assuming Donor has an email field
-                "Date": appointment.appointment_date.strftime('%Y-%m-%d'),
-                "status" : appointment.status,
-                "time": appointment.appointment_time.strftime('%H:%M:%S')  # Format the time
-            } for appointment in appointments]
+            appointments_data = [appointment_payload(appointment) for appointment in appointments]
 
             return jsonify({
                 "today_appointments": appointments_data,
@@ -151,21 +158,14 @@ def get_today_appointments():
 
         elif status_type == "Donation":
             # Retrieve appointments for the blood bank that are scheduled for today and are Open
-            appointments = Appointment.query.filter_by(
+            appointments = Appointment.query.options(joinedload(Appointment.donor)).filter_by(
                 blood_bank_id=staff_member.blood_bank_id,
                 appointment_date=today, 
                 status="Open"
             ).all()
 
             # Format the data for response
-            appointments_data = [{
-                "id" : appointment.appointment_id,
-                "Name": appointment.donor.username,  # Assuming Donor has a username field
-                "Email": appointment.donor.email,   # Assuming Donor has an email field
-                "Date": appointment.appointment_date.strftime('%Y-%m-%d'),
-                "status" : appointment.status,
-                "time": appointment.appointment_time.strftime('%H:%M:%S')  # Format the time
-            } for appointment in appointments]
+            appointments_data = [appointment_payload(appointment) for appointment in appointments]
 
             return jsonify({
                 "today_appointments": appointments_data,
@@ -177,8 +177,34 @@ def get_today_appointments():
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
     
     
+@staff_bp.route('/staff/stream', methods=['GET'])
+@jwt_required()
+def stream_updates():
+    try:
+        current_user_id = get_jwt_identity()
+
+        staff_member = StaffMember.query.get(current_user_id)
+        if not staff_member:
+            return jsonify({"error": "Staff member not found"}), 404
+        if not staff_member.blood_bank_id:
+            return jsonify({"error": "Staff member is not associated with any blood bank"}), 400
+
+        try:
+            last_event_id = event_bus.last_event_id()
+        except ValueError:
+            return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+
+        # New appointments, their status changes, events and blood needs of the staff member's bank
+        blood_bank_id = staff_member.blood_bank_id
+        return event_bus.stream(lambda message: message.blood_bank_id == blood_bank_id, last_event_id)
+
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
 @staff_bp.route('/staff/open_appointment', methods=['POST'])
 @jwt_required()
+@idempotent
 def open_appointment():
     # Get the current authenticated staff member's ID
     current_user_id = get_jwt_identity()
@@ -218,7 +244,9 @@ def open_appointment():
 
             # Update the appointment status to 'Canceled'
             appointment.status = 'Canceled'
+            event_bus.publish_appointment('appointment.canceled', appointment)
             db.session.commit()
+            audit.record("appointment.cancel", staff_member, staff_member.blood_bank_id, "appointment", appointment.appointment_id)
             return jsonify({"message": "Appointment Canceled successfully"}), 200
 
         elif s == "open":
@@ -228,7 +256,9 @@ def open_appointment():
 
             # Update the appointment status to 'Open'
             appointment.status = 'Open'
+            event_bus.publish_appointment('appointment.opened', appointment)
             db.session.commit()
+            audit.record("appointment.open", staff_member, staff_member.blood_bank_id, "appointment", appointment.appointment_id)
 
             return jsonify({"message": "Appointment opened successfully"}), 200
         else:
@@ -240,6 +270,7 @@ def open_appointment():
 
 @staff_bp.route('/complete_appointment/<int:appointment_id>', methods=['POST'])
 @jwt_required()
+@idempotent
 def complete_appointment(appointment_id):
     try:
         # Get the current user ID from the JWT
@@ -294,6 +325,11 @@ def complete_appointment(appointment_id):
         )
         db.session.add(donation)
 
+        # Keep the per-bank donor roster and the donor's eligibility in step with the new donation
+        record_donation(staff_member.blood_bank_id, appointment.donor_id, donation.donation_date)
+        eligibility.record_donation(donor, donation.donation_date)
+        rollups.record_donation(staff_member.blood_bank_id, donation.donation_date, blood_type, quantity_donated)
+
         # Update the blood inventory
         inventory = BloodInventory.query.filter_by(
             blood_bank_ID=staff_member.blood_bank_id, Blood_Type=blood_type
@@ -314,8 +350,12 @@ def complete_appointment(appointment_id):
 
         # Mark the appointment as completed
         appointment.status = "Complete"
+        event_bus.publish_appointment('appointment.completed', appointment)
         db.session.commit()
 
+        audit.record("appointment.complete", staff_member, staff_member.blood_bank_id, "appointment", appointment_id,
+                     donor_id=appointment.donor_id, blood_type=blood_type, quantity_donated=quantity_donated)
+
         return jsonify({"message": "Appointment completed successfully"}), 200
 
     except Exception as e:
@@ -325,6 +365,7 @@ def complete_appointment(appointment_id):
 
 @staff_bp.route('/donors', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_donors():
     try:
         # Get the current user ID from the JWT
@@ -339,31 +380,83 @@ def get_donors():
         # Get the blood bank ID associated with the staff member
         blood_bank_id = staff_member.blood_bank_id
 
-        # Fetch the donations for the associated blood bank
-        donations = BloodDonation.query.filter_by(blood_bank_id=blood_bank_id).all()
+        # Paging, sorting and filtering options
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        blood_type = request.args.get('blood_type')
+        order = request.args.get('order', 'desc')
+
+        # Fetch one page of the bank's donors from the affinity table
+        rows, total = get_roster_page(blood_bank_id, page, per_page, blood_type, order)
 
-        if not donations:
+        if not total:
             return jsonify({
                 "message": "No donations found for this blood bank.",
-                "donors": []
+                "donors": [],
+                "count": 0,
+                "total": 0
             }), 200
 
-        # Fetch unique donors for the donations
-        donor_ids = {donation.donor_id for donation in donations}
-        donors = Donor.query.filter(Donor.id.in_(donor_ids)).all()
-
         # Convert donor data into a list of dictionaries
+        today = date.today()
         donor_list = [{
             "name": donor.username,
             "blood_type": donor.blood_group,
             "email": donor.email,
-            "age": (date.today().year - donor.date_of_birth.year) if donor.date_of_birth else None,
+            "age": (today.year - donor.date_of_birth.year) if donor.date_of_birth else None,
             "gender": donor.gender,
-        } for donor in donors]
+            "last_donation_date": affinity.last_donation_date,
+            "donation_count": affinity.donation_count
+        } for affinity, donor in rows]
+
+        return jsonify({
+            "donors": donor_list,
+            "count": len(donor_list),
+            "total": total,
+            "page": max(page, 1)
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@staff_bp.route('/staff/eligible_donors', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_eligible_donors():
+    try:
+        current_user_id = get_jwt_identity()
+
+        staff_member = StaffMember.query.filter_by(id=current_user_id).first()
+        if not staff_member:
+            return jsonify({"error": "Unauthorized access"}), 403
+        if not staff_member.blood_bank_id:
+            return jsonify({"error": "Staff member is not associated with any blood bank"}), 400
+
+        blood_type = request.args.get('blood_type')
+        if blood_type not in COMPATIBLE_RECIPIENTS:
+            return jsonify({"error": "blood_type must be one of: " + ", ".join(COMPATIBLE_RECIPIENTS)}), 400
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+
+        # Followers of the bank who can give to blood_type today, from the eligibility index
+        rows, total = eligibility.eligible_donors(staff_member.blood_bank_id, blood_type, page, per_page)
+
+        donor_list = [{
+            "donor_id": donor.id,
+            "name": donor.username,
+            "blood_type": entry.blood_group,
+            "email": donor.email,
+            "phone_number": donor.phone_number,
+            "last_donation_date": entry.last_donation_date,
+            "eligible_since": entry.next_eligible_date if entry.last_donation_date else None
+        } for entry, donor in rows]
 
         return jsonify({
             "donors": donor_list,
-            "count": len(donor_list)
+            "count": len(donor_list),
+            "total": total,
+            "page": max(page, 1)
         }), 200
 
     except Exception as e:
@@ -398,6 +491,7 @@ def get_volunteering_status():
 
 @staff_bp.route('/volunteers', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_volunteers():
     try:
         # Get the current user ID from the JWT
@@ -409,7 +503,11 @@ def get_volunteers():
             return jsonify({"error": "Unauthorized access. Only staff members can view volunteers."}), 403
 
         # Query all volunteers from the database
-        volunteers = Volunteering.query.join(Donor, Volunteering.donor_id == Donor.id).all()
+        volunteers = (
+            Volunteering.query.join(Donor, Volunteering.donor_id == Donor.id)
+            .options(contains_eager(Volunteering.donor))
+            .all()
+        )
 
         # Prepare a list of volunteer information
         volunteers_list = [{
@@ -433,6 +531,7 @@ def get_volunteers():
 
 @staff_bp.route('/events', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_event():
     try:
         # Get the current user ID from the JWT
@@ -478,8 +577,22 @@ def create_event():
 
         # Add the new event to the database
         db.session.add(new_event)
+        rollups.record_event(blood_bank_id, event_date)
+        db.session.flush()  # Get the event ID
+        event_bus.publish('event.created', blood_bank_id, {
+            "event_id": new_event.event_id,
+            "title": title,
+            "description": description,
+            "event_date": event_date,
+            "event_time": event_time.strftime('%H:%M'),
+            "location": location,
+            "blood_bank_id": blood_bank_id,
+            "blood_bank_name": staff_member.blood_bank.name
+        })
         db.session.commit()
 
+        audit.record("event.create", staff_member, blood_bank_id, "event", new_event.event_id, title=title)
+
         return jsonify({"message": "Event created successfully", "event_id": new_event.event_id}), 201
 
     except Exception as e:
@@ -508,10 +621,14 @@ def get_events():
         # Get the current date
         current_date = datetime.now().date()
 
-        # Filter and delete past events
-        for event in events:
-            if event.event_date < current_date:
-                db.session.delete(event)
+        # Delete past events in one statement, with one rollup update for all of their days
+        past_days = Counter((blood_bank_id, event.event_date) for event in events if event.event_date < current_date)
+        if past_days:
+            Event.query.filter(
+                Event.blood_bank_id == blood_bank_id,
+                Event.event_date < current_date
+            ).delete(synchronize_session=False)
+            rollups.record_event_deltas({key: -count for key, count in past_days.items()})
 
         # Commit the deletions
         db.session.commit()
@@ -524,8 +641,8 @@ def get_events():
             "event_id": event.event_id,
             "title": event.title,
             "description": event.description,
-            "event_date": event.event_date.strftime('%Y-%m-%d'),
-            "event_time": event.event_time.strftime('%H:%M:%S'),
+            "event_date": event.event_date,
+            "event_time": event.event_time,
             "location": event.location
         } for event in events]
 
@@ -562,8 +679,12 @@ def delete_event(event_id):
 
         # Delete the event
         db.session.delete(event)
+        rollups.record_event(blood_bank_id, event.event_date, -1)
+        event_bus.publish('event.deleted', blood_bank_id, {"event_id": event_id, "blood_bank_id": blood_bank_id})
         db.session.commit()
 
+        audit.record("event.delete", staff_member, blood_bank_id, "event", event_id)
+
         return jsonify({"message": "Event deleted successfully"}), 200
 
     except Exception as e:
@@ -572,6 +693,7 @@ def delete_event(event_id):
 
 @staff_bp.route('/blood_need', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_blood_need():
     try:
         data = request.get_json()
@@ -612,12 +734,33 @@ def create_blood_need():
             hospital=blood_bank.name,  # Use the blood bank name as the hospital
             expire_date=expire_date,
             expire_time=expire_time,
+            created_at=datetime.utcnow(),
             blood_bank_id=blood_bank.blood_bank_id
         )
 
         # Save to database
         db.session.add(new_blood_need)
+        rollups.record_blood_need(blood_bank.blood_bank_id, new_blood_need.created_at.date())
+        db.session.flush()  # Get the blood need ID
+
+        # Compatible followers are notified in the background once the need is committed
+        notifier.queue_blood_need(new_blood_need)
+        event_bus.publish('blood_need.created', blood_bank.blood_bank_id, {
+            "blood_need_id": new_blood_need.blood_need_id,
+            "blood_type": blood_types,
+            "units": new_blood_need.units,
+            "location": location,
+            "hospital": blood_bank.name,
+            "expire_date": expire_date,
+            "expire_time": expire_time.strftime('%H:%M'),
+            "blood_bank_id": blood_bank.blood_bank_id,
+            "blood_bank_name": blood_bank.name
+        })
         db.session.commit()
+        notifier.wake()
+
+        audit.record("blood_need.create", staff_member, blood_bank.blood_bank_id, "blood_need", new_blood_need.blood_need_id,
+                     blood_types=blood_types, units=units)
 
         return jsonify({'message': 'Blood need created successfully', 'bloodNeed': new_blood_need.blood_types}), 201
 
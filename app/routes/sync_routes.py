@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from app import db
+from app.models import Donor, Admin, Manager, StaffMember
+from app.models.blood_bank import DonorBloodBank
+from app.services import sync
+from app.services.blood_types import recipients_for
+
+sync_bp = Blueprint('sync', __name__)
+
+
+@sync_bp.route('/sync', methods=['GET'])
+@jwt_required()
+def sync_changes():
+    current_user_id = get_jwt_identity()
+
+    try:
+        cursor = sync.parse_cursor(request.args.get('since'))
+    except ValueError:
+        return jsonify({"error": "since must be a cursor returned by /sync"}), 400
+
+    try:
+        user = Donor.query.get(current_user_id) or \
+               Admin.query.get(current_user_id) or \
+               Manager.query.get(current_user_id) or \
+               StaffMember.query.get(current_user_id)
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        # Banks and FAQs go to everyone; events and needs in the scope of the user's own lists.
+        # A donor who follows or unfollows a bank should sync again without a cursor.
+        if isinstance(user, Donor):
+            bank_ids = [blood_bank_id for blood_bank_id, in
+                        db.session.query(DonorBloodBank.blood_bank_id).filter_by(donor_id=user.id)]
+            changes = sync.changes_since(cursor, bank_ids, recipients_for(user.blood_group))
+        elif isinstance(user, Admin):
+            changes = sync.changes_since(cursor)
+        else:
+            changes = sync.changes_since(cursor, [user.blood_bank_id])
+
+        return jsonify(changes), 200
+
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
@@ -0,0 +1,16 @@
+from sqlalchemy import literal, select, union_all
+from app import db
+from app.models.registration_request import RegistrationRequest
+from app.models.users import Admin, Donor, Manager, StaffMember
+
+
+def email_in_use(email, include_requests=False):
+    """Check every user table (and optionally registration requests) for an email in one round trip."""
+    lookups = [
+        select(literal(1)).where(model.email == email)
+        for model in (StaffMember, Donor, Admin, Manager)
+    ]
+    if include_requests:
+        lookups.append(select(literal(1)).where(RegistrationRequest.manager_email == email))
+
+    return db.session.execute(union_all(*lookups).limit(1)).first() is not None
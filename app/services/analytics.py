@@ -0,0 +1,154 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy import case, func
+from app import db
+from app.models.blood_bank import BloodBank
+from app.models.blood_inventory import BloodInventory
+from app.models.daily_stats import DailyBankStats, DailyBloodTypeUnits
+from app.models.users import Donor
+from app.services.cache import TTLCache
+from app.services.shards import shards
+
+analytics_cache = TTLCache(ttl=60)
+
+AGE_BANDS = [(18, 24), (25, 34), (35, 44), (45, 54), (55, 64), (65, None)]
+
+
+def _cached(key, compute):
+    ttl = current_app.config.get('ANALYTICS_CACHE_TTL', 60)
+    return analytics_cache.get_or_compute(key, compute, ttl)
+
+
+def _subtract_years(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        # 29 February in a non-leap target year
+        return day.replace(year=day.year - years, day=28)
+
+
+def donations_per_bank_per_week(weeks=12):
+    """Weekly donation counts for every bank, bucketed from the daily rollups in one pass."""
+    def compute():
+        today = date.today()
+        first_week = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks - 1)
+
+        rows = shards.scatter(db.session, (
+            db.select(DailyBankStats.blood_bank_id, DailyBankStats.day, DailyBankStats.donations_count)
+            .filter(DailyBankStats.day >= first_week, DailyBankStats.day <= today)
+        ))
+        names = dict(db.session.query(BloodBank.blood_bank_id, BloodBank.name).all())
+
+        week_starts = [first_week + timedelta(weeks=i) for i in range(weeks)]
+        counts = defaultdict(lambda: [0] * weeks)
+        for bank_id, day, donations_count in rows:
+            counts[bank_id][(day - first_week).days // 7] += donations_count
+
+        return {
+            "weeks": list(week_starts),
+            "banks": [
+                {
+                    "blood_bank_id": bank_id,
+                    "name": names.get(bank_id),
+                    "donations": weekly
+                }
+                for bank_id, weekly in sorted(counts.items())
+            ]
+        }
+
+    return _cached(('donations_per_bank_per_week', weeks), compute)
+
+
+def blood_type_distribution(days=30):
+    """Registered donors per blood group, and units donated per blood type over the last `days`."""
+    def compute():
+        since = date.today() - timedelta(days=days)
+
+        donors = (
+            db.session.query(Donor.blood_group, func.count(Donor.id))
+            .group_by(Donor.blood_group)
+            .all()
+        )
+        units = shards.scatter(db.session, (
+            db.select(DailyBloodTypeUnits.blood_type, func.sum(DailyBloodTypeUnits.units))
+            .filter(DailyBloodTypeUnits.day >= since)
+            .group_by(DailyBloodTypeUnits.blood_type)
+        ))
+
+        units_donated = defaultdict(float)
+        for blood_type, total in units:
+            units_donated[blood_type] += total
+
+        return {
+            "donors": {blood_group: count for blood_group, count in donors},
+            "units_donated": dict(units_donated),
+            "days": days
+        }
+
+    return _cached(('blood_type_distribution', days), compute)
+
+
+def donor_demographics():
+    """Donor counts by gender and age band, bucketed in SQL from date_of_birth."""
+    def compute():
+        today = date.today()
+
+        # A donor is at least `low` years old when born on or before today minus `low` years
+        whens = []
+        for low, high in AGE_BANDS:
+            label = f"{low}+" if high is None else f"{low}-{high}"
+            condition = Donor.date_of_birth <= _subtract_years(today, low)
+            if high is not None:
+                condition = condition & (Donor.date_of_birth > _subtract_years(today, high + 1))
+            whens.append((condition, label))
+        band = case(*whens, else_=case((Donor.date_of_birth.is_(None), 'unknown'), else_='under 18'))
+
+        rows = (
+            db.session.query(Donor.gender, band, func.count(Donor.id))
+            .group_by(Donor.gender, band)
+            .all()
+        )
+
+        demographics = defaultdict(dict)
+        for gender, age_band, count in rows:
+            demographics[gender or 'unknown'][age_band] = count
+
+        return {"demographics": demographics}
+
+    return _cached(('donor_demographics',), compute)
+
+
+def inventory_totals():
+    """Units per blood type across every bank, split into usable and expired stock."""
+    def compute():
+        today = date.today()
+        rows = shards.scatter(db.session, (
+            db.select(
+                BloodInventory.Blood_Type,
+                func.sum(BloodInventory.Quantity),
+                func.sum(case((BloodInventory.Expiration_Date >= today, BloodInventory.Quantity), else_=0)),
+                func.count(func.distinct(BloodInventory.blood_bank_ID))
+            )
+            .group_by(BloodInventory.Blood_Type)
+        ))
+
+        # Each bank lives on one shard, so per-shard bank counts add up too
+        totals = {}
+        for blood_type, total, available, banks in rows:
+            previous = totals.get(blood_type, (0, 0, 0))
+            totals[blood_type] = (previous[0] + int(total or 0), previous[1] + int(available or 0), previous[2] + banks)
+
+        return {
+            "inventory": [
+                {
+                    "blood_type": blood_type,
+                    "total_quantity": total,
+                    "available_quantity": available,
+                    "blood_banks": banks
+                }
+                for blood_type, (total, available, banks) in totals.items()
+            ]
+        }
+
+    return _cached(('inventory_totals',), compute)
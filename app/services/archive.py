@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import exists, literal, select, union_all
+from app import db
+from app.models.appointment import Appointment
+from app.models.archive import ArchivedAppointment, ArchivedBloodDonation
+from app.models.blood_donation import BloodDonation
+from app.services.shards import shards
+
+# Hot model -> its archive model and the date that decides when a row goes cold
+ARCHIVES = {
+    Appointment: (ArchivedAppointment, 'appointment_date'),
+    BloodDonation: (ArchivedBloodDonation, 'donation_date'),
+}
+
+
+class Archiver:
+    """Moves appointments and donations past ARCHIVE_AFTER_DAYS into their archive tables.
+
+    Rows are moved ARCHIVE_BATCH_SIZE at a time, oldest first, each batch in its own short
+    transaction on its own shard, so requests never wait long on the write lock. Donations go
+    first: an appointment stays hot while a hot donation still refers to it. A background thread
+    in each worker process runs a pass every ARCHIVE_INTERVAL seconds; `flask archive` runs one
+    on demand. Readers of history combine both tiers, see `both_tiers()`.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('ARCHIVE_AFTER_DAYS', 730)
+        app.config.setdefault('ARCHIVE_BATCH_SIZE', 1000)  # rows per transaction
+        app.config.setdefault('ARCHIVE_INTERVAL', 3600.0)  # seconds between background passes; 0 disables them
+        app.config.setdefault('ARCHIVE_PAUSE', 0.05)  # seconds between batches, for other writers to get in
+        app.extensions['archiver'] = {'pid': None, 'lock': threading.Lock()}
+        app.before_request(self._ensure_worker)
+
+    def run(self, after_days=None, log=None):
+        """Archive everything past the retention window. Returns {'donations': n, 'appointments': n}."""
+        config = current_app.config
+        after_days = config['ARCHIVE_AFTER_DAYS'] if after_days is None else after_days
+        cutoff = datetime.utcnow().date() - timedelta(days=after_days)
+        moved = {'donations': 0, 'appointments': 0}
+        for name, model in (('donations', BloodDonation), ('appointments', Appointment)):
+            date_column = getattr(model, ARCHIVES[model][1])
+            for key in shards.keys():
+                with shards.using(key):
+                    while True:
+                        count = move(model, [date_column < cutoff], limit=config['ARCHIVE_BATCH_SIZE'])
+                        db.session.commit()
+                        moved[name] += count
+                        if log and count:
+                            log(f"shard {key}: archived {count} {name}")
+                        if count < config['ARCHIVE_BATCH_SIZE']:
+                            break
+                        time.sleep(config['ARCHIVE_PAUSE'])
+        return moved
+
+    def _ensure_worker(self):
+        app = current_app._get_current_object()
+        state = app.extensions['archiver']
+        if state['pid'] == os.getpid() or app.config['ARCHIVE_INTERVAL'] <= 0:
+            return
+        with state['lock']:
+            # Started lazily, and again after a fork, since threads do not survive fork()
+            if state['pid'] != os.getpid():
+                state['pid'] = os.getpid()
+                threading.Thread(target=self._loop, args=(app,), name='archiver', daemon=True).start()
+
+    def _loop(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    moved = self.run()
+                    if any(moved.values()):
+                        app.logger.info("Archived %(donations)d donations and %(appointments)d appointments", moved)
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error("Archiving failed: %s", e)
+                finally:
+                    db.session.remove()
+            time.sleep(app.config['ARCHIVE_INTERVAL'])
+
+
+def move(model, criteria, limit=None):
+    """Move the rows of `model` matching `criteria` to its archive table, oldest first, at most
+    `limit` of them. Runs on the current shard, in the current transaction; caller commits.
+
+    Appointments that a hot donation refers to are left in place. Returns the number of rows moved.
+    """
+    archive, date_name = ARCHIVES[model]
+    table, archive_table = model.__table__, archive.__table__
+    row_id = next(iter(table.primary_key.columns))
+    if model is Appointment:
+        criteria = list(criteria) + [~exists().where(BloodDonation.appointment_id == row_id)]
+
+    ids = db.session.execute(
+        select(row_id).where(*criteria).order_by(table.c[date_name], row_id).limit(limit)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    names = [column.name for column in table.columns]
+    db.session.execute(archive_table.insert().from_select(
+        names + ['archived_at'],
+        select(*table.columns, literal(datetime.utcnow())).where(row_id.in_(ids))
+    ))
+    db.session.execute(table.delete().where(row_id.in_(ids)))
+    return len(ids)
+
+
+def both_tiers(model):
+    """The rows of `model` and of its archive table as one subquery, with `model`'s column names."""
+    archive = ARCHIVES[model][0].__table__
+    names = [column.name for column in model.__table__.columns]
+    return union_all(
+        select(*(model.__table__.c[name] for name in names)),
+        select(*(archive.c[name] for name in names))
+    ).subquery(f"{model.__tablename__}_all")
+
+
+archiver = Archiver()
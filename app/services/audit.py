@@ -0,0 +1,207 @@
+import atexit
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+from flask import current_app, has_app_context
+from app import db
+from app.models.audit_event import AuditEvent
+
+# Rows per multi-row INSERT; keeps well under SQLite's bound-parameter limit
+INSERT_CHUNK = 90
+
+
+class AuditLog:
+    """Buffers audit events in memory and writes them to the database in batched multi-row INSERTs.
+
+    Every buffered event is also appended to a per-process journal file, so events that were
+    buffered but never flushed (crash, kill, database outage) are replayed on the next flush.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._journal = None
+        self._batch_seq = 0
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        app.config.setdefault('AUDIT_ENABLED', True)
+        app.config.setdefault('AUDIT_FLUSH_SIZE', 200)
+        app.config.setdefault('AUDIT_FLUSH_INTERVAL', 2.0)  # seconds
+        app.config.setdefault('AUDIT_SPOOL_DIR', os.path.join(app.instance_path, 'audit_spool'))
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+
+    @property
+    def spool_dir(self):
+        return self.app.config['AUDIT_SPOOL_DIR']
+
+    def record(self, action, actor=None, blood_bank_id=None, target_type=None, target_id=None, **details):
+        """Queue an audit event. Never raises into the calling route."""
+        app = current_app._get_current_object()
+        if not app.config.get('AUDIT_ENABLED'):
+            return
+
+        now = datetime.utcnow()
+        event = {
+            'month': now.year * 100 + now.month,
+            'occurred_at': now.isoformat(),
+            'actor_id': int(actor.id) if actor is not None else None,
+            'actor_type': actor.__class__.__name__ if actor is not None else None,
+            'action': action,
+            'blood_bank_id': blood_bank_id,
+            'target_type': target_type,
+            'target_id': target_id,
+            'details': json.dumps(details, default=str) if details else None
+        }
+
+        try:
+            with self._lock:
+                self._ensure_worker(app)
+                self._buffer.append(event)
+                self._journal.write(json.dumps(event) + '\n')
+                self._journal.flush()
+                full = len(self._buffer) >= self.app.config['AUDIT_FLUSH_SIZE']
+            if full:
+                self._wakeup.set()
+        except Exception as e:
+            app.logger.error("Failed to queue audit event %s: %s", action, e)
+
+    def flush(self):
+        """Write every buffered and spooled event to the database."""
+        if self.app is None and has_app_context():
+            # Nothing recorded in this process yet, e.g. `flask flush-audit` replaying spooled batches
+            self.app = current_app._get_current_object()
+        if self.app is None or not os.path.isdir(self.spool_dir):
+            return 0
+
+        with self._lock:
+            self._rotate_journal()
+
+        written = 0
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, '*.batch'))):
+            written += self._write_batch(path)
+        return written
+
+    def _ensure_worker(self, app):
+        # Started lazily, and again after a fork, since threads do not survive fork()
+        if self._pid == os.getpid():
+            return
+        self.app = app
+        self._pid = os.getpid()
+        self._buffer = []
+        self._journal = None
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._claim_orphans()
+        self._journal = open(self._journal_path(), 'a', encoding='utf-8')
+        threading.Thread(target=self._run, name='audit-flusher', daemon=True).start()
+
+    def _journal_path(self):
+        return os.path.join(self.spool_dir, f'audit-{self._pid}.journal')
+
+    def _claim_orphans(self):
+        # Journals left behind by dead processes become batches for this process to replay
+        for path in glob.glob(os.path.join(self.spool_dir, 'audit-*.journal')):
+            pid = int(os.path.basename(path)[len('audit-'):-len('.journal')])
+            if pid == self._pid or not _pid_alive(pid):
+                try:
+                    os.replace(path, path[:-len('.journal')] + f'-orphan-{self._pid}.batch')
+                except OSError:
+                    pass  # Claimed by another worker first
+
+        # Batches a dead process had claimed but not finished writing go back in the queue
+        for path in glob.glob(os.path.join(self.spool_dir, '*.batch.*')):
+            pid = int(path.rsplit('.', 1)[1].split('-')[0])
+            if not _pid_alive(pid):
+                try:
+                    os.replace(path, path.rsplit('.', 1)[0])
+                except OSError:
+                    pass
+
+    def _rotate_journal(self):
+        # Caller holds the lock. Turns the current journal into a batch file and starts a fresh one.
+        if self._journal is None or self._pid != os.getpid() or not self._buffer:
+            return
+
+        self._journal.close()
+        self._batch_seq += 1
+        batch_path = os.path.join(self.spool_dir, f'audit-{self._pid}-{self._batch_seq:08d}.batch')
+        os.replace(self._journal_path(), batch_path)
+        self._journal = open(self._journal_path(), 'a', encoding='utf-8')
+        self._buffer = []
+
+    def _write_batch(self, path):
+        # Claim the batch first so two flushers never insert the same file
+        claimed = f'{path}.{os.getpid()}-{threading.get_ident()}'
+        try:
+            os.replace(path, claimed)
+        except OSError:
+            return 0
+
+        try:
+            with open(claimed, encoding='utf-8') as batch:
+                rows = [json.loads(line) for line in batch if line.strip()]
+        except (OSError, ValueError) as e:
+            self.app.logger.error("Unreadable audit batch %s: %s", claimed, e)
+            return 0
+
+        for row in rows:
+            row['occurred_at'] = datetime.fromisoformat(row['occurred_at'])
+
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    for start in range(0, len(rows), INSERT_CHUNK):
+                        connection.execute(AuditEvent.__table__.insert().values(rows[start:start + INSERT_CHUNK]))
+        except Exception as e:
+            # Put the batch back on disk; the next flush retries it
+            os.replace(claimed, path)
+            self.app.logger.error("Audit flush failed, %d events kept in %s: %s", len(rows), path, e)
+            return 0
+
+        os.remove(claimed)
+        return len(rows)
+
+    def _run(self):
+        interval = self.app.config['AUDIT_FLUSH_INTERVAL']
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error("Audit flusher error: %s", e)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+audit_log = AuditLog()
+
+
+def record(action, actor=None, blood_bank_id=None, target_type=None, target_id=None, **details):
+    audit_log.record(action, actor, blood_bank_id, target_type, target_id, **details)
+
+
+def prune_months(keep_months):
+    """Drop whole months of audit history older than the newest `keep_months` months."""
+    now = datetime.utcnow()
+    month_index = now.year * 12 + (now.month - 1) - keep_months + 1
+    oldest_kept = (month_index // 12) * 100 + month_index % 12 + 1
+
+    deleted = AuditEvent.query.filter(AuditEvent.month < oldest_kept).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, request
+from werkzeug.test import EnvironBuilder
+
+# WSGI environ key carrying the token ID the batch itself was authenticated with. Only the server
+# sets environ keys without an HTTP_ prefix, so a client cannot forge it.
+VERIFIED_JTI = 'bloodline.batch.verified_jti'
+
+METHODS = {'GET', 'POST', 'PUT', 'DELETE'}
+CONCURRENT_METHODS = {'GET'}
+
+# Streamed responses a batch would have to hold in memory whole: event streams and exports
+STREAMED_MIMETYPES = {'text/event-stream', 'text/csv', 'application/x-ndjson'}
+
+# Endpoints refused as items. Later items skip the blacklist check, so they would still run on a
+# token revoked by a logout item.
+REFUSED_ENDPOINTS = {
+    'batch.run_batch': "Batches cannot be nested",
+    'auth.logout': "Logout cannot be batched",
+}
+
+
+def run(items, jti):
+    """Run the sub-requests of a /batch call and return one result dict per item, in order.
+
+    Each item runs through the normal route with the caller's token, in its own request and app
+    context, so it gets its own session and `g`. With BATCH_THREADS above 1, consecutive GETs run
+    concurrently on that many threads. Any other method waits for everything before it, and
+    everything after waits for it, so a batch that writes and then reads sees its own write.
+    """
+    app = current_app._get_current_object()
+    # Read from the batch's own request here; the worker threads have no request context of their own
+    origin = {
+        'base_url': request.host_url,
+        'headers': {'Authorization': request.headers.get('Authorization', '')},
+        'environ_base': {'REMOTE_ADDR': request.remote_addr, VERIFIED_JTI: jti}
+    }
+    results = [None] * len(items)
+
+    def execute(index):
+        results[index] = _execute(app, items[index], index, origin)
+
+    wave = []
+    for index, item in enumerate(items):
+        if _method(item) in CONCURRENT_METHODS:
+            wave.append(index)
+            continue
+        _run_wave(app, wave, execute)
+        wave = []
+        execute(index)
+    _run_wave(app, wave, execute)
+    return results
+
+
+def _run_wave(app, wave, execute):
+    threads = min(len(wave), app.config['BATCH_THREADS'])
+    if threads <= 1:
+        for index in wave:
+            execute(index)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(execute, wave))
+
+
+def _method(item):
+    return str(item.get('method', 'GET')).upper() if isinstance(item, dict) else None
+
+
+def _execute(app, item, index, origin):
+    if not isinstance(item, dict):
+        return {"id": index, "status": 400, "body": {"error": "Each request must be an object"}}
+    item_id = item.get('id', index)
+    method = _method(item)
+    path = item.get('path')
+    if method not in METHODS:
+        return {"id": item_id, "status": 405, "body": {"error": f"Method {method} cannot be batched"}}
+    if not isinstance(path, str) or not path.startswith('/'):
+        return {"id": item_id, "status": 400, "body": {"error": "path must start with /"}}
+
+    builder = EnvironBuilder(path=path, method=method, json=item.get('body'), **origin)
+    with app.app_context(), app.request_context(builder.get_environ()):
+        # Resolved by the same URL matching that dispatches the item, so encoded paths cannot slip past
+        refusal = REFUSED_ENDPOINTS.get(request.endpoint)
+        if refusal:
+            return {"id": item_id, "status": 400, "body": {"error": refusal}}
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            return {"id": item_id, "status": 500, "body": {"error": "An unexpected error occurred", "details": str(e)}}
+
+        if response.mimetype in STREAMED_MIMETYPES:
+            response.close()
+            return {"id": item_id, "status": 400, "body": {"error": "Event streams and exports cannot be batched"}}
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True)
+        return {"id": item_id, "status": response.status_code, "body": body}
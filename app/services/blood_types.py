@@ -0,0 +1,25 @@
+# Recipient blood types each donor blood group can give to
+COMPATIBLE_RECIPIENTS = {
+    "O-": ["O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"],
+    "O+": ["O+", "A+", "B+", "AB+"],
+    "A-": ["A-", "A+", "AB-", "AB+"],
+    "A+": ["A+", "AB+"],
+    "B-": ["B-", "B+", "AB-", "AB+"],
+    "B+": ["B+", "AB+"],
+    "AB-": ["AB-", "AB+"],
+    "AB+": ["AB+"]
+}
+
+
+def recipients_for(blood_group):
+    """Blood types a donor of `blood_group` can give to."""
+    return COMPATIBLE_RECIPIENTS.get(blood_group, [])
+
+
+def donors_for(blood_types):
+    """Donor blood groups that can give to any of `blood_types`.
+
+    The inverse of recipients_for(): a need's blood type is matched as a whole, as in the donor's
+    need lists, so a donor is only told about needs they can see.
+    """
+    return [group for group, recipients in COMPATIBLE_RECIPIENTS.items() if set(blood_types) & set(recipients)]
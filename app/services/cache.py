@@ -0,0 +1,51 @@
+import threading
+import time
+
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after a fixed number of seconds."""
+
+    def __init__(self, ttl=60, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+
+    def get_or_compute(self, key, compute, ttl=None):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _evict(self):
+        # Drop expired entries first, then the entries closest to expiry
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at < now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[min(self._entries, key=lambda key: self._entries[key][0])]
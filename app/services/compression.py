@@ -0,0 +1,139 @@
+import threading
+import zlib
+from flask import current_app, request
+from app.services.cache import TTLCache
+
+# Preferred first when the client rates them equally
+ENCODINGS = ('gzip', 'deflate')
+_WBITS = {'gzip': 31, 'deflate': 15}  # gzip container / zlib stream, as HTTP names them
+
+# Pre-encoded response bodies shared by every request, e.g. the blood bank directory
+snapshot_cache = TTLCache(ttl=60)
+
+
+def negotiate():
+    """The encoding to answer the current request with, or None for identity."""
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def compress(data, encoding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(chunks, encoding, level):
+    # Output is yielded as zlib produces it, so long exports still reach the client progressively
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _vary(response):
+    response.vary.add('Accept-Encoding')
+
+
+class Snapshot:
+    """An encoded response body kept together with its compressed forms.
+
+    Each encoding is compressed once, the first time a client asks for it, and then served from
+    memory for as long as the snapshot is cached.
+    """
+
+    def __init__(self, data, mimetype):
+        self.data = data
+        self.mimetype = mimetype
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding, level):
+        with self._lock:
+            body = self._encoded.get(encoding)
+            if body is None:
+                body = self._encoded[encoding] = compress(self.data, encoding, level)
+            return body
+
+    def response(self, status=200):
+        config = current_app.config
+        response = current_app.response_class(self.data, status=status, mimetype=self.mimetype)
+        if not config['COMPRESSION_ENABLED']:
+            return response
+        _vary(response)
+        encoding = negotiate()
+        if encoding and len(self.data) >= config['COMPRESSION_MIN_SIZE']:
+            response.set_data(self.encoded(encoding, config['COMPRESSION_LEVEL']))
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+def cached_json_response(key, compute):
+    """Serve `compute()`'s JSON from a shared, pre-compressed snapshot.
+
+    Call `snapshot_cache.invalidate(key)` after changing the data behind it. Other workers keep
+    their copy until SNAPSHOT_CACHE_TTL expires.
+    """
+    def build():
+        return Snapshot(current_app.json.dumps(compute()).encode('utf-8') + b"\n", current_app.json.mimetype)
+
+    ttl = current_app.config.get('SNAPSHOT_CACHE_TTL', 60)
+    return snapshot_cache.get_or_compute(key, build, ttl).response()
+
+
+class Compression:
+    """Gzip or deflate compression of text responses, negotiated through `Accept-Encoding`.
+
+    Bodies smaller than COMPRESSION_MIN_SIZE are sent as they are. Streamed responses are
+    compressed chunk by chunk whatever their size, since it is not known up front.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESSION_ENABLED', True)
+        app.config.setdefault('COMPRESSION_MIN_SIZE', 1024)  # bytes
+        app.config.setdefault('COMPRESSION_LEVEL', 6)  # zlib level, 1 (fastest) to 9 (smallest)
+        app.config.setdefault('COMPRESSION_MIMETYPES', [
+            'application/json', 'text/plain', 'text/csv', 'application/x-ndjson'
+        ])
+        app.config.setdefault('SNAPSHOT_CACHE_TTL', 60)  # seconds
+        if not app.config['COMPRESSION_ENABLED']:
+            return
+
+        app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        config = current_app.config
+        if (response.mimetype not in config['COMPRESSION_MIMETYPES']
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or request.method == 'HEAD'
+                or 'Content-Encoding' in response.headers
+                or response.direct_passthrough
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        _vary(response)
+        encoding = negotiate()
+        if encoding is None:
+            return response
+
+        level = config['COMPRESSION_LEVEL']
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESSION_MIN_SIZE']:
+                return response
+            response.set_data(compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+compression = Compression()
@@ -0,0 +1,82 @@
+from sqlalchemy import func
+from app import db
+from app.models.blood_donation import BloodDonation
+from app.models.donor_bank_affinity import DonorBankAffinity
+from app.models.users import Donor
+from app.services.archive import both_tiers
+from app.services.shards import shards
+
+MAX_PER_PAGE = 200
+
+
+def record_donation(blood_bank_id, donor_id, donation_date):
+    """Fold a new donation into the (bank, donor) affinity row. Caller commits."""
+    affinity = DonorBankAffinity.query.get((blood_bank_id, donor_id))
+    if affinity is None:
+        affinity = DonorBankAffinity(
+            blood_bank_id=blood_bank_id,
+            donor_id=donor_id,
+            first_donation_date=donation_date,
+            last_donation_date=donation_date,
+            donation_count=0
+        )
+        db.session.add(affinity)
+
+    affinity.first_donation_date = min(affinity.first_donation_date, donation_date)
+    affinity.last_donation_date = max(affinity.last_donation_date, donation_date)
+    affinity.donation_count = (affinity.donation_count or 0) + 1
+    return affinity
+
+
+def rebuild_affinity():
+    """Recompute the whole affinity table from both tiers of BloodDonation, one grouped statement per shard."""
+    shards.gather(_rebuild_affinity)
+    db.session.commit()
+    return sum(shards.gather(lambda: DonorBankAffinity.query.count()))
+
+
+def _rebuild_affinity():
+    DonorBankAffinity.query.delete()
+
+    donation = both_tiers(BloodDonation)
+    grouped = (
+        db.session.query(
+            donation.c.blood_bank_id,
+            donation.c.donor_id,
+            func.min(donation.c.donation_date),
+            func.max(donation.c.donation_date),
+            func.count(donation.c.donation_id)
+        )
+        .group_by(donation.c.blood_bank_id, donation.c.donor_id)
+    )
+
+    db.session.execute(
+        DonorBankAffinity.__table__.insert().from_select(
+            ['blood_bank_id', 'donor_id', 'first_donation_date', 'last_donation_date', 'donation_count'],
+            grouped
+        )
+    )
+
+
+def get_roster_page(blood_bank_id, page=1, per_page=50, blood_type=None, order='desc'):
+    """Return (rows, total) for one page of a bank's donors, most recent donors first by default."""
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+
+    query = (
+        db.session.query(DonorBankAffinity, Donor)
+        .join(Donor, Donor.id == DonorBankAffinity.donor_id)
+        .filter(DonorBankAffinity.blood_bank_id == blood_bank_id)
+    )
+    if blood_type:
+        query = query.filter(Donor.blood_group == blood_type)
+
+    total = query.order_by(None).count()
+
+    if order == 'asc':
+        query = query.order_by(DonorBankAffinity.last_donation_date.asc(), DonorBankAffinity.donor_id.asc())
+    else:
+        query = query.order_by(DonorBankAffinity.last_donation_date.desc(), DonorBankAffinity.donor_id.desc())
+
+    rows = query.offset((page - 1) * per_page).limit(per_page).all()
+    return rows, total
@@ -0,0 +1,169 @@
+from datetime import date, timedelta
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm.util import object_state
+from app import db
+from app.models.blood_bank import DonorBloodBank
+from app.models.blood_donation import BloodDonation
+from app.models.disease import Disease, DonorDisease
+from app.models.donor_eligibility import DonorEligibility, FollowerEligibility
+from app.models.users import Donor
+from app.services.archive import both_tiers
+from app.services.blood_types import donors_for
+from app.services.shards import shards
+
+DONATION_INTERVAL = timedelta(days=56)  # 56 days is a common interval between whole blood donations
+NEVER_DONATED = date.min  # next_eligible_date of donors without donations
+MAX_PER_PAGE = 200
+UPDATE_CHUNK = 5000
+
+
+def record_donor(donor):
+    """Create or refresh the donor's row after they register or change blood group. Caller commits."""
+    return _update(donor, blood_group=donor.blood_group)
+
+
+def record_donation(donor, donation_date):
+    """Move the donor's next eligible date on after a donation. Caller commits."""
+    row = _row(donor)
+    changes = {'blood_group': donor.blood_group}
+    if row.last_donation_date is None or donation_date > row.last_donation_date:
+        changes.update(last_donation_date=donation_date, next_eligible_date=donation_date + DONATION_INTERVAL)
+    return _update(donor, **changes)
+
+
+def add_diseases(donor, names):
+    """Add diseases the donor declared. Caller commits."""
+    row = _row(donor)
+    return _update(donor, diseases=_joined(set(_split(row.diseases)) | set(names))) if names else row
+
+
+def clear_diseases(donor):
+    """Forget the donor's diseases, after their DonorDisease rows were deleted. Caller commits."""
+    return _update(donor, diseases=None)
+
+
+def record_follow(donor, blood_bank_id):
+    """Add the donor to the bank's eligible followers. Caller commits."""
+    row = _row(donor)
+    db.session.add(FollowerEligibility(
+        blood_bank_id=blood_bank_id, donor_id=donor.id, blood_group=row.blood_group,
+        next_eligible_date=row.next_eligible_date, disqualified=row.diseases is not None
+    ))
+
+
+def record_unfollow(donor, blood_bank_id):
+    """Remove the donor from the bank's eligible followers. Caller commits."""
+    table = FollowerEligibility.__table__
+    db.session.execute(table.delete().where(table.c.blood_bank_id == blood_bank_id, table.c.donor_id == donor.id))
+
+
+def _row(donor):
+    row = db.session.get(DonorEligibility, donor.id)
+    if row is None:
+        # Donors from before the index existed join it on their first change; rebuild to add the rest
+        row = DonorEligibility(donor_id=donor.id, blood_group=donor.blood_group, next_eligible_date=NEVER_DONATED)
+        db.session.add(row)
+    return row
+
+
+def _update(donor, **changes):
+    row = _row(donor)
+    changes = {name: value for name, value in changes.items() if getattr(row, name) != value}
+    for name, value in changes.items():
+        setattr(row, name, value)
+    # A new row has no follower rows yet; an unchanged one has nothing to copy
+    if changes and object_state(row).persistent:
+        table = FollowerEligibility.__table__
+        db.session.execute(table.update().where(table.c.donor_id == donor.id).values(
+            blood_group=row.blood_group, next_eligible_date=row.next_eligible_date,
+            disqualified=row.diseases is not None
+        ))
+    return row
+
+
+def rebuild_eligibility():
+    """Recompute both tables from Donor, both tiers of BloodDonation, DonorDisease and DonorBloodBank.
+    Returns (donor rows, follower rows)."""
+    table = DonorEligibility.__table__
+    db.session.execute(FollowerEligibility.__table__.delete())
+    db.session.execute(table.delete())
+    db.session.execute(table.insert().from_select(
+        ['donor_id', 'blood_group', 'next_eligible_date'],
+        select(Donor.id, Donor.blood_group, bindparam('never', NEVER_DONATED, type_=db.Date))
+    ))
+
+    # Donations live on the shards of their banks; a donor's latest one can be on any of them
+    donation = both_tiers(BloodDonation)
+    last = {}
+    for donor_id, day in shards.collect(
+        db.session.query(donation.c.donor_id, func.max(donation.c.donation_date)).group_by(donation.c.donor_id).all
+    ):
+        last[donor_id] = max(day, last.get(donor_id, day))
+    _update_many(table, [
+        {'b_donor_id': donor_id, 'last_donation_date': day, 'next_eligible_date': day + DONATION_INTERVAL}
+        for donor_id, day in last.items()
+    ])
+
+    diseases = {}
+    for donor_id, name in db.session.query(DonorDisease.donor_id, Disease.name).join(
+        Disease, Disease.disease_id == DonorDisease.disease_id
+    ):
+        diseases.setdefault(donor_id, set()).add(name)
+    _update_many(table, [{'b_donor_id': donor_id, 'diseases': _joined(names)} for donor_id, names in diseases.items()])
+
+    db.session.execute(FollowerEligibility.__table__.insert().from_select(
+        ['blood_bank_id', 'donor_id', 'blood_group', 'next_eligible_date', 'disqualified'],
+        select(
+            DonorBloodBank.blood_bank_id, DonorEligibility.donor_id, DonorEligibility.blood_group,
+            DonorEligibility.next_eligible_date, DonorEligibility.diseases.is_not(None)
+        ).join(DonorEligibility, DonorEligibility.donor_id == DonorBloodBank.donor_id)
+    ))
+
+    db.session.commit()
+    return DonorEligibility.query.count(), FollowerEligibility.query.count()
+
+
+def _update_many(table, rows):
+    if not rows:
+        return
+    statement = table.update().where(table.c.donor_id == bindparam('b_donor_id'))
+    for start in range(0, len(rows), UPDATE_CHUNK):
+        db.session.execute(statement, rows[start:start + UPDATE_CHUNK])
+
+
+def eligible_donors(blood_bank_id, blood_type, page=1, per_page=50, on=None):
+    """Return (rows, total) for one page of the bank's followers who can give to `blood_type` on `on`.
+
+    Rows are (DonorEligibility, Donor) pairs; donors who declared a disease are left out. Donors
+    who have been able to give the longest come first, starting with those who never donated.
+    """
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    on = on or date.today()
+
+    # Served by the follower table's indexes alone; only the page's donors are looked up
+    criteria = [
+        FollowerEligibility.blood_bank_id == blood_bank_id,
+        FollowerEligibility.disqualified.is_(False),
+        FollowerEligibility.blood_group.in_(donors_for([blood_type])),
+        FollowerEligibility.next_eligible_date <= on
+    ]
+    total = FollowerEligibility.query.filter(*criteria).count()
+    rows = (
+        db.session.query(DonorEligibility, Donor)
+        .select_from(FollowerEligibility)
+        .join(DonorEligibility, DonorEligibility.donor_id == FollowerEligibility.donor_id)
+        .join(Donor, Donor.id == FollowerEligibility.donor_id)
+        .filter(*criteria)
+        .order_by(FollowerEligibility.next_eligible_date, FollowerEligibility.donor_id)
+        .offset((page - 1) * per_page).limit(per_page).all()
+    )
+    return rows, total
+
+
+def _split(diseases):
+    return diseases.split(',') if diseases else []
+
+
+def _joined(names):
+    return ','.join(sorted(names)) or None
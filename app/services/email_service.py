@@ -1,6 +1,34 @@
+import threading
+from flask import current_app
 from flask_mail import Message
+from app.services.metrics import metrics
 
 def send_email(subject, recipients, body):
     from app import mail  # Lazy import to avoid circular import
     msg = Message(subject, recipients=recipients, body=body)
-    mail.send(msg)
\ No newline at end of file
+    with metrics.timer('bloodline_email_send_seconds', kind='single'):
+        mail.send(msg)
+
+
+def send_bulk_email(messages):
+    """Send (subject, recipients, body) tuples over a single SMTP connection."""
+    from app import mail  # Lazy import to avoid circular import
+    with metrics.timer('bloodline_email_send_seconds', kind='bulk'), mail.connect() as connection:
+        for subject, recipients, body in messages:
+            connection.send(Message(subject, recipients=recipients, body=body))
+
+
+def send_bulk_email_async(messages):
+    """Hand a batch of emails to a background thread so the request can return straight away."""
+    app = current_app._get_current_object()
+
+    def worker():
+        with app.app_context():
+            try:
+                send_bulk_email(messages)
+            except Exception as e:
+                app.logger.error("Bulk email delivery failed: %s", e)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,156 @@
+import csv
+import heapq
+import io
+from collections import namedtuple
+from datetime import date
+from flask import Response, current_app
+from sqlalchemy import select
+from app import db
+from app.models.appointment import Appointment
+from app.models.blood_donation import BloodDonation
+from app.models.blood_inventory import BloodInventory
+from app.models.users import Donor
+from app.services.archive import ARCHIVES
+from app.services.shards import shards
+
+# Rows fetched from the cursor at a time, and rows per chunk of the HTTP response
+YIELD_PER = 1000
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# model, its bank column, the date column the range filter and ordering use, exported columns
+Dataset = namedtuple('Dataset', 'model bank_column date_column columns')
+
+DATASETS = {
+    'donations': Dataset(BloodDonation, 'blood_bank_id', 'donation_date', [
+        'donation_id', 'blood_bank_id', 'donor_id', 'appointment_id', 'donation_date', 'donation_type',
+        'quantity_donated', 'recipient_organization', 'donor_blood_pulse', 'donor_temperature', 'blood_pressure'
+    ]),
+    'appointments': Dataset(Appointment, 'blood_bank_id', 'appointment_date', [
+        'appointment_id', 'blood_bank_id', 'donor_id', 'appointment_date', 'appointment_time', 'status',
+        'donation_type', 'quantity_donated', 'previous_donations'
+    ]),
+    'inventory': Dataset(BloodInventory, 'blood_bank_ID', 'Expiration_Date', [
+        'Inventory_ID', 'blood_bank_ID', 'Blood_Type', 'Quantity', 'Expiration_Date'
+    ]),
+}
+
+
+def options(args):
+    """(format, from date, to date) from an export's query string. Raises ValueError with a message."""
+    export_format = args.get('format', 'csv')
+    if export_format not in FORMATS:
+        raise ValueError("format must be one of: " + ", ".join(FORMATS))
+    try:
+        start, end = (date.fromisoformat(args[name]) if args.get(name) else None for name in ('from', 'to'))
+    except ValueError:
+        raise ValueError("from and to must be dates as YYYY-MM-DD")
+    return export_format, start, end
+
+
+def export(name, export_format, blood_bank_id=None, start=None, end=None):
+    """A streamed CSV or NDJSON response with every row of dataset `name`, ordered by date.
+
+    Limited to one bank when `blood_bank_id` is given, and to dates from `start` to `end`
+    inclusive. Each database is read on its own connection, YIELD_PER rows at a time, and the
+    rows are encoded and sent as they arrive, so memory stays flat whatever the export's size.
+    Network-wide exports merge the shards' date-ordered streams, and archived rows are merged in
+    with the hot ones.
+    """
+    app = current_app._get_current_object()
+    dataset = DATASETS[name]
+    tables = [dataset.model.__table__]
+    if dataset.model in ARCHIVES:
+        tables.append(ARCHIVES[dataset.model][0].__table__)
+    statements = [_statement(dataset, table, blood_bank_id, start, end) for table in tables]
+
+    if blood_bank_id is not None and shards.active():
+        keys = [shards.shard_of_bank(blood_bank_id, db.session)]
+    else:
+        keys = shards.keys()
+    engines = [shards.engine(key) for key in keys]
+    # The download can take minutes; it reads on its own connections, not the request's
+    db.session.close()
+
+    header = [column['name'] for column in statements[0].column_descriptions]
+    sort_key = (header.index(dataset.date_column), header.index(dataset.columns[0]))
+    rows = _merged([_rows(engine, statement) for engine in engines for statement in statements], sort_key)
+    body = _csv(header, rows) if export_format == 'csv' else _ndjson(app.json.dumps, header, rows)
+    filename = f"{name}-{blood_bank_id if blood_bank_id is not None else 'all'}.{export_format}"
+    return Response(body, mimetype=FORMATS[export_format], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no'  # Stops nginx from buffering the whole export
+    })
+
+
+def _statement(dataset, table, blood_bank_id, start, end):
+    donor = Donor.__table__
+    date_column = table.c[dataset.date_column]
+    columns = [table.c[column] for column in dataset.columns]
+    if 'donor_id' in table.c:
+        columns.append(donor.c.blood_group)
+        statement = select(*columns).select_from(table.outerjoin(donor, donor.c.id == table.c.donor_id))
+    else:
+        statement = select(*columns)
+    if blood_bank_id is not None:
+        statement = statement.where(table.c[dataset.bank_column] == blood_bank_id)
+    if start is not None:
+        statement = statement.where(date_column >= start)
+    if end is not None:
+        statement = statement.where(date_column <= end)
+    # The row ID is always the first exported column
+    return statement.order_by(date_column, columns[0])
+
+
+def _rows(engine, statement):
+    with engine.connect() as connection:
+        yield from connection.execution_options(yield_per=YIELD_PER).execute(statement)
+
+
+def _merged(streams, sort_key):
+    # Every stream is ordered by (date, row ID), so merging keeps one row per stream in memory.
+    # A row is either hot or archived, never both, so the tiers' streams merge without duplicates.
+    date_index, id_index = sort_key
+    try:
+        if len(streams) == 1:
+            yield from streams[0]
+        else:
+            yield from heapq.merge(*streams, key=lambda row: (row[date_index], row[id_index]))
+    finally:
+        for stream in streams:
+            stream.close()
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == YIELD_PER:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    try:
+        for chunk in _chunks(rows):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()  # Only the header: no rows matched
+    finally:
+        rows.close()
+
+
+def _ndjson(dumps, header, rows):
+    try:
+        for chunk in _chunks(rows):
+            yield ''.join(dumps(dict(zip(header, row))) + '\n' for row in chunk)
+    finally:
+        rows.close()
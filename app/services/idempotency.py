@@ -0,0 +1,194 @@
+import functools
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import Response, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.idempotency_key import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05  # seconds between checks on a duplicate still running in another process
+
+
+def idempotent(view=None, store_body=True):
+    """Run the view once per Idempotency-Key header and replay its response to retries.
+
+    Goes below @jwt_required(). Requests without the header run as usual. Views whose responses
+    hold credentials use @idempotent(store_body=False): only the status is kept, and retries get
+    a notice instead of the body.
+    """
+    if view is None:
+        return functools.partial(idempotent, store_body=store_body)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        return idempotency.handle(key, view, args, kwargs, store_body)
+    return wrapper
+
+
+class IdempotencyStore:
+    """Stores the first response to each (user, endpoint, Idempotency-Key) for IDEMPOTENCY_TTL seconds.
+
+    The first request claims the key by inserting its row, so a duplicate arriving while it runs
+    finds the claim and waits: on an in-process event when both are in the same worker, otherwise
+    by re-reading the row every POLL_INTERVAL. After IDEMPOTENCY_WAIT seconds it gets a 409. Server
+    errors release the key, so a retry runs the view again. Expired keys are deleted at most every
+    IDEMPOTENCY_SWEEP_INTERVAL seconds per process, by whichever request comes along.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = {}  # (user, endpoint, key) -> Event set when the request holding it finishes
+        self._swept_at = None
+
+    def init_app(self, app):
+        app.config.setdefault('IDEMPOTENCY_TTL', 86400)  # seconds a response is replayed for
+        app.config.setdefault('IDEMPOTENCY_WAIT', 10.0)  # seconds a duplicate waits for the first request
+        app.config.setdefault('IDEMPOTENCY_CLAIM_TIMEOUT', 60.0)  # seconds after which an unfinished claim is abandoned
+        app.config.setdefault('IDEMPOTENCY_SWEEP_INTERVAL', 600.0)  # seconds
+
+    def handle(self, key, view, args, kwargs, store_body=True):
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+        config = current_app.config
+        scope = (str(get_jwt_identity()), request.endpoint, key)
+        fingerprint = _fingerprint()
+        self._sweep(config)
+
+        deadline = time.monotonic() + config['IDEMPOTENCY_WAIT']
+        while True:
+            claimed_at, row = self._claim(scope, fingerprint, config)
+            if claimed_at is not None:
+                break
+            if row is not None:
+                if row.fingerprint != fingerprint:
+                    return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+                if row.status_code is not None:
+                    return _replay(row)
+            # Either still running, or released between our insert and our read
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                response = jsonify({"error": f"A request with this {HEADER} is still in progress"})
+                response.headers['Retry-After'] = '1'
+                return response, 409
+            if row is not None:
+                self._wait(scope, min(remaining, POLL_INTERVAL))
+
+        done = threading.Event()
+        with self._lock:
+            self._running[scope] = done
+        try:
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                self._store(scope, claimed_at, None)
+                raise
+            self._store(scope, claimed_at, response, store_body)
+            return response
+        finally:
+            with self._lock:
+                self._running.pop(scope, None)
+            done.set()
+
+    def _claim(self, scope, fingerprint, config):
+        """(claimed at, None) if the key is now ours, else (None, the row of whoever holds it or None)."""
+        table = IdempotencyKey.__table__
+        user_id, endpoint, key = scope
+        now = datetime.utcnow()
+        try:
+            db.session.execute(table.insert().values(
+                user_id=user_id, endpoint=endpoint, key=key, fingerprint=fingerprint, created_at=now
+            ))
+            db.session.commit()
+            return now, None
+        except IntegrityError:
+            db.session.rollback()
+
+        row = db.session.execute(table.select().where(*_matching(scope))).first()
+        db.session.commit()  # Ends the read, so the next poll sees what the other request commits
+        if row is None:
+            return None, None
+        expired = row.created_at < now - timedelta(seconds=config['IDEMPOTENCY_TTL'])
+        abandoned = row.status_code is None and row.created_at < now - timedelta(seconds=config['IDEMPOTENCY_CLAIM_TIMEOUT'])
+        if expired or abandoned:
+            db.session.execute(table.delete().where(
+                table.c.idempotency_id == row.idempotency_id, table.c.created_at == row.created_at
+            ))
+            db.session.commit()
+            return None, None
+        return None, row
+
+    def _store(self, scope, claimed_at, response, store_body=True):
+        # Whatever the view left uncommitted would be rolled back at teardown anyway; rolling it back
+        # now keeps its locks from blocking this write
+        db.session.rollback()
+        table = IdempotencyKey.__table__
+        ours = [*_matching(scope), table.c.created_at == claimed_at]
+        if response is None or response.status_code >= 500 or response.is_streamed:
+            db.session.execute(table.delete().where(*ours))
+        else:
+            db.session.execute(table.update().where(*ours).values(
+                status_code=response.status_code, mimetype=response.mimetype,
+                body=response.get_data() if store_body else None
+            ))
+        db.session.commit()
+
+    def _wait(self, scope, timeout):
+        with self._lock:
+            running = self._running.get(scope)
+        if running is not None:
+            running.wait(timeout)  # Woken as soon as the first request finishes
+        else:
+            time.sleep(timeout)
+
+    def _sweep(self, config):
+        now = time.monotonic()
+        with self._lock:
+            if self._swept_at is not None and now - self._swept_at < config['IDEMPOTENCY_SWEEP_INTERVAL']:
+                return
+            self._swept_at = now
+        prune(config['IDEMPOTENCY_TTL'])
+
+
+def prune(ttl):
+    """Delete the keys older than `ttl` seconds. Returns how many were deleted."""
+    table = IdempotencyKey.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    deleted = db.session.execute(table.delete().where(table.c.created_at < cutoff)).rowcount
+    db.session.commit()
+    return deleted
+
+
+def _matching(scope):
+    table = IdempotencyKey.__table__
+    user_id, endpoint, key = scope
+    return [table.c.user_id == user_id, table.c.endpoint == endpoint, table.c.key == key]
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    for part in (request.method, request.full_path):
+        digest.update(part.encode() + b'\0')
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _replay(row):
+    if row.body is None:
+        # The first response held credentials, which are not kept at rest
+        response = jsonify({"message": "This request was already processed; its response is not stored"})
+        response.status_code = row.status_code
+    else:
+        response = Response(row.body, status=row.status_code, mimetype=row.mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+idempotency = IdempotencyStore()
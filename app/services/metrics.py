@@ -0,0 +1,291 @@
+import atexit
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# name -> (help, buckets)
+HISTOGRAMS = {
+    'bloodline_http_request_duration_seconds': ("Request latency by endpoint, method and status.", LATENCY_BUCKETS),
+    'bloodline_db_statements_per_request': ("SQL statements executed per request.", COUNT_BUCKETS),
+    'bloodline_db_time_per_request_seconds': ("Cumulative SQL execution time per request.", LATENCY_BUCKETS),
+    'bloodline_db_pool_checkout_wait_seconds': ("Time spent waiting for a pooled database connection.", WAIT_BUCKETS),
+    'bloodline_email_send_seconds': ("Time spent handing email to the SMTP server.", LATENCY_BUCKETS),
+    'bloodline_password_hash_seconds': ("Time spent hashing or verifying passwords.", LATENCY_BUCKETS),
+}
+
+
+class Metrics:
+    """In-process Prometheus histograms, shared across worker processes through snapshot files.
+
+    Each process keeps its own totals in memory and a background thread writes them to
+    `metrics-<pid>.json` in METRICS_DIR. `/metrics` adds up every process's snapshot. Snapshots
+    of processes that have exited are adopted by a live process, so totals never go backwards.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._pid = None
+        self._dirty = threading.Event()
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_DIR', os.path.join(app.instance_path, 'metrics'))
+        app.config.setdefault('METRICS_WRITE_INTERVAL', 1.0)  # seconds
+        app.config.setdefault('METRICS_TOKEN', None)  # Scrapers send it as a bearer token; /metrics is off without it
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        self.app = app
+        self.enabled = True
+        app.before_request(_start_request)
+        app.after_request(_finish_request)
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+        with app.app_context():
+            from app import db
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+                _time_checkouts(engine.pool)
+
+        if not self._atexit_registered:
+            atexit.register(self._write_final_snapshot)
+            self._atexit_registered = True
+
+    def observe(self, name, value, **labels):
+        """Record one observation of a histogram from HISTOGRAMS."""
+        if not self.enabled:
+            return
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._ensure_worker()
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(buckets) + 2)
+            series[bisect_left(buckets, value)] += 1  # Index len(buckets) is the +Inf bucket
+            series[-2] += value
+            series[-1] += 1
+        self._dirty.set()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render(self):
+        """Every process's histograms summed, in Prometheus text exposition format."""
+        totals = {}
+        for snapshot in self._snapshots():
+            _merge(totals, snapshot)
+
+        lines = []
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            series = sorted((labels, values) for (series_name, labels), values in totals.items() if series_name == name)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, values in series:
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], values[:-2]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshot(self):
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            data = [[name, list(labels), values] for (name, labels), values in self._histograms.items()]
+        path = self._snapshot_path(self._pid)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+    def _write_final_snapshot(self):
+        # The writer thread created the directory; if it is gone, so are the app's files (e.g. a
+        # throwaway tooling app's) and there is nothing to keep
+        if os.path.isdir(self.directory):
+            self.write_snapshot()
+
+    @property
+    def directory(self):
+        return self.app.config['METRICS_DIR']
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def _snapshots(self):
+        # This process's live totals, plus the last snapshot of every other process
+        with self._lock:
+            self._ensure_worker()
+            live = {key: list(values) for key, values in self._histograms.items()}
+        yield live
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            if path == self._snapshot_path(self._pid):
+                continue
+            try:
+                yield _load(path)
+            except (OSError, ValueError):
+                continue  # Being adopted or rewritten right now
+
+    def _ensure_worker(self):
+        # Caller holds the lock. Started lazily, and again after a fork, since threads do not survive fork()
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._histograms = {}
+        os.makedirs(self.directory, exist_ok=True)
+        self._adopt_orphans()
+        threading.Thread(target=self._run, name='metrics-writer', daemon=True).start()
+
+    def _adopt_orphans(self):
+        # Snapshots of exited processes (or of an earlier process with this pid) are folded into ours
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+            if pid != self._pid and _pid_alive(pid):
+                continue
+            claimed = f'{path}.adopted-{self._pid}'
+            try:
+                os.replace(path, claimed)
+                _merge(self._histograms, _load(claimed))
+                os.remove(claimed)
+            except (OSError, ValueError):
+                pass  # Adopted by another worker first
+        self._dirty.set()
+
+    def _run(self):
+        interval = self.app.config['METRICS_WRITE_INTERVAL']
+        while True:
+            self._dirty.wait()
+            time.sleep(interval)
+            self._dirty.clear()
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                self.app.logger.error("Metrics snapshot failed: %s", e)
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as f:
+        return {(name, tuple(tuple(pair) for pair in labels)): values for name, labels, values in json.load(f)}
+
+
+def _merge(totals, snapshot):
+    for key, values in snapshot.items():
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                current[i] += value
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+metrics = Metrics()
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db = [0, 0.0]  # statements, seconds
+
+
+def _finish_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    statements, db_seconds = g.pop('metrics_db')
+    labels = {
+        'endpoint': request.endpoint or 'unmatched',  # Unrouted paths would otherwise explode the label set
+        'method': request.method,
+        'status': str(response.status_code)
+    }
+    metrics.observe('bloodline_http_request_duration_seconds', time.perf_counter() - started, **labels)
+    metrics.observe('bloodline_db_statements_per_request', statements, **labels)
+    metrics.observe('bloodline_db_time_per_request_seconds', db_seconds, **labels)
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['metrics_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('metrics_started', None)
+    if started is None or not has_request_context():
+        return
+    totals = g.get('metrics_db')
+    if totals is not None:
+        totals[0] += 1
+        totals[1] += time.perf_counter() - started
+
+
+def _time_checkouts(pool):
+    # Pools have no "checkout requested" event, so time the pool's own _do_get. recreate() (used by
+    # engine.dispose()) is wrapped as well so the replacement pool stays instrumented.
+    if getattr(pool, 'metrics_timed', False):
+        return
+    do_get, recreate = pool._do_get, pool.recreate
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            metrics.observe('bloodline_db_pool_checkout_wait_seconds', time.perf_counter() - started)
+
+    def timed_recreate():
+        new_pool = recreate()
+        _time_checkouts(new_pool)
+        return new_pool
+
+    pool._do_get = timed_do_get
+    pool.recreate = timed_recreate
+    pool.metrics_timed = True
+
+
+def metrics_view():
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        # Traffic and database timings are not for the public; only local debugging skips the token
+        if not (current_app.debug or current_app.testing):
+            return Response("Set METRICS_TOKEN to enable /metrics\n", status=403, mimetype='text/plain')
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return Response("Unauthorized\n", status=401, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
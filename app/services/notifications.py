@@ -0,0 +1,140 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, func, literal, or_, select
+from app import db
+from app.models.blood_bank import DonorBloodBank
+from app.models.notification import Notification, NotificationFanout
+from app.models.users import Donor
+from app.services.blood_types import donors_for
+
+
+class Notifier:
+    """Fans notifications out to a bank's followers off the request path.
+
+    A route queues a NotificationFanout row in its own transaction and calls `wake()` once that
+    has committed. A background thread in each worker process then picks the recipients in SQL,
+    NOTIFICATION_FANOUT_CHUNK followers at a time, and writes each chunk with one INSERT ... SELECT
+    in its own short transaction, so staff requests never wait long on the write lock. A fan-out
+    abandoned by a dead process is taken over after NOTIFICATION_FANOUT_STALE seconds.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('NOTIFICATIONS_ENABLED', True)
+        app.config.setdefault('NOTIFICATION_FANOUT_CHUNK', 5000)  # followers per transaction
+        app.config.setdefault('NOTIFICATION_FANOUT_INTERVAL', 10.0)  # seconds between checks for leftover fan-outs
+        app.config.setdefault('NOTIFICATION_FANOUT_STALE', 60.0)  # seconds
+        app.extensions['notifications'] = {'pid': None, 'lock': threading.Lock(), 'wakeup': threading.Event()}
+
+    def queue_blood_need(self, need):
+        """Queue a notification of `need` for every follower of its bank who can donate to it. Caller commits."""
+        fanout = NotificationFanout(
+            kind='blood_need',
+            blood_bank_id=need.blood_bank_id,
+            reference_id=need.blood_need_id,
+            donor_groups=','.join(donors_for([need.blood_types])),
+            title=f"{need.hospital} needs {need.blood_types} blood",
+            body=f"{float(need.units):g} unit(s) needed at {need.location} before "
+                 f"{need.expire_date:%Y-%m-%d} {need.expire_time:%H:%M}."
+        )
+        db.session.add(fanout)
+        return fanout
+
+    def wake(self):
+        """Start on whatever has been queued. Call after the queuing transaction commits."""
+        app = current_app._get_current_object()
+        if not app.config['NOTIFICATIONS_ENABLED']:
+            return
+        state = app.extensions['notifications']
+        with state['lock']:
+            # Started lazily, and again after a fork, since threads do not survive fork()
+            if state['pid'] != os.getpid():
+                state['pid'] = os.getpid()
+                threading.Thread(target=self._run, args=(app, state), name='notification-fanout', daemon=True).start()
+        state['wakeup'].set()
+
+    def run_pending(self):
+        """Run every queued or abandoned fan-out to completion. Returns the notifications written."""
+        written = 0
+        while True:
+            fanout_id = self._claim()
+            if fanout_id is None:
+                return written
+            written += self.fan_out(fanout_id)
+
+    def fan_out(self, fanout_id):
+        """Write the notifications of one claimed fan-out, resuming from its cursor."""
+        table = NotificationFanout.__table__
+        with db.engine.connect() as connection:
+            fanout = connection.execute(select(table).where(table.c.fanout_id == fanout_id)).one()
+        groups = fanout.donor_groups.split(',') if fanout.donor_groups else []
+        chunk_size = current_app.config['NOTIFICATION_FANOUT_CHUNK']
+
+        followers = (
+            select(DonorBloodBank.donor_id)
+            .join(Donor, Donor.id == DonorBloodBank.donor_id)
+            .where(DonorBloodBank.blood_bank_id == fanout.blood_bank_id, Donor.blood_group.in_(groups))
+        )
+        cursor, written = fanout.last_donor_id, 0
+        while True:
+            now = datetime.utcnow()
+            with db.engine.begin() as connection:
+                # Last follower of the next chunk, walked in donor order along ix_donor_blood_bank_bank
+                chunk = (
+                    followers.where(DonorBloodBank.donor_id > cursor)
+                    .order_by(DonorBloodBank.donor_id)
+                    .limit(chunk_size)
+                    .subquery()
+                )
+                end = connection.execute(select(func.max(chunk.c.donor_id))).scalar()
+                if end is None:
+                    connection.execute(table.update().where(table.c.fanout_id == fanout_id).values(
+                        status='done', finished_at=now
+                    ))
+                    return written
+
+                inserted = connection.execute(Notification.__table__.insert().from_select(
+                    ['donor_id', 'kind', 'blood_bank_id', 'reference_id', 'title', 'body', 'created_at'],
+                    followers.with_only_columns(
+                        DonorBloodBank.donor_id, literal(fanout.kind), literal(fanout.blood_bank_id),
+                        literal(fanout.reference_id), literal(fanout.title), literal(fanout.body), literal(now)
+                    ).where(DonorBloodBank.donor_id > cursor, DonorBloodBank.donor_id <= end)
+                )).rowcount
+                connection.execute(table.update().where(table.c.fanout_id == fanout_id).values(
+                    last_donor_id=end, recipients=table.c.recipients + inserted, claimed_at=now
+                ))
+            cursor, written = end, written + inserted
+
+    def _claim(self):
+        # Oldest pending fan-out, or a running one whose worker stopped reporting progress
+        table = NotificationFanout.__table__
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=current_app.config['NOTIFICATION_FANOUT_STALE'])
+        claimable = or_(table.c.status == 'pending', and_(table.c.status == 'running', table.c.claimed_at < stale))
+        with db.engine.begin() as connection:
+            fanout_id = connection.execute(
+                select(table.c.fanout_id).where(claimable).order_by(table.c.fanout_id).limit(1)
+            ).scalar()
+            if fanout_id is None:
+                return None
+            claimed = connection.execute(table.update().where(table.c.fanout_id == fanout_id, claimable).values(
+                status='running', claimed_at=now
+            )).rowcount
+        # Another worker may have claimed it in between; look again
+        return fanout_id if claimed else self._claim()
+
+    def _run(self, app, state):
+        while True:
+            state['wakeup'].wait(app.config['NOTIFICATION_FANOUT_INTERVAL'])
+            state['wakeup'].clear()
+            with app.app_context():
+                try:
+                    written = self.run_pending()
+                    if written:
+                        app.logger.info("Fanned out %d notifications", written)
+                except Exception as e:
+                    app.logger.error("Notification fan-out failed: %s", e)
+
+
+notifier = Notifier()
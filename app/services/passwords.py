@@ -0,0 +1,12 @@
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.services.metrics import metrics
+
+
+def hash_password(password):
+    with metrics.timer('bloodline_password_hash_seconds', operation='hash'):
+        return generate_password_hash(password)
+
+
+def verify_password(password_hash, password):
+    with metrics.timer('bloodline_password_hash_seconds', operation='verify'):
+        return check_password_hash(password_hash, password)
@@ -0,0 +1,207 @@
+import glob
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import g, request
+
+PROFILE_ID = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+class Profiler:
+    """Sampling profiler for live requests, writing flame-graph-compatible collapsed stacks.
+
+    A request is profiled when it carries `X-Profile: <PROFILER_TOKEN>`, or when it is picked at
+    PROFILER_SAMPLE_RATE. The first kind gets its own profile; the second is merged into one
+    profile per PROFILER_WINDOW seconds. With neither setting, no hooks are installed at all.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._targets = {}  # thread ident -> Counter of collapsed stacks
+        self._windows = {}  # window start -> Counter, for aggregate mode
+        self._dirty = set()
+        self._wakeup = threading.Event()
+        self._active = threading.Event()
+        self._pid = None
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_TOKEN', None)
+        app.config.setdefault('PROFILER_SAMPLE_RATE', 0.0)  # Fraction of requests, e.g. 0.01
+        app.config.setdefault('PROFILER_ROUTES', [])  # Endpoints eligible for sampling; empty means all
+        app.config.setdefault('PROFILER_WINDOW', 300)  # seconds merged into one aggregate profile
+        app.config.setdefault('PROFILER_INTERVAL', 0.005)  # seconds between stack samples
+        app.config.setdefault('PROFILER_KEEP', 200)  # Per-request profiles kept on disk
+        app.config.setdefault('PROFILER_DIR', os.path.join(app.instance_path, 'profiles'))
+        if not app.config['PROFILER_TOKEN'] and not app.config['PROFILER_SAMPLE_RATE']:
+            return
+
+        self.app = app
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    @property
+    def directory(self):
+        return self.app.config['PROFILER_DIR']
+
+    def _start_request(self):
+        config = self.app.config
+        token = request.headers.get('X-Profile')
+        if token and config['PROFILER_TOKEN'] and hmac.compare_digest(token, config['PROFILER_TOKEN']):
+            mode = 'request'
+        elif random.random() < config['PROFILER_SAMPLE_RATE'] and (
+                not config['PROFILER_ROUTES'] or request.endpoint in config['PROFILER_ROUTES']):
+            mode = 'aggregate'
+        else:
+            return
+
+        self._ensure_sampler()
+        ident = threading.get_ident()
+        with self._lock:
+            self._targets[ident] = Counter()
+        self._active.set()
+        g.profile_mode = mode
+
+    def _finish_request(self, response):
+        mode = g.pop('profile_mode', None)
+        if mode is None:
+            return response
+        with self._lock:
+            stacks = self._targets.pop(threading.get_ident(), Counter())
+
+        if mode == 'request':
+            profile_id = f"request-{int(time.time())}-{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}"
+            self._write(profile_id, stacks)
+            self._prune()
+            response.headers['X-Profile-Id'] = profile_id
+        else:
+            window = self.app.config['PROFILER_WINDOW']
+            window_start = int(time.time()) // window * window
+            with self._lock:
+                self._windows.setdefault(window_start, Counter()).update(stacks)
+                self._dirty.add(window_start)
+            self._wakeup.set()
+        return response
+
+    def _ensure_sampler(self):
+        # Started lazily, and again after a fork, since threads do not survive fork()
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._targets = {}
+            self._windows = {}
+            os.makedirs(self.directory, exist_ok=True)
+            threading.Thread(target=self._sample, name='profiler-sampler', daemon=True).start()
+            threading.Thread(target=self._flush_windows, name='profiler-writer', daemon=True).start()
+
+    def _sample(self):
+        interval = self.app.config['PROFILER_INTERVAL']
+        while True:
+            self._active.wait()
+            time.sleep(interval)
+            with self._lock:
+                targets = list(self._targets.items())
+                if not targets:
+                    self._active.clear()
+                    continue
+            frames = sys._current_frames()
+            for ident, stacks in targets:
+                frame = frames.get(ident)
+                if frame is not None:
+                    stacks[_collapse(frame)] += 1
+
+    def _flush_windows(self):
+        # Aggregate profiles are written off the request path, at most once a second
+        while True:
+            self._wakeup.wait()
+            time.sleep(1)
+            self._wakeup.clear()
+            with self._lock:
+                dirty = {start: Counter(self._windows[start]) for start in self._dirty}
+                self._dirty.clear()
+                # Only the current and previous windows can still change
+                for start in sorted(self._windows)[:-2]:
+                    del self._windows[start]
+            for start, stacks in dirty.items():
+                try:
+                    self._write(f"aggregate-{start}-{self._pid}", stacks)
+                except OSError as e:
+                    self.app.logger.error("Profiler could not write aggregate profile: %s", e)
+
+    def _write(self, name, stacks):
+        path = os.path.join(self.directory, name + '.folded')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(path + '.tmp', path)
+
+    def _prune(self):
+        paths = sorted(glob.glob(os.path.join(self.directory, 'request-*.folded')), key=os.path.getmtime)
+        for path in paths[:-self.app.config['PROFILER_KEEP']]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def list_profiles(directory):
+    """Per-request profiles and aggregate windows (merged across workers), newest first."""
+    profiles = {}
+    for path in glob.glob(os.path.join(directory, '*.folded')):
+        name = os.path.basename(path)[:-len('.folded')]
+        if name.startswith('aggregate-'):
+            name = name.rsplit('-', 1)[0]  # Drop the worker pid
+        entry = profiles.setdefault(name, {'profile_id': name, 'samples': 0, 'updated_at': 0})
+        entry['samples'] += sum(_read(path).values())
+        entry['updated_at'] = max(entry['updated_at'], int(os.path.getmtime(path)))
+    return sorted(profiles.values(), key=lambda entry: entry['updated_at'], reverse=True)
+
+
+def load_profile(directory, profile_id):
+    """Collapsed stacks of one profile, or None when it does not exist."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    if profile_id.startswith('aggregate-'):
+        paths = glob.glob(os.path.join(directory, f'{profile_id}-*.folded'))
+    else:
+        paths = [os.path.join(directory, profile_id + '.folded')]
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        return None
+    stacks = Counter()
+    for path in paths:
+        stacks.update(_read(path))
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _collapse(frame):
+    # Root first, as flamegraph.pl and speedscope expect
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _read(path):
+    stacks = Counter()
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+    except (OSError, ValueError):
+        pass
+    return stacks
+
+
+profiler = Profiler()
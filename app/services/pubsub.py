@@ -0,0 +1,250 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import Response, current_app, has_app_context, request
+from sqlalchemy import event, func, select
+from app import db
+from app.models.stream_event import StreamEvent
+from app.session import RoutingSession
+
+RETRY_MS = 3000  # How long a disconnected EventSource waits before reconnecting
+POLL_BATCH = 500
+PRUNE_INTERVAL = 60.0  # seconds
+
+# One stored event, with its payload decoded for matching and its SSE frame encoded once for every subscriber
+Message = namedtuple('Message', 'event_id kind blood_bank_id donor_id data frame')
+
+
+class Subscriber:
+    def __init__(self, match, after, size):
+        self.match = match
+        self.after = after  # Events up to this ID were already sent or deliberately skipped
+        self.queue = queue.Queue(size)
+        self.overflowed = False
+
+
+class EventBus:
+    """Publishes changes to Server-Sent Event streams of donors and staff.
+
+    Routes call `publish()` inside the transaction of the change, which writes a stream_event row.
+    Once the transaction commits, the worker that made it wakes its poller. Every other worker's
+    poller finds the row within STREAM_POLL_INTERVAL seconds. A poller reads each new event once and
+    hands it to the streams of its own process whose `match` accepts it, so the database sees one
+    query per poll interval per worker however many clients are connected. Clients that reconnect
+    with Last-Event-ID are sent what they missed from the table.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('STREAM_POLL_INTERVAL', 0.5)  # seconds
+        app.config.setdefault('STREAM_HEARTBEAT', 15.0)  # seconds between comments that keep idle streams open
+        app.config.setdefault('STREAM_MAX_DURATION', 300.0)  # seconds before a stream is closed and the client resumes; 0 sends the replay only
+        app.config.setdefault('STREAM_REPLAY_LIMIT', 1000)  # events; further behind than this, clients are told to reload
+        app.config.setdefault('STREAM_RETENTION', 3600.0)  # seconds events are kept for replay
+        app.config.setdefault('STREAM_QUEUE_SIZE', 1000)  # events buffered per stream before it is closed as too slow
+        app.extensions['event_bus'] = {
+            'pid': None, 'lock': threading.Lock(), 'wakeup': threading.Event(),
+            'subscribers': set(), 'last_id': 0, 'pruned_at': 0.0
+        }
+
+    def publish(self, kind, blood_bank_id, payload, donor_id=None):
+        """Add an event to the current transaction. It is delivered once the caller commits."""
+        db.session.add(StreamEvent(
+            kind=kind, blood_bank_id=blood_bank_id, donor_id=donor_id, payload=current_app.json.dumps(payload)
+        ))
+        db.session.info['stream_published'] = True
+
+    def publish_appointment(self, kind, appointment):
+        """Publish a change of `appointment` to its bank's staff and to its donor. Caller commits."""
+        self.publish(kind, appointment.blood_bank_id, appointment_payload(appointment), donor_id=appointment.donor_id)
+
+    def wake(self):
+        """Have this process's poller look for new events now, if it has any streams open."""
+        state = current_app.extensions['event_bus']
+        if state['pid'] == os.getpid():
+            state['wakeup'].set()
+
+    def last_event_id(self):
+        """The ID a reconnecting client last saw, from Last-Event-ID or ?last_event_id=. Raises ValueError."""
+        value = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        return int(value) if value not in (None, '') else None
+
+    def stream(self, match, last_event_id=None):
+        """A text/event-stream response of the events `match(message)` accepts.
+
+        Events after `last_event_id` are replayed first. A client too far behind for a replay gets
+        a `reset` event instead and should reload its lists before carrying on.
+        """
+        app = current_app._get_current_object()
+        table = StreamEvent.__table__
+        # Two scalar subqueries, so both ends come straight from the primary key
+        oldest, newest = db.session.execute(select(
+            select(func.min(table.c.event_id)).scalar_subquery(),
+            select(func.max(table.c.event_id)).scalar_subquery()
+        )).one()
+        newest = newest or 0
+
+        backlog = []
+        if last_event_id is not None and last_event_id < newest:
+            limit = app.config['STREAM_REPLAY_LIMIT']
+            rows = db.session.execute(
+                select(table)
+                .where(table.c.event_id > last_event_id, table.c.event_id <= newest)
+                .order_by(table.c.event_id)
+                .limit(limit + 1)
+            ).all()
+            if len(rows) > limit or last_event_id < oldest - 1:
+                backlog = [f"id: {newest}\nevent: reset\ndata: {{}}\n\n"]
+            else:
+                backlog = [message.frame for message in map(_message, rows) if match(message)]
+        # Streams can stay open for minutes; none of them should hold a pooled connection meanwhile
+        db.session.close()
+
+        return Response(self._frames(app, match, newest, backlog), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Stops nginx from buffering the stream
+        })
+
+    def _frames(self, app, match, after, backlog):
+        yield f"retry: {RETRY_MS}\n\n"
+        yield from backlog
+        duration = app.config['STREAM_MAX_DURATION']
+        if duration <= 0:
+            return
+
+        heartbeat = app.config['STREAM_HEARTBEAT']
+        subscriber = self._subscribe(app, match, after)
+        try:
+            deadline = time.monotonic() + duration
+            while not subscriber.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    yield subscriber.queue.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+            # Fell too far behind; the client reconnects and is replayed the rest
+        finally:
+            with app.extensions['event_bus']['lock']:
+                app.extensions['event_bus']['subscribers'].discard(subscriber)
+
+    def _subscribe(self, app, match, after):
+        state = app.extensions['event_bus']
+        subscriber = Subscriber(match, after, app.config['STREAM_QUEUE_SIZE'])
+        self._ensure_poller(app, state)
+        with state['lock']:
+            if state['last_id'] <= after:
+                if not state['subscribers']:
+                    # The poller skips the database while nobody listens; start it from here
+                    state['last_id'] = after
+            else:
+                # Events the poller handed out between this stream's replay and now
+                table = StreamEvent.__table__
+                with app.app_context(), db.engine.connect() as connection:
+                    rows = connection.execute(
+                        select(table)
+                        .where(table.c.event_id > after, table.c.event_id <= state['last_id'])
+                        .order_by(table.c.event_id)
+                    ).all()
+                self._deliver(subscriber, map(_message, rows))
+            state['subscribers'].add(subscriber)
+        return subscriber
+
+    def _ensure_poller(self, app, state):
+        with state['lock']:
+            # Started lazily, and again after a fork, since threads do not survive fork()
+            if state['pid'] != os.getpid():
+                state['pid'] = os.getpid()
+                state['subscribers'] = set()
+                threading.Thread(target=self._run, args=(app, state), name='event-bus', daemon=True).start()
+
+    def _run(self, app, state):
+        while True:
+            state['wakeup'].wait(app.config['STREAM_POLL_INTERVAL'])
+            state['wakeup'].clear()
+            with app.app_context():
+                try:
+                    self._poll(state)
+                    if time.monotonic() - state['pruned_at'] >= PRUNE_INTERVAL:
+                        state['pruned_at'] = time.monotonic()
+                        self._prune(app)
+                except Exception as e:
+                    app.logger.error("Event stream poll failed: %s", e)
+
+    def _poll(self, state):
+        table = StreamEvent.__table__
+        while True:
+            with state['lock']:
+                if not state['subscribers']:
+                    return
+                after = state['last_id']
+            with db.engine.connect() as connection:
+                rows = connection.execute(
+                    select(table).where(table.c.event_id > after).order_by(table.c.event_id).limit(POLL_BATCH)
+                ).all()
+            messages = list(map(_message, rows))
+            with state['lock']:
+                for message in messages:
+                    if message.event_id <= state['last_id']:
+                        continue
+                    for subscriber in state['subscribers']:
+                        self._deliver(subscriber, [message])
+                    state['last_id'] = message.event_id
+            if len(rows) < POLL_BATCH:
+                return
+
+    def _deliver(self, subscriber, messages):
+        for message in messages:
+            if subscriber.overflowed or message.event_id <= subscriber.after or not subscriber.match(message):
+                continue
+            try:
+                subscriber.queue.put_nowait(message.frame)
+            except queue.Full:
+                subscriber.overflowed = True
+
+    def _prune(self, app):
+        # Keep the newest event even when it is old, so IDs are never reused and replays can tell what was pruned
+        table = StreamEvent.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=app.config['STREAM_RETENTION'])
+        with db.engine.begin() as connection:
+            connection.execute(table.delete().where(
+                table.c.created_at < cutoff,
+                table.c.event_id < select(func.max(table.c.event_id)).scalar_subquery()
+            ))
+
+
+def appointment_payload(appointment):
+    # The shape of a /staff/today_appointments entry, so clients apply events to that list directly
+    return {
+        "id": appointment.appointment_id,
+        "Name": appointment.donor.username,
+        "Email": appointment.donor.email,
+        "Date": appointment.appointment_date,
+        "status": appointment.status,
+        "time": appointment.appointment_time  # Encoded as HH:MM:SS by the JSON provider
+    }
+
+
+def _message(row):
+    return Message(
+        row.event_id, row.kind, row.blood_bank_id, row.donor_id, json.loads(row.payload),
+        f"id: {row.event_id}\nevent: {row.kind}\ndata: {row.payload}\n\n"
+    )
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _published(session):
+    if session.info.pop('stream_published', False) and has_app_context():
+        event_bus.wake()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discarded(session):
+    session.info.pop('stream_published', None)
+
+
+event_bus = EventBus()
@@ -0,0 +1,116 @@
+import functools
+import os
+import random
+import sqlite3
+import threading
+import time
+from flask import g
+from app.config import is_file_sqlite
+
+REPLICA_PREFIX = 'replica_'
+
+
+def replica_binds(uris):
+    """SQLALCHEMY_BINDS entries for the configured read replicas: replica_1, replica_2, ..."""
+    return {f'{REPLICA_PREFIX}{number}': uri for number, uri in enumerate(uris, 1)}
+
+
+def read_replica(view):
+    """Let the view's reads go to a read replica.
+
+    Anything the view writes, and everything it reads after its first write, still goes to the
+    primary. Only put this on views whose data may lag the primary by READ_REPLICA_MAX_LAG seconds.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Tracks replica lag and picks a replica that is fresh enough to read from.
+
+    Lag is checked at most every READ_REPLICA_CHECK_INTERVAL seconds per replica and process.
+    For SQLite copies it is the age of the last refresh; for PostgreSQL standbys, the time since
+    the last replayed transaction. A replica lagging more than READ_REPLICA_MAX_LAG is skipped,
+    and with none fresh enough the reads stay on the primary.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._lag = {}  # bind key -> (checked at, lag in seconds)
+        self._stale = set()
+
+    def init_app(self, app):
+        app.config.setdefault('READ_REPLICA_URIS', [])
+        app.config.setdefault('READ_REPLICA_MAX_LAG', 5.0)  # seconds
+        app.config.setdefault('READ_REPLICA_CHECK_INTERVAL', 1.0)  # seconds
+        self.app = app
+
+    def choose(self, engines):
+        keys = [key for key in engines if key and key.startswith(REPLICA_PREFIX)]
+        fresh = [key for key in keys if self.lag(key, engines[key]) <= self.app.config['READ_REPLICA_MAX_LAG']]
+        return engines[random.choice(fresh)] if fresh else None
+
+    def lag(self, key, engine):
+        now = time.monotonic()
+        with self._lock:
+            checked_at, lag = self._lag.get(key, (None, None))
+            if checked_at is not None and now - checked_at < self.app.config['READ_REPLICA_CHECK_INTERVAL']:
+                return lag
+            # Other threads keep the previous value while this one measures
+            self._lag[key] = (now, lag if lag is not None else float('inf'))
+
+        lag = self._measure(engine)
+        with self._lock:
+            self._lag[key] = (time.monotonic(), lag)
+        self._report(key, lag)
+        return lag
+
+    def _measure(self, engine):
+        try:
+            if engine.dialect.name == 'sqlite':
+                return time.time() - os.path.getmtime(engine.url.database)
+            if engine.dialect.name == 'postgresql':
+                with engine.connect() as connection:
+                    lag = connection.exec_driver_sql(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    ).scalar()
+                    return float(lag)
+            return 0.0
+        except Exception as e:
+            self.app.logger.error("Could not measure lag of replica %s: %s", engine.url.render_as_string(), e)
+            return float('inf')
+
+    def _report(self, key, lag):
+        # Log transitions only, not every check
+        stale = lag > self.app.config['READ_REPLICA_MAX_LAG']
+        if stale and key not in self._stale:
+            self._stale.add(key)
+            self.app.logger.warning("Replica %s is %.1f s behind; reading from the primary", key, lag)
+        elif not stale and key in self._stale:
+            self._stale.discard(key)
+            self.app.logger.warning("Replica %s has caught up", key)
+
+
+def refresh_sqlite_replica(primary, replica):
+    """Copy the primary SQLite database into a replica file with the online backup API.
+
+    Takes the two engines. Readers of the replica keep their consistent view while the copy
+    runs. The replica's modification time is then set to now; its lag is measured from that.
+    """
+    if not is_file_sqlite(str(primary.url)) or not is_file_sqlite(str(replica.url)):
+        raise ValueError("Only file-based SQLite databases can be refreshed this way")
+    source = sqlite3.connect(primary.url.database)
+    target = sqlite3.connect(replica.url.database, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    os.utime(replica.url.database)
+
+
+replicas = ReplicaRouter()
@@ -0,0 +1,195 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models.blood_donation import BloodDonation
+from app.models.blood_need import BloodNeed
+from app.models.daily_stats import DailyBankStats, DailyBloodTypeUnits
+from app.models.event import Event
+from app.models.users import Donor
+from app.services.archive import both_tiers
+from app.services.shards import shards
+
+
+# Rows per multi-row upsert; keeps well under SQLite's bound-parameter limit
+UPSERT_CHUNK = 150
+
+
+def _increment(model, key, **deltas):
+    """Add deltas to the rollup row identified by key, creating it if needed. Caller commits."""
+    _increment_many(model, list(key), [dict(key, **deltas)])
+
+
+def _increment_many(model, key_names, rows):
+    """Apply several increments at once; each row holds the key columns plus the deltas. Caller commits."""
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    delta_names = [name for name in rows[0] if name not in key_names]
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else pg_insert
+        for key, shard_rows in shards.partition(rows, db.session):
+            with shards.using(key):
+                for start in range(0, len(shard_rows), UPSERT_CHUNK):
+                    stmt = insert(model.__table__).values(shard_rows[start:start + UPSERT_CHUNK])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=key_names,
+                        set_={name: getattr(model.__table__.c, name) + getattr(stmt.excluded, name)
+                              for name in delta_names}
+                    )
+                    db.session.execute(stmt)
+        return
+
+    for values in rows:
+        row = db.session.get(model, tuple(values[name] for name in key_names))
+        if row is None:
+            db.session.add(model(**values))
+        else:
+            for name in delta_names:
+                setattr(row, name, (getattr(row, name) or 0) + values[name])
+
+
+def record_donation(blood_bank_id, day, blood_type, units):
+    _increment(DailyBankStats, {'blood_bank_id': blood_bank_id, 'day': day}, donations_count=1)
+    _increment(
+        DailyBloodTypeUnits,
+        {'blood_bank_id': blood_bank_id, 'day': day, 'blood_type': blood_type},
+        units=units
+    )
+
+
+def record_event(blood_bank_id, day, delta=1):
+    _increment(DailyBankStats, {'blood_bank_id': blood_bank_id, 'day': day}, events_count=delta)
+
+
+def record_blood_need(blood_bank_id, day, delta=1):
+    _increment(DailyBankStats, {'blood_bank_id': blood_bank_id, 'day': day}, blood_needs_count=delta)
+
+
+def record_event_deltas(deltas):
+    """Apply many event count changes in one statement; deltas maps (blood_bank_id, day) to a delta."""
+    _increment_many(DailyBankStats, ['blood_bank_id', 'day'], [
+        {'blood_bank_id': bank_id, 'day': day, 'events_count': delta} for (bank_id, day), delta in deltas.items()
+    ])
+
+
+def record_blood_need_deltas(deltas):
+    """Apply many blood need count changes in one statement; deltas maps (blood_bank_id, day) to a delta."""
+    _increment_many(DailyBankStats, ['blood_bank_id', 'day'], [
+        {'blood_bank_id': bank_id, 'day': day, 'blood_needs_count': delta} for (bank_id, day), delta in deltas.items()
+    ])
+
+
+def get_window_totals(since, until=None, blood_bank_id=None):
+    """Sum the daily rollups between since and until (inclusive) for one bank or the whole network."""
+    stats = db.session.query(
+        func.coalesce(func.sum(DailyBankStats.donations_count), 0),
+        func.coalesce(func.sum(DailyBankStats.events_count), 0),
+        func.coalesce(func.sum(DailyBankStats.blood_needs_count), 0)
+    ).filter(DailyBankStats.day >= since)
+
+    units = db.session.query(
+        DailyBloodTypeUnits.blood_type,
+        func.sum(DailyBloodTypeUnits.units)
+    ).filter(DailyBloodTypeUnits.day >= since)
+
+    if until is not None:
+        stats = stats.filter(DailyBankStats.day <= until)
+        units = units.filter(DailyBloodTypeUnits.day <= until)
+
+    units = units.group_by(DailyBloodTypeUnits.blood_type)
+
+    if blood_bank_id is not None:
+        stats = stats.filter(DailyBankStats.blood_bank_id == blood_bank_id)
+        units = units.filter(DailyBloodTypeUnits.blood_bank_id == blood_bank_id)
+        stats_rows, unit_rows = [stats.one()], units.all()
+    else:
+        # The whole network: every shard sums its own banks
+        stats_rows = shards.scatter(db.session, stats.statement)
+        unit_rows = shards.scatter(db.session, units.statement)
+
+    units_by_blood_type = {}
+    for blood_type, total in unit_rows:
+        units_by_blood_type[blood_type] = units_by_blood_type.get(blood_type, 0) + total
+
+    return {
+        "donations_count": sum(int(row[0]) for row in stats_rows),
+        "events_count": sum(int(row[1]) for row in stats_rows),
+        "blood_needs_count": sum(int(row[2]) for row in stats_rows),
+        "units_by_blood_type": units_by_blood_type
+    }
+
+
+def rebuild_rollups(since=None):
+    """Recompute the rollups from the source tables, for every day or only from `since` onwards."""
+    counts = shards.gather(lambda: _rebuild_rollups(since))
+    db.session.commit()
+    return sum(stats for stats, _ in counts), sum(units for _, units in counts)
+
+
+def _rebuild_rollups(since):
+    # One shard's banks; the rollups live next to their source rows
+    stats_delete = DailyBankStats.query
+    units_delete = DailyBloodTypeUnits.query
+    if since is not None:
+        stats_delete = stats_delete.filter(DailyBankStats.day >= since)
+        units_delete = units_delete.filter(DailyBloodTypeUnits.day >= since)
+    stats_delete.delete(synchronize_session=False)
+    units_delete.delete(synchronize_session=False)
+
+    stats = defaultdict(lambda: {'donations_count': 0, 'events_count': 0, 'blood_needs_count': 0})
+
+    # Archived donations still count towards their day
+    donation = both_tiers(BloodDonation)
+    donations = db.session.query(
+        donation.c.blood_bank_id, donation.c.donation_date, func.count(donation.c.donation_id)
+    )
+    events = db.session.query(
+        Event.blood_bank_id, Event.event_date, func.count(Event.event_id)
+    )
+    need_day = func.date(BloodNeed.created_at)
+    needs = db.session.query(
+        BloodNeed.blood_bank_id, need_day, func.count(BloodNeed.blood_need_id)
+    )
+    units = (
+        db.session.query(
+            donation.c.blood_bank_id, donation.c.donation_date, Donor.blood_group,
+            func.sum(donation.c.quantity_donated)
+        )
+        .join(Donor, Donor.id == donation.c.donor_id)
+    )
+
+    if since is not None:
+        donations = donations.filter(donation.c.donation_date >= since)
+        events = events.filter(Event.event_date >= since)
+        needs = needs.filter(BloodNeed.created_at >= since)
+        units = units.filter(donation.c.donation_date >= since)
+
+    for bank_id, day, count in donations.group_by(donation.c.blood_bank_id, donation.c.donation_date):
+        stats[(bank_id, day)]['donations_count'] = count
+    for bank_id, day, count in events.group_by(Event.blood_bank_id, Event.event_date):
+        stats[(bank_id, day)]['events_count'] = count
+    for bank_id, day, count in needs.group_by(BloodNeed.blood_bank_id, need_day):
+        if isinstance(day, str):
+            day = datetime.strptime(day, '%Y-%m-%d').date()
+        stats[(bank_id, day)]['blood_needs_count'] = count
+
+    if stats:
+        db.session.execute(
+            DailyBankStats.__table__.insert(),
+            [dict(blood_bank_id=bank_id, day=day, **counts) for (bank_id, day), counts in stats.items()]
+        )
+
+    unit_rows = [
+        dict(blood_bank_id=bank_id, day=day, blood_type=blood_type, units=total)
+        for bank_id, day, blood_type, total in units.group_by(
+            donation.c.blood_bank_id, donation.c.donation_date, Donor.blood_group
+        )
+    ]
+    if unit_rows:
+        db.session.execute(DailyBloodTypeUnits.__table__.insert(), unit_rows)
+
+    return len(stats), len(unit_rows)
@@ -0,0 +1,314 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, has_app_context
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select, operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+from sqlalchemy.sql.selectable import AliasedReturnsRows
+from sqlalchemy.sql.util import find_tables
+from app.config import is_file_sqlite
+
+SHARD_PREFIX = 'shard_'
+
+# Rows created on shard n get IDs from n * SHARD_ID_SPAN up, so an ID alone tells its shard
+SHARD_ID_SPAN = 10 ** 12
+
+# Bank-scoped tables and the column holding their bank. Everything else lives on the primary.
+SHARDED_TABLES = {
+    'appointment': 'blood_bank_id',
+    'blood_donation': 'blood_bank_id',
+    'archived_appointment': 'blood_bank_id',
+    'archived_blood_donation': 'blood_bank_id',
+    'blood_inventory': 'blood_bank_ID',
+    'event': 'blood_bank_id',
+    'blood_need': 'blood_bank_id',
+    'daily_bank_stats': 'blood_bank_id',
+    'daily_blood_type_units': 'blood_bank_id',
+    'donor_bank_affinity': 'blood_bank_id',
+}
+
+# Tables every database keeps its own copy of, next to the bank-scoped tables
+PER_DATABASE_TABLES = {'sync_clock', 'sync_tombstone'}
+
+# Schema name the primary database is attached under on every shard connection
+PRIMARY_SCHEMA = 'bloodline'
+
+_current = ContextVar('bloodline_shard', default=None)
+
+
+class ShardRoutingError(RuntimeError):
+    """A statement on a bank-scoped table could not be tied to exactly one shard."""
+
+
+def shard_binds(uris):
+    """SQLALCHEMY_BINDS entries for the configured shards: shard_1, shard_2, ..."""
+    return {f'{SHARD_PREFIX}{number}': uri for number, uri in enumerate(uris, 1)}
+
+
+def assign_shard(context):
+    """Column default for BloodBank.shard: a new bank goes to the shard with the fewest banks."""
+    if not has_app_context() or not shards.active():
+        return 0
+    # Counted once per statement, so the banks of a multi-row insert are spread as well
+    counts = getattr(context, '_banks_per_shard', None)
+    if counts is None:
+        counts = context._banks_per_shard = Counter(dict(context.connection.execute(
+            text("SELECT shard, COUNT(*) FROM blood_bank WHERE shard > 0 GROUP BY shard")
+        ).all()))
+    key = min(shards.keys()[1:], key=lambda key: counts[key])
+    counts[key] += 1
+    return key
+
+
+class ShardRouter:
+    """Partitions bank-scoped tables across SQLite files by blood bank.
+
+    Each bank is pinned to one shard by `blood_bank.shard`: 0 is the primary database, which also
+    keeps every global table, and 1..N are the SHARD_URIS files. Shard connections attach the
+    primary, so bank-scoped rows still join donors, banks and staff in plain SQL.
+
+    Statements are routed by the bank or row ID in their WHERE clause (or their parameters, for
+    inserts); flushed objects by their own bank. Work that spans banks runs once per shard through
+    `gather`/`collect`, or `scatter` for read-only aggregates. A statement that cannot be placed
+    raises ShardRoutingError rather than silently reading one shard. Without SHARD_URIS, all of
+    this reduces to the single database.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('SHARD_URIS', [])
+        app.config.setdefault('SHARD_SCATTER_THREADS', 4)
+        app.extensions['shards'] = {'banks': {}}
+        if not app.config['SHARD_URIS']:
+            return
+
+        db = app.extensions['sqlalchemy']
+        with app.app_context():
+            primary = db.engines[None]
+            if not is_file_sqlite(str(primary.url)):
+                raise ValueError("Sharding needs a file-based SQLite primary to attach")
+            for key in self.keys()[1:]:
+                engine = self.engine(key)
+                if engine.dialect.name != 'sqlite':
+                    raise ValueError("Shards must be SQLite databases")
+                event.listen(engine, 'connect', _attach_primary(primary.url.database))
+
+    def active(self):
+        return bool(current_app.config.get('SHARD_URIS'))
+
+    def keys(self):
+        return list(range(len(current_app.config.get('SHARD_URIS', [])) + 1))
+
+    def engine(self, key):
+        return current_app.extensions['sqlalchemy'].engines[f'{SHARD_PREFIX}{key}' if key else None]
+
+    def upgrade(self, dry_run=False, log=print):
+        """Create or upgrade the bank-scoped and per-database tables on every shard and seed their ID ranges."""
+        from app.migrations import upgrade
+
+        applied = []
+        for key in self.keys()[1:]:
+            engine = self.engine(key)
+            applied += upgrade(engine, dry_run=dry_run, log=log, tables=SHARDED_TABLES.keys() | PER_DATABASE_TABLES)
+            if not dry_run:
+                seed_id_ranges(engine, key)
+        return applied
+
+    # Picking a shard
+
+    def shard_of_bank(self, bank_id, session):
+        banks = current_app.extensions['shards']['banks']
+        key = banks.get(bank_id)
+        if key is None:
+            # Through the session's own primary connection, so banks created in this transaction are seen
+            connection = session.connection(bind_arguments={'bind': self.engine(0)})
+            key = connection.execute(
+                text("SELECT shard FROM blood_bank WHERE blood_bank_id = :bank_id"), {'bank_id': bank_id}
+            ).scalar()
+            if key is None:
+                raise ShardRoutingError(f"Blood bank {bank_id} does not exist")
+            banks[bank_id] = key
+        return key
+
+    def forget_banks(self):
+        # After a rollback, bank IDs seen in the rolled-back transaction may be reused
+        if has_app_context() and 'shards' in current_app.extensions:
+            current_app.extensions['shards']['banks'].clear()
+
+    @contextmanager
+    def using(self, key):
+        """Route bank-scoped statements to shard `key` inside the block."""
+        token = _current.set(key)
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    def partition(self, rows, session, column='blood_bank_id'):
+        """Group row dicts by the shard of their bank: [(key, rows), ...]."""
+        if not self.active():
+            return [(None, rows)]
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.shard_of_bank(row[column], session), []).append(row)
+        return sorted(groups.items())
+
+    # Work across shards
+
+    def gather(self, fn):
+        """Call fn() once per shard with that shard selected; returns the results in shard order."""
+        if not self.active():
+            return [fn()]
+        results = []
+        for key in self.keys():
+            with self.using(key):
+                results.append(fn())
+        return results
+
+    def collect(self, fn):
+        """Like gather, for functions returning lists: one list with every shard's items."""
+        return [item for part in self.gather(fn) for item in part]
+
+    def scatter(self, session, statement):
+        """Run a read-only statement on every shard in parallel and return all rows.
+
+        Meant for aggregates, which the caller combines. Each shard is read on its own
+        connection, outside the session's transaction; unsharded, it simply runs in the session.
+        """
+        if not self.active():
+            return session.execute(statement).all()
+        engines = [self.engine(key) for key in self.keys()]
+
+        def run(engine):
+            with engine.connect() as connection:
+                return connection.execute(statement).all()
+
+        with ThreadPoolExecutor(max_workers=min(len(engines), current_app.config['SHARD_SCATTER_THREADS'])) as pool:
+            return [row for rows in pool.map(run, engines) for row in rows]
+
+    # Session hooks
+
+    def route_statement(self, orm_execute_state):
+        """do_orm_execute hook: bind statements on bank-scoped tables to their shard."""
+        if not has_app_context() or not self.active() or 'bind' in orm_execute_state.bind_arguments:
+            return
+        statement = orm_execute_state.statement
+        tables = {table.name for table in find_tables(statement, include_joins=True, include_crud=True)}
+        sharded = tables & SHARDED_TABLES.keys()
+        if not sharded:
+            return
+
+        key = _current.get()
+        if key is None:
+            key = self._infer(statement, orm_execute_state.parameters, orm_execute_state.session)
+        if key is None:
+            raise ShardRoutingError(
+                f"Cannot tell which shard a statement on {', '.join(sorted(sharded))} belongs to; "
+                "filter by blood bank or run it through shards.gather()"
+            )
+        if key:
+            # Shard 0 is the default bind, so its reads may still go to a read replica
+            orm_execute_state.bind_arguments['bind'] = self.engine(key)
+
+    def connection_for_instance(self, session, mapper, instance):
+        """Session.connection_callable: flush each bank-scoped object to its bank's shard."""
+        column = SHARDED_TABLES.get(mapper.local_table.name)
+        key = self.shard_of_bank(getattr(instance, column), session) if column else 0
+        if not key:
+            return session.connection(bind_arguments={'mapper': mapper})
+        return session.connection(bind_arguments={'bind': self.engine(key)})
+
+    def _infer(self, statement, parameters, session):
+        banks, ids = set(), set()
+        for table, column, values in _equalities(_where(statement), parameters):
+            if column.name == SHARDED_TABLES.get(table.name):
+                banks.update(values)
+            elif _is_row_id(column):
+                ids.update(values)
+
+        if not banks and not ids and parameters:
+            # INSERT ... VALUES with the bank among the parameters
+            rows = parameters if isinstance(parameters, list) else [parameters]
+            for table in find_tables(statement, include_crud=True):
+                column = SHARDED_TABLES.get(table.name)
+                if column and all(column in row for row in rows):
+                    banks.update(row[column] for row in rows)
+
+        keys = {self.shard_of_bank(bank_id, session) for bank_id in banks if bank_id is not None}
+        keys.update(int(row_id) // SHARD_ID_SPAN for row_id in ids if row_id is not None)
+        if len(keys) > 1:
+            raise ShardRoutingError(f"Statement spans shards {sorted(keys)}; run it through shards.gather()")
+        return keys.pop() if keys else None
+
+
+def _where(statement):
+    # The WHERE clause, or for `SELECT count(*) FROM (SELECT ...)` that of the inner select
+    clause = getattr(statement, 'whereclause', None)
+    if clause is None and isinstance(statement, Select):
+        froms = statement.get_final_froms()
+        if len(froms) == 1 and isinstance(froms[0], AliasedReturnsRows):
+            inner = froms[0]
+            while isinstance(inner, AliasedReturnsRows):
+                inner = inner.element
+            return _where(inner)
+    return clause
+
+
+def _equalities(clause, parameters):
+    # (table, column, values) for every `column = value` or `column IN (...)` ANDed into the clause
+    if clause is None:
+        return
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        for child in clause.clauses:
+            yield from _equalities(child, parameters)
+        return
+    if not isinstance(clause, BinaryExpression) or clause.operator not in (operators.eq, operators.in_op):
+        return
+    column, value = clause.left, clause.right
+    if isinstance(column, BindParameter):
+        column, value = value, column  # Lazy loaders compare `:param = column`
+    table = getattr(column, 'table', None)
+    if table is None or not isinstance(value, BindParameter):
+        return
+    resolved = value.effective_value
+    if resolved is None and isinstance(parameters, dict):
+        resolved = parameters.get(value.key)
+    if resolved is None:
+        return
+    yield table, column, resolved if isinstance(resolved, (list, tuple)) else [resolved]
+
+
+def _is_row_id(column):
+    # The ID of a bank-scoped row, or a reference to one (blood_donation.appointment_id)
+    targets = [column] + [foreign_key.column for foreign_key in column.foreign_keys]
+    return any(
+        target.primary_key and target.table.name in SHARDED_TABLES and len(target.table.primary_key.columns) == 1
+        for target in targets
+    )
+
+
+def _attach_primary(path):
+    def attach(dbapi_connection, connection_record):
+        # Tables missing from the shard (donors, banks, staff, ...) resolve to the primary
+        dbapi_connection.execute(f"ATTACH DATABASE ? AS {PRIMARY_SCHEMA}", (path,))
+    return attach
+
+
+def seed_id_ranges(engine, key):
+    """Start the IDs of each bank-scoped table on shard `key` at key * SHARD_ID_SPAN."""
+    floor = key * SHARD_ID_SPAN
+    metadata = current_app.extensions['sqlalchemy'].metadata
+    names = [table.name for table in metadata.sorted_tables
+             if table.name in SHARDED_TABLES and table.dialect_options['sqlite'].get('autoincrement')]
+    with engine.begin() as connection:
+        for name in names:
+            connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name AND seq < :floor"),
+                               {'name': name, 'floor': floor})
+            connection.execute(text(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :floor "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+            ), {'name': name, 'floor': floor})
+
+
+shards = ShardRouter()
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models.slow_query import SlowQuery
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_in_lists = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_whitespace = re.compile(r"\s+")
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def normalize_sql(statement):
+    """Collapse literals, IN-lists and whitespace so equivalent statements group together."""
+    statement = _literals.sub('?', statement)
+    statement = _in_lists.sub('(?, ...)', statement)
+    return _whitespace.sub(' ', statement).strip()
+
+
+class SlowQueryLog:
+    """Opt-in log of statements slower than SLOW_QUERY_MS.
+
+    The engine event only times the statement and queues it. A background thread logs it,
+    captures its query plan the first time it is seen, and folds it into the `slow_query` table,
+    which keeps the SLOW_QUERY_TOP_N statements with the most total time across all workers.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.threshold = None
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=10000)
+        self._local = threading.local()
+        self._explained = set()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_MS', None)  # Disabled unless set
+        app.config.setdefault('SLOW_QUERY_TOP_N', 100)
+        app.config.setdefault('SLOW_QUERY_FLUSH_INTERVAL', 2.0)  # seconds
+        app.config.setdefault('SLOW_QUERY_PARAMETERS', False)  # Log bound parameters (truncated); they can hold personal data
+        if not app.config['SLOW_QUERY_MS']:
+            return
+
+        self.app = app
+        self.threshold = float(app.config['SLOW_QUERY_MS']) / 1000
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'slow_query_started', None)
+        if started is None or getattr(self._local, 'ignore', False):
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return
+
+        route = request.endpoint if has_request_context() else threading.current_thread().name
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((statement, parameters, executemany, route, elapsed * 1000, datetime.utcnow()))
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self):
+        # Started lazily, and again after a fork, since threads do not survive fork()
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=10000)
+            threading.Thread(target=self._run, name='slow-query-log', daemon=True).start()
+
+    def _run(self):
+        self._local.ignore = True  # This thread's own statements are never reported
+        interval = self.app.config['SLOW_QUERY_FLUSH_INTERVAL']
+        while True:
+            pending = {}
+            deadline = time.monotonic() + interval
+            while time.monotonic() < deadline:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                except queue.Empty:
+                    continue
+                self._collect(pending, *item)
+            if pending:
+                try:
+                    self._store(pending)
+                except Exception as e:
+                    self.app.logger.error("Slow query log flush failed: %s", e)
+
+    def _collect(self, pending, statement, parameters, executemany, route, elapsed_ms, seen_at):
+        normalized = normalize_sql(statement)
+        fingerprint = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        sample = repr(parameters)[:500] if self.app.config['SLOW_QUERY_PARAMETERS'] else None
+        self.app.logger.warning(
+            "Slow query %.1f ms in %s: %s%s", elapsed_ms, route, normalized, f" params={sample}" if sample else ''
+        )
+
+        row = pending.get(fingerprint)
+        if row is None:
+            row = pending[fingerprint] = {
+                'fingerprint': fingerprint, 'statement': normalized, 'route': route, 'calls': 0, 'total_ms': 0.0,
+                'max_ms': 0.0, 'sample_parameters': sample, 'plan': None, 'first_seen': seen_at, 'last_seen': seen_at
+            }
+            if fingerprint not in self._explained and not executemany:
+                row['plan'] = self._explain(statement, parameters)
+                self._explained.add(fingerprint)
+        row['calls'] += 1
+        row['total_ms'] += elapsed_ms
+        row['max_ms'] = max(row['max_ms'], elapsed_ms)
+        row['route'] = route
+        row['last_seen'] = seen_at
+
+    def _explain(self, statement, parameters):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb not in EXPLAINABLE:
+            return None
+        try:
+            with self.app.app_context(), db.engine.connect() as connection:
+                dialect = connection.dialect.name
+                if dialect == 'sqlite':
+                    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+                    return '\n'.join(row[-1] for row in rows) or None
+                if dialect == 'postgresql':
+                    rows = connection.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+                    return '\n'.join(row[0] for row in rows)
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+        return None
+
+    def _store(self, pending):
+        table = SlowQuery.__table__
+        with self.app.app_context(), db.engine.begin() as connection:
+            dialect = connection.dialect.name
+            if dialect in ('sqlite', 'postgresql'):
+                insert = sqlite_insert if dialect == 'sqlite' else pg_insert
+                for row in pending.values():
+                    stmt = insert(table).values(**row)
+                    stmt = stmt.on_conflict_do_update(index_elements=['fingerprint'], set_={
+                        'route': stmt.excluded.route,
+                        'calls': table.c.calls + stmt.excluded.calls,
+                        'total_ms': table.c.total_ms + stmt.excluded.total_ms,
+                        'max_ms': func.max(table.c.max_ms, stmt.excluded.max_ms) if dialect == 'sqlite'
+                        else func.greatest(table.c.max_ms, stmt.excluded.max_ms),
+                        'sample_parameters': stmt.excluded.sample_parameters,
+                        'plan': func.coalesce(table.c.plan, stmt.excluded.plan),
+                        'last_seen': stmt.excluded.last_seen,
+                    })
+                    connection.execute(stmt)
+            else:
+                for row in pending.values():
+                    existing = connection.execute(table.select().where(table.c.fingerprint == row['fingerprint'])).first()
+                    if existing is None:
+                        connection.execute(table.insert().values(**row))
+                    else:
+                        connection.execute(table.update().where(table.c.fingerprint == row['fingerprint']).values(
+                            route=row['route'], calls=existing.calls + row['calls'],
+                            total_ms=existing.total_ms + row['total_ms'], max_ms=max(existing.max_ms, row['max_ms']),
+                            sample_parameters=row['sample_parameters'], plan=existing.plan or row['plan'],
+                            last_seen=row['last_seen']
+                        ))
+
+            # Keep only the top N statements by total time
+            keep = db.select(table.c.fingerprint).order_by(table.c.total_ms.desc()).limit(self.app.config['SLOW_QUERY_TOP_N'])
+            connection.execute(table.delete().where(table.c.fingerprint.not_in(keep.scalar_subquery())))
+
+
+slow_query_log = SlowQueryLog()
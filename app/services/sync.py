@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import contains_eager, joinedload
+from app import db
+from app.models.blood_bank import BloodBank
+from app.models.blood_need import BloodNeed
+from app.models.event import Event
+from app.models.faq import FAQ
+from app.models.sync import CLOCK_ID, SyncClock, SyncTombstone
+from app.services.shards import shards
+
+# Response key of each tracked table
+KINDS = {'blood_bank': 'blood_banks', 'faq': 'faqs', 'event': 'events', 'blood_need': 'blood_needs'}
+
+# Tables every client syncs in full; the others are limited to the client's banks
+GLOBAL_TABLES = ('blood_bank', 'faq')
+
+
+def parse_cursor(value):
+    """The per-database versions of a cursor from /sync, or None for a full sync. Raises ValueError."""
+    if not value:
+        return None
+    versions = [int(part) for part in value.split('.')]
+    if any(version < 0 for version in versions):
+        raise ValueError(value)
+    # A cursor from before shards were added cannot be continued
+    return versions if len(versions) == len(shards.keys()) else None
+
+
+def changes_since(cursor, bank_ids=None, blood_types=None):
+    """Rows of the tracked tables inserted, updated or deleted after `cursor`.
+
+    Events and blood needs are limited to `bank_ids`, and blood needs to `blood_types`; None means
+    all. Each database keeps its own version clock (see app/models/sync.py), so the cursor holds one
+    version per database. A changed row that no longer matches, such as an expired need, is sent
+    as a delete. At most SYNC_PAGE_SIZE changes per database are returned; `has_more` asks the
+    client to call again with the new cursor.
+    """
+    page_size = current_app.config['SYNC_PAGE_SIZE']
+    keys = shards.keys()
+    # Read every clock before any row, so changes committed meanwhile are left for the next call
+    clocks = [
+        db.session.execute(
+            select(SyncClock.version, SyncClock.pruned_version).where(SyncClock.clock_id == CLOCK_ID),
+            bind_arguments={'bind': shards.engine(key)}
+        ).one()
+        for key in keys
+    ]
+    # Tombstones the client has not seen may have been pruned, or the cursor is from another database
+    reset = cursor is None or any(
+        after < pruned or after > version for after, (version, pruned) in zip(cursor, clocks)
+    )
+    if reset:
+        cursor = [0] * len(keys)
+
+    now = datetime.utcnow()
+    result = {kind: {"upserts": [], "deletes": []} for kind in KINDS.values()}
+    versions, has_more = [], False
+    for key, after, (clock, _) in zip(keys, cursor, clocks):
+        changes = _changes(key, after, clock, page_size + 1, bank_ids, blood_types, now)
+        changes.sort(key=lambda change: change[0])
+        if len(changes) > page_size:
+            changes = changes[:page_size]
+            clock = changes[-1][0]
+            has_more = True
+        for version, kind, operation, item in changes:
+            result[kind][operation].append(item)
+        versions.append(clock)
+
+    return {
+        "cursor": '.'.join(map(str, versions)),
+        "reset": reset,
+        "has_more": has_more,
+        "changes": result
+    }
+
+
+def _changes(key, after, clock, limit, bank_ids, blood_types, now):
+    # (version, kind, 'upserts' or 'deletes', item) for up to `limit` changes per table on shard `key`.
+    # Every row fetched yields a change, so a table that fills `limit` shows the page was cut.
+    changes = []
+    tables = list(KINDS) if key == 0 else ['event', 'blood_need']
+
+    if key == 0:
+        banks = BloodBank.query.filter(BloodBank.version > after, BloodBank.version <= clock) \
+            .order_by(BloodBank.version).limit(limit).all()
+        changes += [(bank.version, 'blood_banks', 'upserts', _bank(bank)) for bank in banks]
+        faqs = FAQ.query.filter(FAQ.version > after, FAQ.version <= clock).order_by(FAQ.version).limit(limit).all()
+        changes += [(faq.version, 'faqs', 'upserts', _faq(faq)) for faq in faqs]
+
+    with shards.using(key):
+        query = Event.query.join(BloodBank).options(contains_eager(Event.blood_bank)) \
+            .filter(Event.version > after, Event.version <= clock)
+        if bank_ids is not None:
+            query = query.filter(Event.blood_bank_id.in_(bank_ids))
+        if not after:
+            # A full sync has nothing to delete, so rows it would skip are left out in SQL
+            query = query.filter(Event.event_date >= now.date())
+        for event in query.order_by(Event.version).limit(limit):
+            # Past events are dropped, as in /blood_bank_events
+            if event.event_date >= now.date():
+                changes.append((event.version, 'events', 'upserts', _event(event)))
+            elif after:
+                changes.append((event.version, 'events', 'deletes', event.event_id))
+
+        query = BloodNeed.query.options(joinedload(BloodNeed.blood_bank)) \
+            .filter(BloodNeed.version > after, BloodNeed.version <= clock)
+        if bank_ids is not None:
+            query = query.filter(BloodNeed.blood_bank_id.in_(bank_ids))
+        if not after:
+            query = query.filter(
+                (BloodNeed.expire_date > now.date())
+                | ((BloodNeed.expire_date == now.date()) & (BloodNeed.expire_time > now.time()))
+            )
+            if blood_types is not None:
+                query = query.filter(BloodNeed.blood_types.in_(blood_types))
+        for need in query.order_by(BloodNeed.version).limit(limit):
+            expired = (need.expire_date, need.expire_time) <= (now.date(), now.time())
+            if not expired and (blood_types is None or need.blood_types in blood_types):
+                changes.append((need.version, 'blood_needs', 'upserts', _need(need)))
+            elif after:
+                changes.append((need.version, 'blood_needs', 'deletes', need.blood_need_id))
+
+    if not after:
+        # A full sync replaces the client's lists, so there is nothing to delete
+        return changes
+
+    statement = select(SyncTombstone.version, SyncTombstone.table_name, SyncTombstone.row_id).where(
+        SyncTombstone.version > after, SyncTombstone.version <= clock, SyncTombstone.table_name.in_(tables)
+    )
+    if bank_ids is not None:
+        statement = statement.where(
+            SyncTombstone.table_name.in_(GLOBAL_TABLES) | SyncTombstone.blood_bank_id.in_(bank_ids)
+        )
+    tombstones = db.session.execute(
+        statement.order_by(SyncTombstone.version).limit(limit), bind_arguments={'bind': shards.engine(key)}
+    )
+    changes += [(version, KINDS[table_name], 'deletes', row_id) for version, table_name, row_id in tombstones]
+    return changes
+
+
+def prune_tombstones(keep_days):
+    """Delete tombstones older than `keep_days` days from every database. Returns how many went.
+
+    Clients whose cursor predates a pruned tombstone get a full sync on their next call.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=keep_days)
+    table = SyncTombstone.__table__
+    deleted = 0
+    for key in shards.keys():
+        with shards.engine(key).begin() as connection:
+            newest = connection.execute(
+                select(func.max(table.c.version)).where(table.c.deleted_at < cutoff)
+            ).scalar()
+            if newest is None:
+                continue
+            deleted += connection.execute(table.delete().where(table.c.version <= newest)).rowcount
+            connection.execute(
+                update(SyncClock.__table__)
+                .where(SyncClock.clock_id == CLOCK_ID, SyncClock.pruned_version < newest)
+                .values(pruned_version=newest)
+            )
+    return deleted
+
+
+# Payloads in the shapes of the list endpoints, so clients keep one model per list
+
+def _bank(bank):
+    return {
+        'blood_bank_id': bank.blood_bank_id,
+        'name': bank.name,
+        'latitude': bank.latitude,
+        'longitude': bank.longitude,
+        'phone_number': bank.phone_number,
+        'email': bank.email,
+        'start_hour': bank.start_hour,
+        'close_hour': bank.close_hour,
+    }
+
+
+def _faq(faq):
+    return {"id": faq.faq_id, "question": faq.question, "answer": faq.answer}
+
+
+def _event(event):
+    return {
+        "event_id": event.event_id,
+        "title": event.title,
+        "description": event.description,
+        "event_date": event.event_date,
+        "event_time": event.event_time.strftime('%H:%M'),
+        "location": event.location,
+        "blood_bank_id": event.blood_bank_id,
+        "blood_bank_name": event.blood_bank.name
+    }
+
+
+def _need(need):
+    return {
+        "blood_need_id": need.blood_need_id,
+        "blood_type": need.blood_types,
+        "units": need.units,
+        "location": need.location,
+        "hospital": need.hospital,
+        "expire_date": need.expire_date,
+        "expire_time": need.expire_time.strftime('%H:%M'),
+        "blood_bank_id": need.blood_bank_id,
+        "blood_bank_name": need.blood_bank.name
+    }
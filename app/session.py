@@ -0,0 +1,49 @@
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.selectable import CompoundSelect
+from app.services.replicas import replicas
+from app.services.shards import shards
+
+
+class RoutingSession(Session):
+    """`db.session` class that routes statements between the databases of a deployment.
+
+    Bank-scoped tables go to their bank's shard (see app/services/shards.py). The reads of
+    `read_replica` views that stay on the primary may then go to a read replica.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        if has_app_context() and shards.active():
+            self.connection_callable = lambda mapper, instance: shards.connection_for_instance(self, mapper, instance)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper, clause, bind, **kwargs)
+        if bind is not None or not has_app_context() or not g.get('read_replica'):
+            return engine
+        if engine is not self._db.engines.get(None):
+            return engine  # Models with their own bind are never replicated
+
+        if self._flushing or self._new or self._deleted or not _is_plain_select(clause):
+            # From the first write on, the rest of the request reads its own writes on the primary
+            g.read_replica = False
+            return engine
+        return replicas.choose(self._db.engines) or engine
+
+
+def _is_plain_select(clause):
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    return isinstance(clause, CompoundSelect)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _route_to_shard(orm_execute_state):
+    shards.route_statement(orm_execute_state)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_banks(session):
+    shards.forget_banks()
@@ -0,0 +1,121 @@
+"""Measure what archiving old appointments and donations does to the hot tables and their readers.
+
+    python benchmarks/archive_tiers.py --rows 200000 --after-days 730 --repeat 20
+
+Fills appointment and blood_donation with --rows rows each, spread over ten years, then times a
+few endpoints that read them: a donor's history (both tiers), the staff's appointments of the day
+and a manager's export of the last month. Archives everything older than --after-days in batches
+of ARCHIVE_BATCH_SIZE, reporting the slowest batch transaction, since that is how long other
+writers can wait on it, and times the endpoints again.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, time as day_time, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import db  # noqa: E402
+from app.models import Appointment, BloodDonation  # noqa: E402
+from app.perf.harness import seeded_app  # noqa: E402
+from app.perf.scenarios import token_for  # noqa: E402
+from app.perf.synthetic import Scale  # noqa: E402
+from app.services import archive  # noqa: E402
+from app.services.archive import ARCHIVES  # noqa: E402
+
+INSERT_CHUNK = 5000
+YEARS = 10
+
+
+def fill(fixture, rows):
+    rng = random.Random(rows)
+    start = date.today() - timedelta(days=365 * YEARS)
+    for model in (Appointment, BloodDonation):
+        count = model.query.count()
+        while count < rows:
+            batch = min(INSERT_CHUNK, rows - count)
+            values = []
+            for _ in range(batch):
+                # One row in fifty belongs to the measured donor, so their history grows with the table
+                donor_id = fixture.donor_id if rng.random() < 0.02 else rng.choice(fixture.donor_ids)
+                day = start + timedelta(days=rng.randrange(365 * YEARS))
+                common = dict(donor_id=donor_id, blood_bank_id=rng.choice(fixture.bank_ids), donation_type='Whole Blood')
+                if model is Appointment:
+                    values.append(dict(common, appointment_date=day, appointment_time=day_time(9), status='Completed',
+                                       quantity_donated=1.0, previous_donations=0))
+                else:
+                    values.append(dict(common, donation_date=day, quantity_donated=1.0, recipient_organization=None,
+                                       donor_blood_pulse=72.0, donor_temperature=36.8, blood_pressure='120/80'))
+            db.session.execute(model.__table__.insert(), values)
+            db.session.commit()
+            count += batch
+
+
+def archive_all(app, after_days):
+    """Archiver.run's loop with each batch timed. Returns (rows moved, batch durations in ms)."""
+    cutoff = datetime.utcnow().date() - timedelta(days=after_days)
+    batch_size = app.config['ARCHIVE_BATCH_SIZE']
+    moved, durations = 0, []
+    for model in (BloodDonation, Appointment):
+        date_column = getattr(model, ARCHIVES[model][1])
+        while True:
+            started = time.perf_counter()
+            count = archive.move(model, [date_column < cutoff], limit=batch_size)
+            db.session.commit()
+            durations.append((time.perf_counter() - started) * 1000)
+            moved += count
+            if count < batch_size:
+                break
+    return moved, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000, help="Rows in each of appointment and blood_donation")
+    parser.add_argument('--after-days', type=int, default=730)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app, fixture = seeded_app(Scale(donors=500))
+    client = app.test_client()
+    with app.app_context():
+        fill(fixture, args.rows)
+        donor = {'Authorization': f"Bearer {token_for(fixture.donor_id)}"}
+        staff = {'Authorization': f"Bearer {token_for(fixture.staff_id)}"}
+        manager = {'Authorization': f"Bearer {token_for(fixture.manager_id)}"}
+    last_month = (date.today() - timedelta(days=30)).isoformat()
+    endpoints = [
+        ('donation history', lambda: client.get('/donation_history', headers=donor)),
+        ('today appointments', lambda: client.post('/staff/today_appointments', headers=staff, json={'page': 'Appointmen'})),
+        ('export last month', lambda: client.get('/manager/export/donations', headers=manager,
+                                                 query_string={'from': last_month})),
+    ]
+
+    def report(label):
+        with app.app_context():
+            hot = ', '.join(f"{model.__tablename__} {model.query.count()}" for model in (Appointment, BloodDonation))
+        print(f"{label}: hot rows {hot}")
+        for name, call in endpoints:
+            call()  # Warm up
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = call()
+                response.get_data()
+                timings.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.get_data(as_text=True)
+            print(f"  {name:>18}: median {statistics.median(timings):7.2f} ms")
+
+    report("before")
+    with app.app_context():
+        moved, durations = archive_all(app, args.after_days)
+    print(f"archived {moved} rows in {len(durations)} batches of up to {app.config['ARCHIVE_BATCH_SIZE']}: "
+          f"median {statistics.median(durations):.1f} ms, slowest {max(durations):.1f} ms per batch transaction")
+    report("after")
+
+
+if __name__ == '__main__':
+    main()
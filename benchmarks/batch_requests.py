@@ -0,0 +1,69 @@
+"""Compare a desktop screen's separate API calls with one POST /batch call.
+
+    python benchmarks/batch_requests.py --rtt 80 --repeat 20
+
+The dashboard screen loads the inventory, today's appointments, the staff member's stats and the
+donor list. Each call is timed through the Flask test client, with --rtt milliseconds of network
+round trip added per HTTP request, once as four requests in a row and once as a single batch.
+The SQL statements each way needs are counted too. Pass --threads to run the batch's GETs concurrently.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.perf.harness import StatementRecorder, seeded_app  # noqa: E402
+from app.perf.scenarios import token_for  # noqa: E402
+from app.perf.synthetic import Scale  # noqa: E402
+
+SCREEN = [
+    {'method': 'GET', 'path': '/blood_inventory'},
+    {'method': 'POST', 'path': '/staff/today_appointments', 'body': {'page': 'Appointmen'}},
+    {'method': 'GET', 'path': '/get_user_data'},
+    {'method': 'GET', 'path': '/donors'},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rtt', type=float, default=80.0, help="Simulated round trip per HTTP request, in ms")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--factor', type=float, default=1.0, help="Synthetic dataset scale")
+    parser.add_argument('--threads', type=int, default=1, help="BATCH_THREADS")
+    args = parser.parse_args()
+
+    app, fixture = seeded_app(Scale.from_factor(args.factor), BATCH_THREADS=args.threads)
+    client = app.test_client()
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {token_for(fixture.staff_id)}"}
+
+    def separate():
+        for item in SCREEN:
+            time.sleep(args.rtt / 1000)
+            response = client.open(item['path'], method=item['method'], headers=headers, json=item.get('body'))
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+    def batched():
+        time.sleep(args.rtt / 1000)
+        response = client.post('/batch', headers=headers, json={'requests': SCREEN})
+        assert response.status_code == 200 and all(item['status'] == 200 for item in response.get_json()['responses'])
+
+    recorder = StatementRecorder()
+    with recorder.attached(app):
+        for name, load in (('separate', separate), ('batch', batched)):
+            load()  # Warm up
+            timings = []
+            with recorder.recording() as statements:
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    load()
+                    timings.append((time.perf_counter() - started) * 1000)
+            print(f"{name:>8}: median {statistics.median(timings):7.1f} ms per screen, "
+                  f"{len(statements) / args.repeat:.0f} SQL statements")
+
+
+if __name__ == '__main__':
+    main()
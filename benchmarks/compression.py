@@ -0,0 +1,78 @@
+"""Bytes on the wire and compression CPU per GET endpoint, at several gzip levels.
+
+    python benchmarks/compression.py --factor 2 --repeat 20
+
+Every read-only scenario in app/perf/scenarios.py is requested once against a synthetic dataset
+without Accept-Encoding. Its body is then gzipped at each level; the CPU time is the median of
+--repeat runs. Endpoints served from a pre-compressed snapshot (marked *) pay that cost once per
+snapshot rather than per request.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.perf.harness import issue, prepare, seeded_app  # noqa: E402
+from app.perf.query_counts import scenario_keys  # noqa: E402
+from app.perf.scenarios import SCENARIOS  # noqa: E402
+from app.perf.synthetic import Scale  # noqa: E402
+from app.services.compression import compress  # noqa: E402
+
+LEVELS = (1, 6, 9)
+SNAPSHOT_ENDPOINTS = {'donor.get_blood_banks', 'donor.get_faqs'}
+
+
+def cpu_ms(data, level, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        compress(data, 'gzip', level)
+        timings.append(time.process_time() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factor', type=float, default=1.0, help="Synthetic dataset scale")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app, fixture = seeded_app(Scale.from_factor(args.factor))
+    client = app.test_client()
+    tokens = {}
+    min_size = app.config['COMPRESSION_MIN_SIZE']
+
+    header = f"{'endpoint':<48} {'identity':>10}" + ''.join(f" {f'gzip-{level}':>10} {'cpu ms':>7}" for level in LEVELS)
+    print(header)
+    print('-' * len(header))
+    total = {level: 0 for level in (None,) + LEVELS}
+    for key, scenario in zip(scenario_keys(), SCENARIOS):
+        if scenario.method != 'GET' or scenario.mutates:
+            continue
+        response = issue(client, prepare(app, scenario, fixture, tokens))
+        data = response.get_data()
+        if not data:
+            continue
+        total[None] += len(data)
+        marker = '*' if scenario.endpoint in SNAPSHOT_ENDPOINTS else ' '
+        row = f"{key[4:] + marker:<48} {len(data):>10}"
+        for level in LEVELS:
+            if len(data) < min_size:
+                row += f" {'-':>10} {'-':>7}"
+                total[level] += len(data)
+                continue
+            size = len(compress(data, 'gzip', level))
+            total[level] += size
+            row += f" {size:>10} {cpu_ms(data, level, args.repeat):>7.2f}"
+        print(row)
+
+    print('-' * len(header))
+    print(f"{'total bytes':<48} {total[None]:>10}" + ''.join(f" {total[level]:>10} {'':>7}" for level in LEVELS))
+    print(f"Bodies under COMPRESSION_MIN_SIZE ({min_size} bytes) are sent uncompressed (-).")
+
+
+if __name__ == '__main__':
+    main()
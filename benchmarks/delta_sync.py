@@ -0,0 +1,92 @@
+"""Compare a donor app's full list refresh with a GET /sync from its last cursor.
+
+    python benchmarks/delta_sync.py --factor 10 --changes 3 --repeat 20
+
+A full refresh downloads /blood_banks, /blood_bank_events, /blood_bank_needs and /donor/faqs. The
+delta refresh asks /sync for what changed since the previous call. Before each refresh the donor's
+bank posts --changes blood needs, so the delta always has something to carry. Reports the median
+time, the response bytes and the SQL statements of each way.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import db  # noqa: E402
+from app.models import DonorBloodBank, StaffMember  # noqa: E402
+from app.perf.harness import StatementRecorder, seeded_app  # noqa: E402
+from app.perf.scenarios import token_for  # noqa: E402
+from app.perf.synthetic import Scale  # noqa: E402
+
+FULL_REFRESH = ['/blood_banks', '/blood_bank_events', '/blood_bank_needs', '/donor/faqs']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factor', type=float, default=10.0, help="Synthetic dataset scale")
+    parser.add_argument('--changes', type=int, default=3, help="Blood needs posted before each refresh")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--shards', type=int, default=0)
+    args = parser.parse_args()
+
+    app, fixture = seeded_app(Scale.from_factor(args.factor), shards=args.shards)
+    client = app.test_client()
+    with app.app_context():
+        bank_id = db.session.get(StaffMember, fixture.staff_id).blood_bank_id
+        if not DonorBloodBank.query.filter_by(donor_id=fixture.donor_id, blood_bank_id=bank_id).first():
+            db.session.add(DonorBloodBank(donor_id=fixture.donor_id, blood_bank_id=bank_id))
+            db.session.commit()
+        donor = {'Authorization': f"Bearer {token_for(fixture.donor_id)}"}
+        staff = {'Authorization': f"Bearer {token_for(fixture.staff_id)}"}
+
+    def post_changes():
+        for number in range(args.changes):
+            response = client.post('/blood_need', headers=staff, json={
+                'bloodTypes': 'AB+', 'units': 1, 'location': f"Ward {number}", 'expireTime': '23:00',
+                'expireDate': (date.today() + timedelta(days=1)).strftime('%Y-%m-%d')
+            })
+            assert response.status_code == 201, response.get_data(as_text=True)
+
+    def full():
+        size = 0
+        for path in FULL_REFRESH:
+            response = client.get(path, headers=donor)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            size += len(response.get_data())
+        return size
+
+    cursor = {}
+
+    def delta():
+        size, has_more = 0, True
+        while has_more:
+            response = client.get('/sync', headers=donor, query_string=cursor)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            body = response.get_json()
+            cursor['since'], has_more = body['cursor'], body['has_more']
+            size += len(response.get_data())
+        return size
+
+    delta()  # The initial full sync
+    recorder = StatementRecorder()
+    with recorder.attached(app):
+        for name, refresh in (('full', full), ('delta', delta)):
+            refresh()  # Warm up
+            timings, sizes, statement_counts = [], [], []
+            for _ in range(args.repeat):
+                post_changes()
+                with recorder.recording() as statements:
+                    started = time.perf_counter()
+                    sizes.append(refresh())
+                    timings.append((time.perf_counter() - started) * 1000)
+                statement_counts.append(len(statements))
+            print(f"{name:>6}: median {statistics.median(timings):7.2f} ms, {statistics.median(sizes):9.0f} bytes, "
+                  f"{statistics.median(statement_counts):.0f} SQL statements per refresh")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Compare finding eligible donors through the eligibility index with deriving eligibility on the fly.
+
+    python benchmarks/eligible_donors.py --donors 20000 100000 --repeat 20
+
+For each --donors count, generates a synthetic dataset of that size and asks
+/staff/eligible_donors for each blood type, as the staff of the bank with the most followers.
+The same question is then answered from the source tables: the bank's compatible followers
+without a declared disease, grouped with their latest donation from both tiers. Reports the
+median time of both ways, and checks they find the same donors.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import func  # noqa: E402
+from app import db  # noqa: E402
+from app.models import BloodDonation, Donor, DonorBloodBank, DonorDisease, StaffMember  # noqa: E402
+from app.perf.harness import seeded_app  # noqa: E402
+from app.perf.scenarios import token_for  # noqa: E402
+from app.perf.synthetic import Scale  # noqa: E402
+from app.services.archive import both_tiers  # noqa: E402
+from app.services.blood_types import COMPATIBLE_RECIPIENTS, donors_for  # noqa: E402
+from app.services.eligibility import DONATION_INTERVAL  # noqa: E402
+
+
+def derived(blood_bank_id, blood_type):
+    """Eligible donor IDs computed from Donor, DonorBloodBank, both tiers of BloodDonation and DonorDisease."""
+    donation = both_tiers(BloodDonation)
+    last = (
+        db.session.query(donation.c.donor_id, func.max(donation.c.donation_date).label('last_date'))
+        .group_by(donation.c.donor_id).subquery()
+    )
+    rows = (
+        db.session.query(Donor.id, last.c.last_date)
+        .join(DonorBloodBank, DonorBloodBank.donor_id == Donor.id)
+        .outerjoin(last, last.c.donor_id == Donor.id)
+        .filter(
+            DonorBloodBank.blood_bank_id == blood_bank_id,
+            Donor.blood_group.in_(donors_for([blood_type])),
+            ~db.session.query(DonorDisease).filter(DonorDisease.donor_id == Donor.id).exists()
+        )
+    )
+    today = date.today()
+    return {donor_id for donor_id, last_date in rows if last_date is None or last_date + DONATION_INTERVAL <= today}
+
+
+def median_ms(call, repeat):
+    call()  # Warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--donors', type=int, nargs='+', default=[20000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for donors in args.donors:
+        app, fixture = seeded_app(Scale(donors=donors))
+        client = app.test_client()
+        with app.app_context():
+            bank_id, followers = (
+                db.session.query(DonorBloodBank.blood_bank_id, func.count())
+                .group_by(DonorBloodBank.blood_bank_id).order_by(func.count().desc()).first()
+            )
+            staff = StaffMember.query.filter_by(blood_bank_id=bank_id).first()
+            headers = {'Authorization': f"Bearer {token_for(staff.id)}"}
+        print(f"{donors} donors, bank {bank_id} with {followers} followers")
+
+        def indexed(blood_type):
+            response = client.get('/staff/eligible_donors', headers=headers,
+                                  query_string={'blood_type': blood_type, 'per_page': 50})
+            assert response.status_code == 200, response.get_data(as_text=True)
+            return response.get_json()
+
+        for blood_type in COMPATIBLE_RECIPIENTS:
+            with app.app_context():
+                expected = derived(bank_id, blood_type)
+                derived_ms = median_ms(lambda: derived(bank_id, blood_type), args.repeat)
+                db.session.remove()
+            body = indexed(blood_type)
+            assert body['total'] == len(expected), (blood_type, body['total'], len(expected))
+            assert {donor['donor_id'] for donor in body['donors']} <= expected, blood_type
+            indexed_ms = median_ms(lambda: indexed(blood_type), args.repeat)
+            print(f"  {blood_type:>3}: {body['total']:>6} eligible, first page via index {indexed_ms:7.2f} ms, "
+                  f"derived from source tables {derived_ms:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
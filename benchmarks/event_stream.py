@@ -0,0 +1,107 @@
+"""Measure how fast blood needs reach open event streams, and what idle streams cost the database.
+
+    python benchmarks/event_stream.py --streams 200 --needs 20 --idle 10
+
+Opens --streams /donor/stream connections, each held by its own thread as a gunicorn gthread worker
+would. Every streaming donor follows the staff member's bank. The benchmark then posts --needs
+blood needs through POST /blood_need and reports how long each took to reach every stream. Last,
+it counts the SQL statements run while the streams sit idle for --idle seconds, next to what the
+same donors would cost polling /blood_bank_needs every --poll-every seconds.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import db  # noqa: E402
+from app.models import DonorBloodBank, StaffMember  # noqa: E402
+from app.perf.harness import StatementRecorder, seeded_app  # noqa: E402
+from app.perf.load import percentile  # noqa: E402
+from app.perf.scenarios import token_for  # noqa: E402
+from app.perf.synthetic import Scale  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=200)
+    parser.add_argument('--needs', type=int, default=20)
+    parser.add_argument('--idle', type=float, default=10.0, help="Seconds to count idle statements over")
+    parser.add_argument('--poll-every', type=float, default=10.0, help="Polling period the streams replace")
+    args = parser.parse_args()
+
+    duration = args.needs * 0.2 + args.idle + 30
+    app, fixture = seeded_app(Scale(donors=max(args.streams, 500)), STREAM_MAX_DURATION=duration)
+    client = app.test_client()
+    with app.app_context():
+        bank_id = db.session.get(StaffMember, fixture.staff_id).blood_bank_id
+        # Every streaming donor follows the staff member's bank
+        donor_ids = fixture.donor_ids[:args.streams]
+        DonorBloodBank.query.filter(DonorBloodBank.donor_id.in_(donor_ids)).delete(synchronize_session=False)
+        db.session.execute(DonorBloodBank.__table__.insert(), [
+            dict(donor_id=donor_id, blood_bank_id=bank_id) for donor_id in donor_ids
+        ])
+        db.session.commit()
+        staff_token = token_for(fixture.staff_id)
+        donor_tokens = [token_for(donor_id) for donor_id in donor_ids]
+
+    received = [dict() for _ in donor_ids]  # stream -> {event ID: monotonic time received}
+    ready = threading.Barrier(args.streams + 1)
+
+    def listen(index):
+        response = client.get('/donor/stream', headers={'Authorization': f"Bearer {donor_tokens[index]}"}, buffered=False)
+        frames = iter(response.response)
+        next(frames)  # The retry: line, sent before the stream subscribes
+        ready.wait()
+        for frame in frames:
+            frame = frame.decode() if isinstance(frame, bytes) else frame
+            if frame.startswith('id: '):
+                received[index][int(frame.split('\n', 1)[0][4:])] = time.monotonic()
+
+    threads = [threading.Thread(target=listen, args=(index,), daemon=True) for index in range(args.streams)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    time.sleep(0.5)  # Let every stream finish subscribing
+
+    # AB+ can be given by every blood group, so every streaming donor is sent every need
+    posted = {}
+    for number in range(args.needs):
+        started = time.monotonic()
+        response = client.post('/blood_need', headers={'Authorization': f"Bearer {staff_token}"}, json={
+            'bloodTypes': 'AB+', 'units': 1, 'location': f"Ward {number}", 'expireTime': '23:00',
+            'expireDate': (date.today() + timedelta(days=1)).strftime('%Y-%m-%d')
+        })
+        assert response.status_code == 201, response.get_data(as_text=True)
+        posted[number + 1] = started
+        time.sleep(0.2)
+    time.sleep(1)
+
+    latencies = sorted(
+        (stream[event_id] - started) * 1000
+        for stream in received for event_id, started in posted.items() if event_id in stream
+    )
+    expected = args.streams * args.needs
+    print(f"Delivered {len(latencies)} of {expected} events to {args.streams} streams: "
+          f"p50 {percentile(latencies, 0.5):.1f} ms, p99 {percentile(latencies, 0.99):.1f} ms, "
+          f"max {max(latencies, default=0):.1f} ms (from the start of POST /blood_need)")
+
+    recorder = StatementRecorder()
+    with recorder.attached(app):
+        with recorder.recording() as statements:
+            time.sleep(args.idle)
+        idle_statements = len(statements)
+        with recorder.recording() as statements:
+            client.get('/blood_bank_needs', headers={'Authorization': f"Bearer {donor_tokens[0]}"})
+        per_poll = len(statements)
+    polling = args.streams * (args.idle / args.poll_every) * per_poll
+    print(f"Idle for {args.idle:g} s with {args.streams} streams open: {idle_statements} statements. "
+          f"Polling /blood_bank_needs every {args.poll_every:g} s instead: about {polling:.0f} statements "
+          f"({per_poll} per request).")
+
+
+if __name__ == '__main__':
+    main()
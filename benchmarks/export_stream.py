@@ -0,0 +1,99 @@
+"""Measure the memory a network-wide donation export needs as the table grows.
+
+    python benchmarks/export_stream.py --rows 100000 400000
+
+For each --rows count, fills blood_donation up to that many rows, then downloads
+/admin/export/donations as CSV and as NDJSON, reading the streamed body chunk by chunk as a client
+would. Reports the time, the bytes sent and the peak Python memory of each download, next to
+loading the same rows through the ORM and serializing them in one JSON response.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import jsonify  # noqa: E402
+from app import db  # noqa: E402
+from app.models import BloodDonation  # noqa: E402
+from app.perf.harness import seeded_app  # noqa: E402
+from app.perf.scenarios import token_for  # noqa: E402
+from app.perf.synthetic import Scale  # noqa: E402
+
+INSERT_CHUNK = 5000
+
+
+def fill(fixture, rows):
+    count = BloodDonation.query.count()
+    rng = random.Random(rows)
+    start = date.today() - timedelta(days=3650)
+    while count < rows:
+        batch = min(INSERT_CHUNK, rows - count)
+        db.session.execute(BloodDonation.__table__.insert(), [
+            dict(donor_id=rng.choice(fixture.donor_ids), blood_bank_id=rng.choice(fixture.bank_ids),
+                 donation_date=start + timedelta(days=rng.randrange(3650)), donation_type='Whole Blood',
+                 quantity_donated=1.0, recipient_organization=None, donor_blood_pulse=72.0,
+                 donor_temperature=36.8, blood_pressure='120/80')
+            for _ in range(batch)
+        ])
+        db.session.commit()
+        count += batch
+
+
+def measure(load):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = load()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 400000])
+    parser.add_argument('--skip-orm', action='store_true', help="Skip the in-memory comparison")
+    args = parser.parse_args()
+
+    app, fixture = seeded_app(Scale(donors=500))
+    client = app.test_client()
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {token_for(fixture.admin_id)}"}
+
+    def stream(export_format):
+        response = client.get('/admin/export/donations', headers=headers,
+                              query_string={'format': export_format}, buffered=False)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        size = 0
+        for chunk in response.response:
+            size += len(chunk)
+        response.close()
+        return size
+
+    def in_memory():
+        with app.test_request_context():
+            donations = BloodDonation.query.order_by(BloodDonation.donation_date).all()
+            body = jsonify([{column.name: getattr(donation, column.name) for column in BloodDonation.__table__.columns}
+                            for donation in donations]).get_data()
+            db.session.remove()
+            return len(body)
+
+    for rows in args.rows:
+        with app.app_context():
+            fill(fixture, rows)
+        loads = [('csv', lambda: stream('csv')), ('ndjson', lambda: stream('ndjson'))]
+        if not args.skip_orm:
+            loads.append(('orm+json', in_memory))
+        for name, load in loads:
+            elapsed, size, peak = measure(load)
+            print(f"{rows:>9} rows {name:>9}: {elapsed:6.2f} s, {size / 1e6:7.1f} MB sent, "
+                  f"peak memory {peak / 1e6:7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
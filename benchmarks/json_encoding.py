@@ -0,0 +1,98 @@
+"""Build-and-encode time of large list payloads with Flask's default JSON provider and ours.
+
+    python benchmarks/json_encoding.py --rows 10000 --repeat 20
+
+"before" formats every date with strftime in the route and encodes with Flask's default
+provider. "stdlib" and "orjson" hand the date/time objects to app.json_provider.JSONProvider,
+with and without orjson. Payloads mirror /donation_history, /donors and /blood_inventory.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, time as time_of_day, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from app import json_provider  # noqa: E402
+from app.json_provider import JSONProvider  # noqa: E402
+
+
+def make_rows(count):
+    rng = random.Random(1)
+    today = date.today()
+    return [
+        {
+            'donation_id': i,
+            'blood_bank_name': f"Blood Bank {rng.randrange(20)}",
+            'donation_date': today - timedelta(days=rng.randrange(1000)),
+            'appointment_time': time_of_day(rng.randrange(8, 16), rng.choice([0, 30])),
+            'created_at': datetime(2026, 1, 1) + timedelta(minutes=rng.randrange(500000)),
+            'donation_type': "Whole Blood",
+            'quantity_donated': 1,
+            'donor_blood_pulse': rng.randrange(60, 100),
+            'donor_temperature': round(rng.uniform(36.2, 37.4), 1),
+            'blood_pressure': f"{rng.randrange(100, 140)}/{rng.randrange(60, 90)}",
+        }
+        for i in range(count)
+    ]
+
+
+def preformatted(rows):
+    # What the routes did before: strftime per value while building the response
+    return [
+        dict(
+            row,
+            donation_date=row['donation_date'].strftime('%Y-%m-%d'),
+            appointment_time=row['appointment_time'].strftime('%H:%M:%S'),
+            created_at=row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+        )
+        for row in rows
+    ]
+
+
+def passthrough(rows):
+    return [dict(row) for row in rows]
+
+
+def measure(app, build, rows, repeat):
+    timings = []
+    with app.app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = app.json.response({'donation_history': build(rows)}).get_data()
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    rows = make_rows(args.rows)
+
+    before = Flask('before')
+    before.json = DefaultJSONProvider(before)
+    ours = Flask('ours')
+    ours.json = JSONProvider(ours)
+
+    cases = [('before', before, preformatted, None), ('stdlib', ours, passthrough, None)]
+    if json_provider.orjson is not None:
+        cases.append(('orjson', ours, passthrough, json_provider.orjson))
+
+    print(f"{args.rows} rows, median of {args.repeat}")
+    installed = json_provider.orjson
+    for label, app, build, encoder in cases:
+        json_provider.orjson = encoder
+        seconds, size = measure(app, build, rows, args.repeat)
+        print(f"{label:<8} {seconds * 1000:>8.1f} ms   {size / 1024:>8.0f} KiB")
+    json_provider.orjson = installed
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Time the notification fan-out of one blood need to a bank with many followers.
+
+    python benchmarks/notification_fanout.py --followers 100000 --chunk 5000
+
+Every synthetic donor follows the first bank. A blood need for --blood-type is posted through
+POST /blood_need, which only queues the fan-out; the benchmark then runs the queued fan-out in
+the foreground, as the background worker would, and reports how long the request and the
+fan-out took and how long the longest single chunk transaction held the write lock.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import event  # noqa: E402
+from app import db  # noqa: E402
+from app.models import DonorBloodBank, Notification  # noqa: E402
+from app.perf.harness import seeded_app  # noqa: E402
+from app.perf.scenarios import token_for  # noqa: E402
+from app.perf.synthetic import Scale  # noqa: E402
+from app.services.blood_types import donors_for  # noqa: E402
+from app.services.notifications import notifier  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--followers', type=int, default=100000)
+    parser.add_argument('--chunk', type=int, default=5000, help="NOTIFICATION_FANOUT_CHUNK")
+    parser.add_argument('--blood-type', default='A+', help="Blood type of the posted need")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    scale = Scale(donors=args.followers, banks=5, appointments_per_donor=0, donations_per_donor=0, follows_per_donor=1)
+    app, fixture = seeded_app(scale, NOTIFICATION_FANOUT_CHUNK=args.chunk)
+    with app.app_context():
+        bank_id = fixture.bank_id
+        # Make every donor a follower of the staff member's bank
+        DonorBloodBank.query.delete()
+        db.session.execute(DonorBloodBank.__table__.insert(), [
+            dict(donor_id=donor_id, blood_bank_id=bank_id) for donor_id in fixture.donor_ids
+        ])
+        Notification.query.delete()
+        db.session.commit()
+    print(f"Dataset: {args.followers} followers of bank {bank_id} ({time.perf_counter() - started:.1f} s to generate)")
+
+    client = app.test_client()
+    with app.app_context():
+        token = token_for(fixture.staff_id)
+    started = time.perf_counter()
+    response = client.post('/blood_need', headers={'Authorization': f"Bearer {token}"}, json={
+        'bloodTypes': args.blood_type, 'units': 2, 'location': 'ER', 'expireTime': '23:00',
+        'expireDate': (date.today() + timedelta(days=2)).strftime('%Y-%m-%d')
+    })
+    request_ms = (time.perf_counter() - started) * 1000
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+    with app.app_context():
+        transactions = []
+        began = {}
+
+        def on_begin(connection):
+            began[id(connection)] = time.perf_counter()
+
+        def on_commit(connection):
+            transactions.append(time.perf_counter() - began.pop(id(connection), time.perf_counter()))
+
+        event.listen(db.engine, 'begin', on_begin)
+        event.listen(db.engine, 'commit', on_commit)
+        started = time.perf_counter()
+        written = notifier.run_pending()
+        elapsed = time.perf_counter() - started
+        event.remove(db.engine, 'begin', on_begin)
+        event.remove(db.engine, 'commit', on_commit)
+
+    groups = ', '.join(donors_for([args.blood_type]))
+    print(f"POST /blood_need: {request_ms:.1f} ms (fan-out only queued)")
+    print(f"Fan-out: {written} notifications to donors of {groups} in {elapsed:.2f} s "
+          f"({written / elapsed if elapsed else 0:,.0f}/s, {len(transactions)} transactions, "
+          f"longest {max(transactions, default=0) * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Multi-process read/write throughput of a SQLite file with and without the production PRAGMA profile.
+
+    python benchmarks/sqlite_profile.py --processes 8 --seconds 5 --write-ratio 0.2
+
+Each process opens its own engine through the same helpers create_app uses and runs a mix of
+indexed point reads, small range scans and single-row write transactions for a fixed time.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from app.config import SQLITE_PRAGMA_DEFAULTS, apply_sqlite_profile, engine_options  # noqa: E402
+
+ROWS = 50000
+
+
+def make_engine(uri, profile):
+    engine = create_engine(uri, **engine_options(uri, profile))
+    apply_sqlite_profile(engine, profile)
+    return engine
+
+
+def setup(uri, profile):
+    engine = make_engine(uri, profile)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE appointment (id INTEGER PRIMARY KEY, bank INTEGER, day INTEGER, status TEXT)"
+        ))
+        conn.execute(text("CREATE INDEX ix_bank_day ON appointment (bank, day)"))
+        conn.execute(
+            text("INSERT INTO appointment (bank, day, status) VALUES (:bank, :day, 'Pending')"),
+            [{'bank': i % 50, 'day': i % 365} for i in range(ROWS)]
+        )
+    engine.dispose()
+
+
+def worker(uri, profile, seconds, write_ratio, results):
+    engine = make_engine(uri, profile)
+    rng = random.Random(os.getpid())
+    reads = writes = errors = 0
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO appointment (bank, day, status) VALUES (:bank, :day, 'Pending')"),
+                        {'bank': rng.randrange(50), 'day': rng.randrange(365)}
+                    )
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT * FROM appointment WHERE id = :id"), {'id': rng.randrange(1, ROWS)}).all()
+                    conn.execute(
+                        text("SELECT count(*) FROM appointment WHERE bank = :bank AND day BETWEEN :lo AND :lo + 30"),
+                        {'bank': rng.randrange(50), 'lo': rng.randrange(335)}
+                    ).scalar()
+                reads += 1
+        except OperationalError:
+            # "database is locked"
+            errors += 1
+
+    engine.dispose()
+    results.put((reads, writes, errors))
+
+
+def run(label, profile, args):
+    with tempfile.TemporaryDirectory() as directory:
+        uri = 'sqlite:///' + os.path.join(directory, 'bench.db')
+        setup(uri, profile)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(uri, profile, args.seconds, args.write_ratio, results))
+            for _ in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        totals = [sum(values) for values in zip(*[results.get() for _ in processes])]
+        for process in processes:
+            process.join()
+
+    reads, writes, errors = totals
+    print(f"{label:<12} reads/s {reads / args.seconds:>10.0f}   writes/s {writes / args.seconds:>8.0f}   "
+          f"locked errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes, {args.seconds}s each, {args.write_ratio:.0%} writes")
+    # "before": no PRAGMAs at all, i.e. rollback journal, synchronous=FULL and the driver's busy timeout
+    run('before', {}, args)
+    run('production', dict(SQLITE_PRAGMA_DEFAULTS), args)
+
+
+if __name__ == '__main__':
+    main()
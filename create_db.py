@@ -1,8 +1,14 @@
 # create_db.py
 from app import create_app, db
+from app.migrations import upgrade
+from app.services.shards import shards
 
 app = create_app()
 
 with app.app_context():
     db.create_all()
+    # Bring databases created by older versions up to date (new columns and indexes)
+    upgrade(db.engine)
+    # Bank-scoped tables on the shards, when SHARD_URIS is set
+    shards.upgrade()
     print("Database created successfully!")
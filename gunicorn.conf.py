@@ -0,0 +1,37 @@
+# gunicorn.conf.py
+# Production server settings, read from the environment:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+# Preforked workers, each running a pool of threads; WEB_CONCURRENCY is the usual name for the former
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = 'gthread'
+
+# Each worker's database pool serves its own threads, so size it to match unless set explicitly
+os.environ.setdefault('DB_POOL_SIZE', str(threads))
+
+# Import the app once in the master so workers fork with it already loaded.
+# Code changes then need a new master (USR2, then QUIT the old one); HUP only replaces workers.
+preload_app = True
+
+timeout = int(os.getenv('WEB_TIMEOUT', 60))  # seconds a request may take before its worker is replaced
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))  # seconds to finish in-flight requests on restart
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+
+# Recycle workers now and then, staggered so they never all restart at once
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading belong to the master; never share them with a worker
+    from wsgi import dispose_engines
+    dispose_engines()
@@ -0,0 +1,16 @@
+# wsgi.py
+from app import create_app, db
+
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+app = create_app()
+
+
+def dispose_engines():
+    """Drop connections inherited from the parent process without closing them under its feet.
+
+    Called in each worker right after fork. The pools start empty, so every worker opens its own
+    connections, and the parent's connections are left to the parent.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)